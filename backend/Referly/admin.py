@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Template, Resume, UserQuota, Company, HRContact, Job
+from .models import Template, Resume, ResumeBlob, ResumeRendition, ResumeUploadSession, UserQuota, Company, HRContact, Job, DirectoryStat, BulkUploadJob
 
 # Register your models here.
 
@@ -18,16 +18,39 @@ class ResumeAdmin(admin.ModelAdmin):
     list_filter = ['is_active', 'file_extension', 'created_at', 'user']
     search_fields = ['name', 'user__username']
     ordering = ['user', 'user_resume_id']
-    readonly_fields = ['user_resume_id', 'file_size', 'created_at', 'updated_at']
+    readonly_fields = ['user_resume_id', 'file_size', 'blob', 'created_at', 'updated_at']
     exclude = ['file_content']
 
 
+@admin.register(ResumeBlob)
+class ResumeBlobAdmin(admin.ModelAdmin):
+    list_display = ['sha256', 'size', 'ref_count', 'storage_key', 'created_at']
+    search_fields = ['sha256']
+    readonly_fields = ['sha256', 'size', 'storage_key', 'ref_count', 'created_at']
+    exclude = ['content']
+
+
+@admin.register(ResumeRendition)
+class ResumeRenditionAdmin(admin.ModelAdmin):
+    list_display = ['source_blob', 'kind', 'status', 'attempts', 'updated_at']
+    list_filter = ['status', 'kind']
+    readonly_fields = ['source_blob', 'output_blob', 'attempts', 'error', 'created_at', 'updated_at']
+
+
+@admin.register(ResumeUploadSession)
+class ResumeUploadSessionAdmin(admin.ModelAdmin):
+    list_display = ['id', 'user', 'name', 'received_bytes', 'total_size', 'status', 'expires_at']
+    list_filter = ['status', 'file_extension']
+    search_fields = ['name', 'user__username']
+    readonly_fields = ['received_bytes', 'next_chunk', 'crc32', 'resume', 'created_at', 'updated_at']
+
+
 @admin.register(UserQuota)
 class UserQuotaAdmin(admin.ModelAdmin):
     list_display = ['user', 'current_templates', 'max_templates', 'current_resumes', 'max_resumes', 'created_at']
     list_filter = ['max_templates', 'max_resumes', 'created_at']
     search_fields = ['user__username']
-    readonly_fields = ['current_templates', 'current_resumes', 'created_at']
+    readonly_fields = ['template_count', 'resume_count', 'next_template_id', 'next_resume_id', 'created_at']
 
 
 @admin.register(Company)
@@ -37,7 +60,7 @@ class CompanyAdmin(admin.ModelAdmin):
     list_filter = ['is_active', 'created_at']
     search_fields = ['company_id', 'name']
     ordering = ['company_id']
-    readonly_fields = ['created_at', 'updated_at']
+    readonly_fields = ['hr_contacts_count', 'jobs_count', 'created_at', 'updated_at']
 
 
 @admin.register(HRContact)
@@ -78,3 +101,20 @@ class JobAdmin(admin.ModelAdmin):
             'classes': ('collapse',)
         }),
     )
+
+
+@admin.register(DirectoryStat)
+class DirectoryStatAdmin(admin.ModelAdmin):
+    list_display = ['name', 'value', 'updated_at']
+    search_fields = ['name']
+    ordering = ['name']
+    readonly_fields = ['name', 'value', 'updated_at']
+
+
+@admin.register(BulkUploadJob)
+class BulkUploadJobAdmin(admin.ModelAdmin):
+    list_display = ['id', 'kind', 'user', 'status', 'processed_rows', 'total_rows', 'error_count', 'created_at']
+    list_filter = ['status', 'kind']
+    search_fields = ['file_name', 'user__username']
+    readonly_fields = ['total_rows', 'processed_rows', 'error_count', 'result', 'error', 'attempts',
+                       'created_at', 'updated_at', 'started_at', 'finished_at']
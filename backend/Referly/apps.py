@@ -1,6 +1,22 @@
 from django.apps import AppConfig
+from django.db.models.signals import pre_migrate
+
+
+def create_postgres_extensions(sender, using, **kwargs):
+    """Trigram indexes need pg_trgm before our tables are created/altered"""
+    from django.db import connections
+
+    connection = connections[using]
+    if connection.vendor == 'postgresql':
+        with connection.cursor() as cursor:
+            cursor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
 
 
 class ReferlyConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'Referly'
+
+    def ready(self):
+        from . import signals  # noqa: F401
+
+        pre_migrate.connect(create_postgres_extensions, sender=self)
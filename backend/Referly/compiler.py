@@ -0,0 +1,352 @@
+import re
+import threading
+from collections import OrderedDict
+from html import escape
+from html.parser import HTMLParser
+
+from django.conf import settings
+
+
+# `{{ name }}` / `{{ hr.name }}` placeholders, same syntax as our Django email templates
+PLACEHOLDER_RE = re.compile(r'\{\{\s*([A-Za-z_][\w]*(?:\.[A-Za-z_][\w]*)*)\s*\}\}')
+
+# Elements removed together with everything inside them (void ones just disappear)
+DROPPED_ELEMENTS = {
+    'script', 'iframe', 'object', 'embed', 'applet', 'frame', 'frameset', 'base',
+    # <meta http-equiv=refresh> redirects, <link> pulls in external resources
+    'meta', 'link',
+    # Forms have no place in an email: submitting one posts the recipient's input somewhere
+    'input', 'button', 'select', 'textarea',
+}
+# Elements removed while their content is kept
+UNWRAPPED_ELEMENTS = {'form'}
+# Attributes whose value is a URL
+URL_ATTRIBUTES = {'href', 'src', 'action', 'formaction', 'background', 'poster', 'xlink:href'}
+# URL schemes links and images may use; URLs without a scheme (relative, `{{ placeholder }}`) are kept
+SAFE_URL_SCHEMES = {'http', 'https', 'mailto', 'cid'}
+SAFE_DATA_URL_RE = re.compile(r'^data:image/(png|gif|jpe?g|webp);', re.IGNORECASE)
+URL_SCHEME_RE = re.compile(r'^([a-z][a-z0-9+.-]*):', re.IGNORECASE)
+# Browsers ignore ASCII whitespace and control characters anywhere in a URL ("java\tscript:")
+URL_IGNORED_RE = re.compile(r'[\x00-\x20\x7f-\x9f]+')
+CSS_ESCAPE_RE = re.compile(r'\\(?:([0-9a-fA-F]{1,6})\s?|(.))', re.DOTALL)
+CSS_URL_RE = re.compile(r'url\(\s*([\'"]?)(.*?)\1\s*\)', re.IGNORECASE | re.DOTALL)
+# Script hooks of old IE / Firefox CSS
+CSS_SCRIPT_RE = re.compile(r'expression\s*\(|behavior\s*:|-moz-binding', re.IGNORECASE)
+VOID_ELEMENTS = {
+    'area', 'br', 'col', 'embed', 'hr', 'img', 'input', 'link', 'meta', 'param', 'source', 'track', 'wbr',
+}
+# Whitespace-only text directly inside these is insignificant
+STRUCTURAL_ELEMENTS = {'html', 'head', 'table', 'thead', 'tbody', 'tfoot', 'tr', 'ul', 'ol', 'select', 'colgroup'}
+# Text inside these is kept byte for byte
+PREFORMATTED_ELEMENTS = {'pre', 'textarea'}
+
+CSS_COMMENT_RE = re.compile(r'/\*.*?\*/', re.DOTALL)
+# Selectors we can match without a DOM: tag, .class, #id and combinations like td.header
+SIMPLE_SELECTOR_RE = re.compile(r'^([a-zA-Z][\w-]*)?((?:[.#][\w-]+)*)$')
+WHITESPACE_RE = re.compile(r'\s+')
+
+
+def is_safe_url(value):
+    """Whether a URL attribute value uses an allowed scheme (or none at all)"""
+    url = URL_IGNORED_RE.sub('', value)
+    match = URL_SCHEME_RE.match(url)
+    if match is None:
+        return True
+    scheme = match.group(1).lower()
+    if scheme == 'data':
+        return SAFE_DATA_URL_RE.match(url) is not None
+    return scheme in SAFE_URL_SCHEMES
+
+
+def is_safe_css(css):
+    """Whether CSS (declarations or a stylesheet) is free of script hooks and `url()`s with unsafe schemes"""
+    css = CSS_COMMENT_RE.sub('', css)
+    # `\6a avascript:` and `e\xpression(` are what they look like once unescaped
+    css = CSS_ESCAPE_RE.sub(
+        lambda match: chr(min(int(match.group(1), 16), 0x10FFFF) or 0xFFFD) if match.group(1) else match.group(2), css
+    )
+    if CSS_SCRIPT_RE.search(css):
+        return False
+    return all(is_safe_url(match.group(2)) for match in CSS_URL_RE.finditer(css))
+
+
+class _TemplateParser(HTMLParser):
+    """
+    Tokenizes template HTML, dropping unsafe elements/attributes and collecting <style> blocks.
+    Tokens are replayed by `TemplateCompiler` once the stylesheet is known.
+    """
+
+    def __init__(self):
+        super().__init__(convert_charrefs=False)
+        self.tokens = []
+        self.styles = []
+        self._dropping = 0
+        self._in_style = False
+
+    def handle_starttag(self, tag, attrs):
+        self._start(tag, attrs, self_closing=False)
+
+    def handle_startendtag(self, tag, attrs):
+        self._start(tag, attrs, self_closing=True)
+
+    def _start(self, tag, attrs, self_closing):
+        if tag in DROPPED_ELEMENTS:
+            if not self_closing and tag not in VOID_ELEMENTS:
+                self._dropping += 1
+            return
+        if self._dropping or tag in UNWRAPPED_ELEMENTS:
+            return
+        if tag == 'style':
+            self._in_style = not self_closing
+            return
+        safe_attrs = []
+        for name, value in attrs:
+            if name.startswith('on'):
+                continue
+            if value is not None and name in URL_ATTRIBUTES and not is_safe_url(value):
+                continue
+            if value is not None and name == 'style' and not is_safe_css(value):
+                continue
+            safe_attrs.append((name, value))
+        self.tokens.append(('start', tag, safe_attrs, self_closing))
+
+    def handle_endtag(self, tag):
+        if tag in DROPPED_ELEMENTS:
+            if self._dropping:
+                self._dropping -= 1
+            return
+        if self._dropping or tag in UNWRAPPED_ELEMENTS:
+            return
+        if tag == 'style':
+            self._in_style = False
+            return
+        self.tokens.append(('end', tag))
+
+    def handle_data(self, data):
+        if self._dropping:
+            return
+        if self._in_style:
+            self.styles.append(data)
+        else:
+            self.tokens.append(('data', data))
+
+    def handle_entityref(self, name):
+        if not self._dropping and not self._in_style:
+            self.tokens.append(('raw', f'&{name};'))
+
+    def handle_charref(self, name):
+        if not self._dropping and not self._in_style:
+            self.tokens.append(('raw', f'&#{name};'))
+
+    def handle_decl(self, decl):
+        if not self._dropping and not self._in_style:
+            self.tokens.append(('raw', f'<!{decl}>'))
+
+    def handle_comment(self, data):
+        # Outlook conditional comments carry layout fixes; everything else is dropped
+        if not self._dropping and data.lstrip().startswith('[if'):
+            self.tokens.append(('raw', f'<!--{data}-->'))
+
+    def unknown_decl(self, data):
+        if not self._dropping:
+            self.tokens.append(('raw', f'<![{data}]>'))
+
+
+class TemplateCompiler:
+    """
+    Save-time compilation of user HTML templates for mail merge:
+    sanitize -> inline CSS -> minify -> extract `{{ placeholders }}`.
+    Sending only substitutes variables into the compiled artifact (see `render`).
+    """
+
+    _plans = OrderedDict()
+    _plans_lock = threading.Lock()
+
+    @staticmethod
+    def compile(html):
+        """Return (compiled_html, variables) for raw template HTML"""
+        parser = _TemplateParser()
+        parser.feed(html)
+        parser.close()
+
+        rules, retained_css = TemplateCompiler.parse_stylesheet(''.join(parser.styles))
+        compiled = TemplateCompiler.serialize(parser.tokens, rules, retained_css)
+        return compiled, TemplateCompiler.extract_variables(compiled)
+
+    @staticmethod
+    def extract_variables(html):
+        """Placeholder names in order of first appearance"""
+        return list(dict.fromkeys(PLACEHOLDER_RE.findall(html)))
+
+    @staticmethod
+    def parse_stylesheet(css):
+        """
+        Split CSS into inlinable rules [(specificity, order, tag, classes, id, declarations)]
+        and the CSS that has to stay in a <style> block (@media, pseudo-classes, descendant selectors...).
+        """
+        css = CSS_COMMENT_RE.sub('', css)
+        rules = []
+        retained = []
+        position = 0
+        order = 0
+        while position < len(css):
+            brace = css.find('{', position)
+            if brace == -1:
+                break
+            prelude = css[position:brace].strip()
+            if prelude.startswith('@'):
+                # At-rules may nest blocks: keep the whole balanced block as is
+                depth, end = 0, brace
+                while end < len(css):
+                    if css[end] == '{':
+                        depth += 1
+                    elif css[end] == '}':
+                        depth -= 1
+                        if depth == 0:
+                            break
+                    end += 1
+                if is_safe_css(css[position:end + 1]):
+                    retained.append(css[position:end + 1].strip())
+                position = end + 1
+                continue
+
+            close = css.find('}', brace)
+            if close == -1:
+                close = len(css)
+            declarations = TemplateCompiler.minify_css(css[brace + 1:close]).strip(';')
+            position = close + 1
+            if not declarations or not is_safe_css(declarations):
+                continue
+
+            kept = []
+            for selector in prelude.split(','):
+                selector = selector.strip()
+                match = SIMPLE_SELECTOR_RE.match(selector)
+                if not selector or not match:
+                    if selector:
+                        kept.append(selector)
+                    continue
+                tag = (match.group(1) or '').lower() or None
+                parts = re.findall(r'[.#][\w-]+', match.group(2))
+                classes = {p[1:] for p in parts if p[0] == '.'}
+                ids = [p[1:] for p in parts if p[0] == '#']
+                if len(ids) > 1:
+                    kept.append(selector)
+                    continue
+                specificity = (len(ids), len(classes), 1 if tag else 0)
+                rules.append((specificity, order, tag, classes, ids[0] if ids else None, declarations))
+                order += 1
+            if kept:
+                retained.append(f"{','.join(kept)}{{{declarations}}}")
+
+        rules.sort(key=lambda rule: (rule[0], rule[1]))
+        return rules, TemplateCompiler.minify_css(''.join(retained))
+
+    @staticmethod
+    def minify_css(css):
+        css = WHITESPACE_RE.sub(' ', CSS_COMMENT_RE.sub('', css))
+        return re.sub(r'\s*([{}:;,>])\s*', r'\1', css).strip()
+
+    @staticmethod
+    def inline_style(tag, attrs, rules):
+        """Merge matching stylesheet declarations into the element's style attribute (inline styles win)"""
+        attr_map = dict(attrs)
+        classes = set((attr_map.get('class') or '').split())
+        element_id = attr_map.get('id')
+        declarations = [
+            rule[5] for rule in rules
+            if (rule[2] is None or rule[2] == tag)
+            and rule[3] <= classes
+            and (rule[4] is None or rule[4] == element_id)
+        ]
+        existing = attr_map.get('style')
+        if not declarations and not existing:
+            return attrs
+        if existing:
+            declarations.append(TemplateCompiler.minify_css(existing).strip(';'))
+        style = ';'.join(declarations)
+        return [(name, value) for name, value in attrs if name != 'style'] + [('style', style)]
+
+    @staticmethod
+    def serialize(tokens, rules, retained_css):
+        output = []
+        stack = []
+        preformatted = 0
+        for token in tokens:
+            kind = token[0]
+            if kind == 'start':
+                _, tag, attrs, self_closing = token
+                attrs = TemplateCompiler.inline_style(tag, attrs, rules)
+                rendered = ''.join(
+                    f' {name}' if value is None else f' {name}="{escape(value, quote=True)}"'
+                    for name, value in attrs
+                )
+                output.append(f"<{tag}{rendered}{'/' if self_closing else ''}>")
+                if tag == 'head' and retained_css:
+                    output.append(f'<style>{retained_css}</style>')
+                    retained_css = ''
+                if not self_closing and tag not in VOID_ELEMENTS:
+                    stack.append(tag)
+                    if tag in PREFORMATTED_ELEMENTS:
+                        preformatted += 1
+            elif kind == 'end':
+                _, tag = token
+                if tag in stack:
+                    while stack:
+                        closed = stack.pop()
+                        if closed in PREFORMATTED_ELEMENTS:
+                            preformatted -= 1
+                        if closed == tag:
+                            break
+                output.append(f'</{tag}>')
+            elif kind == 'data':
+                text = token[1]
+                if not preformatted:
+                    text = WHITESPACE_RE.sub(' ', text)
+                    if text == ' ' and (not stack or stack[-1] in STRUCTURAL_ELEMENTS):
+                        continue
+                output.append(escape(text, quote=False))
+            else:
+                output.append(token[1])
+
+        compiled = ''.join(output).strip()
+        if retained_css:
+            # No <head> to put it in: media queries etc. still need to ship with the body
+            compiled = f'<style>{retained_css}</style>{compiled}'
+        return compiled
+
+    @staticmethod
+    def render_plan(key, compiled_html):
+        """
+        Literal/placeholder segments of a compiled template, cached per process under `key`
+        (template id + updated_at, so a save naturally invalidates the entry).
+        Even indexes are literal HTML, odd indexes are variable names.
+        """
+        with TemplateCompiler._plans_lock:
+            plan = TemplateCompiler._plans.get(key)
+            if plan is not None:
+                TemplateCompiler._plans.move_to_end(key)
+                return plan
+        plan = tuple(PLACEHOLDER_RE.split(compiled_html))
+        with TemplateCompiler._plans_lock:
+            TemplateCompiler._plans[key] = plan
+            while len(TemplateCompiler._plans) > settings.REFERLY_TEMPLATE_PLAN_CACHE_SIZE:
+                TemplateCompiler._plans.popitem(last=False)
+        return plan
+
+    @staticmethod
+    def resolve(context, name):
+        value = context
+        for part in name.split('.'):
+            if not isinstance(value, dict):
+                return ''
+            value = value.get(part, '')
+        return '' if value is None else value
+
+    @staticmethod
+    def render(plan, context):
+        """Substitute (HTML-escaped) context values into a render plan"""
+        return ''.join(
+            segment if index % 2 == 0 else escape(str(TemplateCompiler.resolve(context, segment)), quote=True)
+            for index, segment in enumerate(plan)
+        )
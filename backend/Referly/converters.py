@@ -0,0 +1,124 @@
+import io
+import shutil
+import subprocess
+import tempfile
+from pathlib import Path
+
+from django.conf import settings
+
+
+class ConversionError(Exception):
+    """Raised when a local converter fails or is not installed"""
+
+
+class DocumentConverter:
+    """
+    Converts DOCX resumes with a local, offline LibreOffice (soffice --headless).
+    Runs inside the render worker, never on a request thread.
+    """
+
+    # LibreOffice export filter per rendition kind
+    FILTERS = {
+        'pdf': ('pdf', 'pdf'),
+        'html': ('html:XHTML Writer File:UTF8', 'html'),  # XHTML export embeds images as data URIs
+        'text': ('txt:Text (encoded):UTF8', 'txt'),
+    }
+
+    @staticmethod
+    def convert(content, source_extension, target):
+        """Convert document bytes to `target` ("pdf", "html" or "text") and return the output bytes"""
+        if target not in DocumentConverter.FILTERS:
+            raise ConversionError(f"Unsupported conversion target: {target}")
+
+        binary = shutil.which(settings.REFERLY_SOFFICE_BINARY)
+        if not binary:
+            raise ConversionError(f"LibreOffice binary '{settings.REFERLY_SOFFICE_BINARY}' not found")
+
+        export_filter, output_extension = DocumentConverter.FILTERS[target]
+        with tempfile.TemporaryDirectory(prefix='referly_render_') as workdir:
+            workdir = Path(workdir)
+            source = workdir / f"resume.{source_extension}"
+            source.write_bytes(content)
+            command = [
+                binary,
+                # Private profile per conversion so parallel workers don't fight over the profile lock
+                f"-env:UserInstallation={(workdir / 'profile').as_uri()}",
+                '--headless', '--norestore',
+                '--convert-to', export_filter,
+                '--outdir', str(workdir / 'out'),
+                str(source),
+            ]
+            try:
+                subprocess.run(
+                    command,
+                    check=True,
+                    capture_output=True,
+                    timeout=settings.REFERLY_RENDER_TIMEOUT,
+                )
+            except subprocess.TimeoutExpired:
+                raise ConversionError(f"Conversion timed out after {settings.REFERLY_RENDER_TIMEOUT}s")
+            except subprocess.CalledProcessError as exc:
+                raise ConversionError(exc.stderr.decode('utf-8', 'replace')[-500:] or str(exc))
+
+            output = workdir / 'out' / f"resume.{output_extension}"
+            if not output.exists():
+                raise ConversionError("Converter finished without producing output")
+            return output.read_bytes()
+
+
+class ThumbnailGenerator:
+    """Rasterizes the first page of a PDF with a local poppler (pdftoppm) and stores it as a small WebP"""
+
+    @staticmethod
+    def first_page(pdf_content):
+        from PIL import Image
+
+        binary = shutil.which(settings.REFERLY_PDFTOPPM_BINARY)
+        if not binary:
+            raise ConversionError(f"Poppler binary '{settings.REFERLY_PDFTOPPM_BINARY}' not found")
+
+        width = settings.REFERLY_THUMBNAIL_WIDTH
+        try:
+            result = subprocess.run(
+                # First page only, scaled to the thumbnail width, PNG on stdout
+                [binary, '-f', '1', '-l', '1', '-singlefile', '-png', '-scale-to-x', str(width), '-scale-to-y', '-1', '-', '-'],
+                input=pdf_content,
+                check=True,
+                capture_output=True,
+                timeout=settings.REFERLY_RENDER_TIMEOUT,
+            )
+        except subprocess.TimeoutExpired:
+            raise ConversionError(f"Thumbnail rendering timed out after {settings.REFERLY_RENDER_TIMEOUT}s")
+        except subprocess.CalledProcessError as exc:
+            raise ConversionError(exc.stderr.decode('utf-8', 'replace')[-500:] or str(exc))
+
+        try:
+            image = Image.open(io.BytesIO(result.stdout)).convert('RGB')
+        except OSError as exc:
+            raise ConversionError(f"Could not read rendered page: {exc}")
+        output = io.BytesIO()
+        image.save(output, format='WEBP', quality=settings.REFERLY_THUMBNAIL_QUALITY, method=6)
+        return output.getvalue()
+
+
+class TextExtractor:
+    """Plain UTF-8 text of a PDF with a local poppler (pdftotext), for resume/job matching"""
+
+    @staticmethod
+    def from_pdf(pdf_content):
+        binary = shutil.which(settings.REFERLY_PDFTOTEXT_BINARY)
+        if not binary:
+            raise ConversionError(f"Poppler binary '{settings.REFERLY_PDFTOTEXT_BINARY}' not found")
+        try:
+            result = subprocess.run(
+                [binary, '-enc', 'UTF-8', '-nopgbrk', '-', '-'],
+                input=pdf_content,
+                check=True,
+                capture_output=True,
+                timeout=settings.REFERLY_RENDER_TIMEOUT,
+            )
+        except subprocess.TimeoutExpired:
+            raise ConversionError(f"Text extraction timed out after {settings.REFERLY_RENDER_TIMEOUT}s")
+        except subprocess.CalledProcessError as exc:
+            raise ConversionError(exc.stderr.decode('utf-8', 'replace')[-500:] or str(exc))
+        return result.stdout
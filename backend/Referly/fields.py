@@ -0,0 +1,179 @@
+import zlib
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.db import models
+from django.db.models.query_utils import DeferredAttribute
+
+
+# Stored values start with a NUL sentinel and a format byte. PDF, DOCX and HTML never start with NUL,
+# so rows written before compression (no header) are still read back as-is.
+HEADER_SENTINEL = 0x00
+FORMAT_RAW = 0x01
+FORMAT_ZLIB = 0x02
+FORMAT_ZSTD = 0x03
+HEADER_SIZE = 2
+
+CODEC_FORMATS = {
+    'zlib': FORMAT_ZLIB,
+    'zstd': FORMAT_ZSTD,
+}
+
+# Keep the raw bytes unless compression saves at least this fraction (already-compressed PDFs/DOCX)
+MIN_SAVINGS = 0.05
+
+
+def _zstd():
+    try:
+        import zstandard
+    except ImportError:
+        raise ImproperlyConfigured("The 'zstandard' package is required for zstd compressed content")
+    return zstandard
+
+
+def stored_format(stored):
+    """Format byte of a stored value (or its first bytes); None for legacy uncompressed rows"""
+    if len(stored) >= HEADER_SIZE and stored[0] == HEADER_SENTINEL:
+        return stored[1]
+    return None
+
+
+def compress(data, codec=None, level=None):
+    """Encode bytes for storage: header + payload, falling back to raw when compression doesn't pay off"""
+    options = settings.REFERLY_COMPRESSION
+    codec = codec or options['CODEC']
+    level = options['LEVEL'] if level is None else level
+    if codec not in CODEC_FORMATS:
+        raise ImproperlyConfigured(f"Unknown REFERLY_COMPRESSION codec: {codec}")
+
+    data = bytes(data)
+    if len(data) >= options['MIN_SIZE']:
+        if codec == 'zstd':
+            payload = _zstd().ZstdCompressor(level=level).compress(data)
+        else:
+            payload = zlib.compress(data, level)
+        if len(payload) <= len(data) * (1 - MIN_SAVINGS):
+            return bytes((HEADER_SENTINEL, CODEC_FORMATS[codec])) + payload
+    return bytes((HEADER_SENTINEL, FORMAT_RAW)) + data
+
+
+def decompress(stored):
+    """Decode a stored value back to the original bytes"""
+    stored = bytes(stored)
+    fmt = stored_format(stored)
+    if fmt is None:
+        return stored
+    payload = stored[HEADER_SIZE:]
+    if fmt == FORMAT_RAW:
+        return payload
+    if fmt == FORMAT_ZLIB:
+        return zlib.decompress(payload)
+    if fmt == FORMAT_ZSTD:
+        return _zstd().ZstdDecompressor().decompress(payload)
+    raise ValueError(f"Unknown compressed content format: {fmt}")
+
+
+class StoredValue(bytes):
+    """Column bytes as loaded from the database, not decompressed yet"""
+
+
+class CompressedDescriptor(DeferredAttribute):
+    """Decompresses on first attribute access and caches the result on the instance"""
+
+    def __get__(self, instance, cls=None):
+        if instance is None:
+            return self
+        value = super().__get__(instance, cls)
+        if isinstance(value, StoredValue):
+            value = self.field.decode(decompress(value))
+            instance.__dict__[self.field.attname] = value
+        return value
+
+    def __set__(self, instance, value):
+        # A data descriptor, so reads keep going through __get__ once the value sits in __dict__
+        instance.__dict__[self.field.attname] = value
+
+
+class CompressedFieldMixin:
+    """
+    Stores the value compressed (see `compress`) in a binary column.
+    Rows loaded but never accessed are written back without a decompress/compress round trip.
+    Note that `.values()` returns the stored bytes; pass them through `decompress()`.
+    """
+    descriptor_class = CompressedDescriptor
+
+    def __init__(self, *args, codec=None, level=None, **kwargs):
+        self.codec = codec
+        self.level = level
+        super().__init__(*args, **kwargs)
+
+    def deconstruct(self):
+        name, path, args, kwargs = super().deconstruct()
+        if self.codec is not None:
+            kwargs['codec'] = self.codec
+        if self.level is not None:
+            kwargs['level'] = self.level
+        return name, path, args, kwargs
+
+    def get_internal_type(self):
+        return 'BinaryField'
+
+    def encode(self, value):
+        return value
+
+    def decode(self, data):
+        return data
+
+    def is_untouched(self, instance):
+        """True when the value was loaded but never accessed (so it cannot have changed)"""
+        return isinstance(instance.__dict__.get(self.attname), StoredValue)
+
+    def from_db_value(self, value, expression, connection):
+        if value is None:
+            return None
+        return StoredValue(value)
+
+    def pre_save(self, model_instance, add):
+        if self.attname in model_instance.__dict__:
+            return model_instance.__dict__[self.attname]
+        return getattr(model_instance, self.attname)
+
+    def get_db_prep_value(self, value, connection, prepared=False):
+        if value is None:
+            return None
+        if not isinstance(value, StoredValue):
+            value = compress(self.encode(value), codec=self.codec, level=self.level)
+        return connection.Database.Binary(bytes(value))
+
+
+class CompressedBinaryField(CompressedFieldMixin, models.BinaryField):
+    """Transparently compressed bytes"""
+
+    def to_python(self, value):
+        if isinstance(value, StoredValue):
+            return decompress(value)
+        return super().to_python(value)
+
+
+class CompressedTextField(CompressedFieldMixin, models.TextField):
+    """Transparently compressed UTF-8 text (forms and serializers still see a text field)"""
+
+    def db_type(self, connection):
+        return models.BinaryField().db_type(connection)
+
+    def encode(self, value):
+        return str(value).encode('utf-8')
+
+    def decode(self, data):
+        return data.decode('utf-8')
+
+    def to_python(self, value):
+        if isinstance(value, StoredValue):
+            return self.decode(decompress(value))
+        return super().to_python(value)
+
+    def get_prep_value(self, value):
+        return value
+
+    def value_to_string(self, obj):
+        return self.value_from_object(obj)
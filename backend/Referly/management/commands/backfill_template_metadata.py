@@ -0,0 +1,34 @@
+from django.core.management.base import BaseCommand
+from django.db.models import F, Q
+
+from Referly.models import Template
+
+
+class Command(BaseCommand):
+    help = (
+        "Recompute the stored size, content hash and compiled artifact of templates "
+        "saved before those columns existed (or compiled from outdated content)"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=200, help='Templates to update per query')
+
+    def handle(self, *args, **options):
+        # Rows without a hash predate the metadata columns; a mismatching compiled_hash
+        # predates the template compiler
+        pending = Template.objects.filter(Q(content_hash='') | ~Q(compiled_hash=F('content_hash'))).order_by('id')
+        batch_size = options['batch_size']
+        updated = 0
+        last_id = 0
+        while True:
+            batch = list(pending.filter(id__gt=last_id).only('id', 'html_content', 'compiled_hash')[:batch_size])
+            if not batch:
+                break
+            for template in batch:
+                template.compile()
+            Template.objects.bulk_update(
+                batch, ['size', 'content_hash', 'compiled_html', 'variables', 'compiled_hash']
+            )
+            updated += len(batch)
+            last_id = batch[-1].id
+        self.stdout.write(self.style.SUCCESS(f"Updated {updated} template(s)"))
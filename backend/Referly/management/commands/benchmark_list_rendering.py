@@ -0,0 +1,110 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+
+from Referly.fields import StoredValue, compress
+from Referly.models import Company, HRContact, Job, Template
+from Referly.renderers import ORJSONRenderer
+from Referly.serializers import CompanySerializer, HRContactListSerializer, JobListSerializer, TemplateSerializer
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare per-row cost of the list endpoints' serializer path (ModelSerializer + JSONRenderer) with the "
+        "`.values()` fast path (ValuesFastPathMixin + ORJSONRenderer) on in-memory rows; no database needed"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=5000, help='Rows per list')
+        parser.add_argument('--repeat', type=int, default=5, help='Best of this many runs')
+
+    @staticmethod
+    def fixtures(count):
+        """(serializer, model instances, equivalent `.values()` rows) per list endpoint"""
+        now = timezone.now()
+        company = Company(
+            id=1, company_id='ACME', name='Acme', website='https://acme.example', about_us='About Acme ' * 20,
+            headquarters='Berlin', founded_year=1999, company_size='51-200', company_url='https://acme.example',
+            hr_contacts_count=12, jobs_count=3, is_active=True, created_at=now, updated_at=now,
+        )
+        companies = []
+        contacts = []
+        jobs = []
+        templates = []
+        html = '<p style="margin:0">Hi {{ name }}, about {{ role }} at {{ company }}</p>' * 20
+        for index in range(count):
+            companies.append(Company(**{
+                **{field: getattr(company, field) for field in CompanySerializer.VALUES}, 'id': index,
+            }))
+            contacts.append(HRContact(
+                id=index, company=company, first_name='Ada', last_name='Lovelace', email=f'ada{index}@acme.example',
+                email_verified=True, linkedin_verified=False, created_at=now,
+            ))
+            job = Job(id=index, company=company, title='data-engineer', job_type='data-engineer', posted_date=now)
+            job.has_hr = True
+            jobs.append(job)
+            templates.append(Template(
+                id=index, user_template_id=index, name='Intro', html_content=html,
+                variables=['name', 'role', 'company'], size=len(html), created_at=now, updated_at=now,
+            ))
+
+        def company_row(obj):
+            return {field: getattr(obj, field) for field in CompanySerializer.VALUES}
+
+        def contact_row(obj):
+            return {
+                'id': obj.id, 'company__company_id': company.company_id, 'company__name': company.name,
+                'first_name': obj.first_name, 'last_name': obj.last_name, 'email': obj.email,
+                'email_verified': obj.email_verified, 'linkedin_verified': obj.linkedin_verified,
+                'created_at': obj.created_at,
+            }
+
+        def job_row(obj):
+            return {
+                'id': obj.id, 'title': obj.title, 'job_type': obj.job_type, 'company__company_id': company.company_id,
+                'company__name': company.name, 'posted_date': obj.posted_date, 'has_hr': obj.has_hr,
+            }
+
+        stored_html = StoredValue(compress(html.encode('utf-8')))
+
+        def template_row(obj):
+            return {
+                'id': obj.id, 'user_template_id': obj.user_template_id, 'name': obj.name,
+                'html_content': stored_html, 'variables': obj.variables, 'created_at': obj.created_at,
+                'updated_at': obj.updated_at, 'size': obj.size,
+            }
+
+        return [
+            (CompanySerializer, companies, [company_row(obj) for obj in companies]),
+            (HRContactListSerializer, contacts, [contact_row(obj) for obj in contacts]),
+            (JobListSerializer, jobs, [job_row(obj) for obj in jobs]),
+            (TemplateSerializer, templates, [template_row(obj) for obj in templates]),
+        ]
+
+    @staticmethod
+    def best(function, repeat):
+        timings = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            function()
+            timings.append(time.perf_counter() - start)
+        return min(timings)
+
+    def handle(self, *args, **options):
+        rows = options['rows']
+        json_renderer = JSONRenderer()
+        orjson_renderer = ORJSONRenderer()
+        self.stdout.write(f"{'serializer':<26}{'serializer us/row':>19}{'fast path us/row':>18}{'speedup':>9}")
+        for serializer_class, instances, values in self.fixtures(rows):
+            slow = self.best(
+                lambda: json_renderer.render(serializer_class(instances, many=True).data), options['repeat']
+            )
+            fast = self.best(
+                lambda: orjson_renderer.render(serializer_class.fast_rows(values)), options['repeat']
+            )
+            self.stdout.write(
+                f"{serializer_class.__name__:<26}{slow / rows * 1e6:>19.2f}{fast / rows * 1e6:>18.2f}"
+                f"{slow / fast:>8.1f}x"
+            )
@@ -0,0 +1,69 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count, F, Q
+from django.utils import timezone
+
+from Referly.models import ResumeBlob, ResumeRendition
+
+
+class Command(BaseCommand):
+    help = "Reclaim resume blobs that no active resume references (ref_count <= 0)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--grace-minutes', type=int, default=60,
+                            help='Skip blobs created more recently than this (uploads still in flight)')
+        parser.add_argument('--batch-size', type=int, default=200)
+        parser.add_argument('--recount', action='store_true',
+                            help='Recompute ref_count from active resumes before collecting (drift repair)')
+        parser.add_argument('--dry-run', action='store_true')
+
+    def handle(self, *args, **options):
+        if options['recount']:
+            self.recount()
+
+        cutoff = timezone.now() - timedelta(minutes=options['grace_minutes'])
+        orphans = ResumeBlob.objects.filter(ref_count__lte=0, created_at__lt=cutoff).order_by('id')
+        if options['dry_run']:
+            self.stdout.write(f"{orphans.count()} orphaned blob(s) would be deleted")
+            return
+
+        deleted = 0
+        while True:
+            with transaction.atomic():
+                # skip_locked lets GC run next to uploads that are acquiring the same blobs
+                batch = list(orphans.select_for_update(skip_locked=True).only('id', 'storage_key')[:options['batch_size']])
+                if not batch:
+                    break
+                batch_ids = [blob.id for blob in batch]
+                # Renditions of collected blobs go with them; release the rendered outputs they held
+                outputs = (
+                    ResumeRendition.objects.filter(source_blob_id__in=batch_ids, output_blob__isnull=False)
+                    .values('output_blob_id').annotate(refs=Count('id')).values_list('output_blob_id', 'refs')
+                )
+                for output_blob_id, refs in outputs:
+                    ResumeBlob.objects.filter(id=output_blob_id).update(ref_count=F('ref_count') - refs)
+                ResumeBlob.objects.filter(id__in=batch_ids).delete()
+                # Objects are removed while the rows are still locked, so a concurrent upload of the
+                # same bytes waits and then re-creates both the row and the object
+                for blob in batch:
+                    blob.delete_content()
+            deleted += len(batch)
+
+        self.stdout.write(self.style.SUCCESS(f"Deleted {deleted} orphaned blob(s)"))
+
+    def recount(self):
+        counts = ResumeBlob.objects.annotate(active=Count('resumes', filter=Q(resumes__is_active=True)))
+        # Rendered outputs are referenced by their rendition rather than by a resume
+        rendition_refs = dict(
+            ResumeRendition.objects.filter(output_blob__isnull=False)
+            .values('output_blob_id').annotate(refs=Count('id')).values_list('output_blob_id', 'refs')
+        )
+        fixed = 0
+        for blob_id, ref_count, active in counts.values_list('id', 'ref_count', 'active').iterator():
+            expected = active + rendition_refs.get(blob_id, 0)
+            if ref_count != expected:
+                ResumeBlob.objects.filter(id=blob_id).update(ref_count=expected)
+                fixed += 1
+        self.stdout.write(f"Recounted references, fixed {fixed} blob(s)")
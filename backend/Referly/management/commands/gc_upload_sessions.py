@@ -0,0 +1,34 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db.models import Q
+from django.utils import timezone
+
+from Referly.models import ResumeUploadSession
+
+
+class Command(BaseCommand):
+    help = "Delete expired resumable upload sessions (and their staged chunks) and old completed ones"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--keep-completed-hours', type=int, default=24,
+                            help='Keep completed sessions this long so clients can still read their status')
+        parser.add_argument('--dry-run', action='store_true')
+
+    def handle(self, *args, **options):
+        now = timezone.now()
+        stale = ResumeUploadSession.objects.filter(
+            Q(status=ResumeUploadSession.STATUS_OPEN, expires_at__lte=now)
+            | Q(status=ResumeUploadSession.STATUS_COMPLETED,
+                updated_at__lt=now - timedelta(hours=options['keep_completed_hours']))
+        ).order_by('created_at')
+        if options['dry_run']:
+            self.stdout.write(f"{stale.count()} upload session(s) would be deleted")
+            return
+
+        deleted = 0
+        for session in stale.iterator():
+            session.discard_chunks()
+            session.delete()
+            deleted += 1
+        self.stdout.write(self.style.SUCCESS(f"Deleted {deleted} upload session(s)"))
@@ -0,0 +1,62 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from Referly.models import Resume
+
+
+class Command(BaseCommand):
+    help = (
+        "Move legacy resume bytes (Resume.file_content) into the deduplicated blob store "
+        "and the configured storage backend, in batches"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=50, help='Resumes to move per transaction')
+        parser.add_argument('--limit', type=int, default=None, help='Stop after moving this many resumes')
+        parser.add_argument('--dry-run', action='store_true', help='Only report how many resumes would be moved')
+
+    def handle(self, *args, **options):
+        pending = Resume.objects.filter(blob__isnull=True, file_content__isnull=False).order_by('id')
+        total = pending.count()
+        if options['limit']:
+            total = min(total, options['limit'])
+        self.stdout.write(f"{total} resume(s) to migrate")
+        if options['dry_run'] or not total:
+            return
+
+        batch_size = options['batch_size']
+        moved = 0
+        last_id = 0
+        while moved < total:
+            # Only ids are loaded up front; bytes are fetched one row at a time inside the batch
+            ids = list(pending.filter(id__gt=last_id).values_list('id', flat=True)[:min(batch_size, total - moved)])
+            if not ids:
+                break
+
+            batch_moved = 0
+            try:
+                with transaction.atomic():
+                    for resume_id in ids:
+                        resume = Resume.objects.select_for_update().only(
+                            'id', 'blob', 'file_content', 'is_active'
+                        ).get(id=resume_id)
+                        if resume.blob_id or resume.file_content is None:
+                            # Moved since the ids were read (e.g. re-uploaded)
+                            continue
+                        resume.store_content(bytes(resume.file_content))
+                        if not resume.is_active:
+                            # Inactive resumes keep their bytes reachable but hold no reference
+                            resume.blob.release()
+                        # update() keeps updated_at untouched and writes only the two columns
+                        Resume.objects.filter(id=resume.id).update(blob=resume.blob, file_content=None)
+                        batch_moved += 1
+            except Exception as exc:
+                raise CommandError(f"Batch starting at resume {ids[0]} failed: {exc}")
+
+            moved += batch_moved
+            last_id = ids[-1]
+            self.stdout.write(f"Migrated {moved}/{total}")
+
+        self.stdout.write(self.style.SUCCESS(
+            "Done. Run VACUUM (or VACUUM FULL during a maintenance window) on referly_resume to reclaim space."
+        ))
@@ -0,0 +1,94 @@
+import io
+import uuid
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections, connections, transaction
+
+from Referly.models import BulkUploadJob, BulkUploadSheet, JobReclaimed
+from Referly.queue_service import QueueService
+from Referly.utils import CompanyBulkImporter, HRContactBulkImporter
+
+
+class Command(BaseCommand):
+    help = (
+        "Worker that imports Excel bulk uploads (companies / HR contacts) off the request thread, "
+        "taking job ids from RabbitMQ and committing progress every chunk of rows"
+    )
+    IMPORTERS = {
+        BulkUploadJob.KIND_COMPANIES: CompanyBulkImporter,
+        BulkUploadJob.KIND_HR_CONTACTS: HRContactBulkImporter,
+    }
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true',
+                            help='Import the queued (and stale) jobs found in the database and exit, without RabbitMQ')
+
+    def handle(self, *args, **options):
+        self.stdout.write("Bulk upload worker started")
+        # Jobs whose message never reached RabbitMQ, or whose worker died mid-import
+        self.sweep()
+        if not options['once']:
+            QueueService().consume(settings.REFERLY_BULK_UPLOAD['QUEUE'], self.on_message)
+
+    def sweep(self):
+        for job_id in list(BulkUploadJob.claimable().order_by('created_at').values_list('id', flat=True)):
+            self.process(job_id)
+
+    def on_message(self, payload):
+        # Runs on a thread of its own (see QueueService.consume), which has its own connections
+        close_old_connections()
+        try:
+            job_id = uuid.UUID(str(payload['job_id']))
+        except (TypeError, KeyError, ValueError):
+            self.stderr.write(f"Ignoring malformed message: {payload!r}")
+            return
+        try:
+            self.process(job_id)
+        finally:
+            connections.close_all()
+
+    def process(self, job_id):
+        job = BulkUploadJob.claim(job_id)
+        if job is None:
+            # Finished, or being imported by another worker (redelivered message)
+            return
+        try:
+            self.run(job)
+        except JobReclaimed as exc:
+            # This worker stalled; the one that re-claimed the job owns it (and the chunk rolled back)
+            self.stderr.write(str(exc))
+            return
+        except Exception as exc:
+            try:
+                job.finish(BulkUploadJob.STATUS_FAILED, error=f"Failed to process Excel file: {exc}"[:2000])
+            except JobReclaimed:
+                pass
+            self.stderr.write(f"Bulk upload {job.pk} failed: {exc}")
+            return
+        self.stdout.write(f"Bulk upload {job.pk}: {job.result['message']}, {job.error_count} error(s)")
+
+    def run(self, job):
+        import pandas as pd
+
+        importer = self.IMPORTERS[job.kind]
+        sheet = BulkUploadSheet.objects.get(job=job)
+        df = pd.read_excel(io.BytesIO(b''.join(sheet.iter_content())))
+        if job.total_rows is None:
+            job.total_rows = len(df)
+            job.save_progress('total_rows')
+
+        # Each chunk commits together with the progress, so a re-claimed job resumes right after
+        # the last committed chunk; the slices keep the sheet's row index for "Row N" errors
+        chunk_rows = settings.REFERLY_BULK_UPLOAD['CHUNK_ROWS']
+        for start in range(job.processed_rows, len(df), chunk_rows):
+            chunk = df.iloc[start:start + chunk_rows]
+            with transaction.atomic():
+                job.result = importer.combine(job.result, importer.run(chunk), importer.message)
+                job.processed_rows = start + len(chunk)
+                job.error_count = job.result['errors']
+                job.save_progress('result', 'processed_rows', 'error_count')
+        if job.result is None:
+            # Empty sheet: still answer with the usual response body
+            job.result = importer.run(df)
+        job.finish(BulkUploadJob.STATUS_COMPLETED, result=job.result)
@@ -0,0 +1,33 @@
+from django.core.management.base import BaseCommand
+
+from Referly.models import Company
+from Referly.utils import DirectoryCache
+
+
+class Command(BaseCommand):
+    help = (
+        "Recompute the denormalized hr_contacts_count/jobs_count columns on Company "
+        "(after deploying the columns, or after editing contacts/jobs outside the app)"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--company', default=None, help='Only rebuild the counters of this company_id')
+        parser.add_argument('--batch-size', type=int, default=1000, help='Companies to update per statement')
+
+    def handle(self, *args, **options):
+        companies = Company.objects.order_by('pk')
+        if options['company']:
+            companies = companies.filter(company_id=options['company'])
+
+        rebuilt = 0
+        last_pk = 0
+        while True:
+            batch = list(companies.filter(pk__gt=last_pk).values_list('pk', flat=True)[:options['batch_size']])
+            if not batch:
+                break
+            last_pk = batch[-1]
+            # One UPDATE ... SET col = (SELECT COUNT(*) ...) per batch; .update() skips Company.save
+            rebuilt += Company.objects.filter(pk__in=batch).update(**Company.counter_values())
+        # Cached directory responses embed the counts
+        DirectoryCache.bump(Company)
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt counters of {rebuilt} company(ies)"))
@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+
+from Referly.models import DirectoryStat
+
+
+class Command(BaseCommand):
+    help = (
+        "Recompute the DirectoryStat rollup behind the company / HR contact stats endpoints from the tables "
+        "(after editing companies or contacts outside the app)"
+    )
+
+    def add_arguments(self, parser):
+        scopes = sorted(DirectoryStat.sources())
+        parser.add_argument('--only', choices=scopes, action='append', help='Restrict to these scopes (repeatable)')
+
+    def handle(self, *args, **options):
+        for scope in options['only'] or sorted(DirectoryStat.sources()):
+            stats = DirectoryStat.rebuild(scope)
+            self.stdout.write(f"{scope}: {len(stats)} stat(s), {stats['total']} row(s)")
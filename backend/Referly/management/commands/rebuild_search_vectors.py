@@ -0,0 +1,40 @@
+from django.core.management.base import BaseCommand
+
+from Referly.models import Company, HRContact, Job
+
+
+# Order matters: contacts and jobs only read the company name, not its vector
+TARGETS = {
+    'companies': Company,
+    'hr-contacts': HRContact,
+    'jobs': Job,
+}
+
+
+class Command(BaseCommand):
+    help = (
+        "Recompute the full-text search vectors of companies, HR contacts and jobs in batches "
+        "(after deploying the columns, or after bulk writes that bypass model signals)"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=5000, help='Rows to update per statement')
+        parser.add_argument('--only', choices=list(TARGETS), action='append', help='Restrict to these tables (repeatable)')
+        parser.add_argument('--missing', action='store_true', help='Only fill rows without a search vector')
+
+    def handle(self, *args, **options):
+        for name in options['only'] or list(TARGETS):
+            model = TARGETS[name]
+            rows = model.objects.order_by('pk')
+            if options['missing']:
+                rows = rows.filter(search_vector__isnull=True)
+            updated = 0
+            last_pk = 0
+            while True:
+                # Keyset batches keep each UPDATE (and its row locks) short
+                pks = list(rows.filter(pk__gt=last_pk).values_list('pk', flat=True)[:options['batch_size']])
+                if not pks:
+                    break
+                updated += model.objects.filter(pk__in=pks).update(search_vector=model.search_document())
+                last_pk = pks[-1]
+            self.stdout.write(self.style.SUCCESS(f"{name}: refreshed {updated} search vector(s)"))
@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from Referly.models import UserQuota
+
+
+class Command(BaseCommand):
+    help = (
+        "Recompute the materialized template/resume counters and per-user ID sequences on UserQuota "
+        "(after deploying the counter columns, or after editing is_active outside the app)"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', type=int, default=None, help='Only rebuild the quota of this user id')
+
+    def handle(self, *args, **options):
+        quotas = UserQuota.objects.select_related('user').order_by('id')
+        if options['user']:
+            quotas = quotas.filter(user_id=options['user'])
+
+        rebuilt = 0
+        for quota_id in quotas.values_list('id', flat=True).iterator():
+            with transaction.atomic():
+                quota = UserQuota.objects.select_for_update().select_related('user').get(pk=quota_id)
+                counters = UserQuota.counters_for(quota.user)
+                # Never move an ID sequence backwards: IDs of deleted rows are not reused
+                counters['next_template_id'] = max(counters['next_template_id'], quota.next_template_id)
+                counters['next_resume_id'] = max(counters['next_resume_id'], quota.next_resume_id)
+                UserQuota.objects.filter(pk=quota_id).update(**counters)
+            rebuilt += 1
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {rebuilt} quota(s)"))
@@ -0,0 +1,106 @@
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from Referly.converters import ConversionError, DocumentConverter, TextExtractor, ThumbnailGenerator
+from Referly.models import ResumeBlob, ResumeRendition
+from Referly.utils import FolderStructureManager
+
+
+class Command(BaseCommand):
+    help = (
+        "Worker that renders DOCX resumes to PDF/HTML previews, first-page thumbnails and plain text "
+        "off the request thread"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help='Drain the pending queue and exit')
+        parser.add_argument('--poll-interval', type=float, default=2.0, help='Seconds to sleep when idle')
+        parser.add_argument('--batch-size', type=int, default=5, help='Renditions claimed per poll')
+        parser.add_argument('--stale-minutes', type=int, default=15,
+                            help='Re-claim renditions stuck in "processing" (crashed worker) after this long')
+
+    def handle(self, *args, **options):
+        self.stdout.write("Render worker started")
+        while True:
+            claimed = self.claim(options['batch_size'], options['stale_minutes'])
+            for rendition in claimed:
+                self.render(rendition)
+            if not claimed:
+                if options['once']:
+                    break
+                time.sleep(options['poll_interval'])
+
+    def claim(self, batch_size, stale_minutes):
+        """Lock a batch of pending renditions so parallel workers never render the same one"""
+        now = timezone.now()
+        stale = now - timedelta(minutes=stale_minutes)
+        with transaction.atomic():
+            renditions = list(
+                ResumeRendition.objects.select_for_update(skip_locked=True)
+                .filter(Q(status=ResumeRendition.STATUS_PENDING) | Q(status=ResumeRendition.STATUS_PROCESSING, updated_at__lt=stale))
+                .order_by('created_at')[:batch_size]
+            )
+            ResumeRendition.objects.filter(id__in=[r.id for r in renditions]).update(
+                status=ResumeRendition.STATUS_PROCESSING, attempts=F('attempts') + 1, updated_at=now
+            )
+        for rendition in renditions:
+            rendition.attempts += 1
+        return renditions
+
+    def convert(self, rendition):
+        """Produce the rendition bytes; thumbnails of DOCX resumes are taken from their PDF rendition"""
+        source = ResumeBlob.objects.get(pk=rendition.source_blob_id)
+        if rendition.kind == 'text':
+            content = b''.join(source.iter_content())
+            if content[:4] == b'%PDF':
+                return TextExtractor.from_pdf(content)
+            return DocumentConverter.convert(content, 'docx', 'text')
+        if rendition.kind != 'thumbnail':
+            return DocumentConverter.convert(b''.join(source.iter_content()), 'docx', rendition.kind)
+
+        if b''.join(source.iter_content(end=3)) == b'%PDF':
+            pdf_blob = source
+        else:
+            pdf = ResumeRendition.objects.filter(
+                source_blob=source, kind='pdf', status=ResumeRendition.STATUS_READY, output_blob__isnull=False
+            ).select_related('output_blob').defer('output_blob__content').first()
+            if pdf is None:
+                raise ConversionError("PDF rendition is not available for the thumbnail")
+            pdf_blob = pdf.output_blob
+        return ThumbnailGenerator.first_page(b''.join(pdf_blob.iter_content()))
+
+    def render(self, rendition):
+        try:
+            output = self.convert(rendition)
+        except (ConversionError, ResumeBlob.DoesNotExist) as exc:
+            failed = rendition.attempts >= settings.REFERLY_RENDER_MAX_ATTEMPTS
+            ResumeRendition.objects.filter(pk=rendition.pk).update(
+                status=ResumeRendition.STATUS_FAILED if failed else ResumeRendition.STATUS_PENDING,
+                error=str(exc)[:2000],
+                updated_at=timezone.now(),
+            )
+            self.stderr.write(f"Rendition {rendition.pk} ({rendition.kind}) failed: {exc}")
+            return
+
+        # The rendition holds one reference on its output blob, released by gc_resume_blobs
+        output_blob = ResumeBlob.acquire(output)
+        with transaction.atomic():
+            previous = ResumeRendition.objects.select_for_update().get(pk=rendition.pk).output_blob_id
+            ResumeRendition.objects.filter(pk=rendition.pk).update(
+                status=ResumeRendition.STATUS_READY, output_blob=output_blob, error='', updated_at=timezone.now()
+            )
+            if previous:
+                ResumeBlob(pk=previous).release()
+            if rendition.kind == 'pdf':
+                # DOCX thumbnails are rasterized from the PDF we just produced
+                ResumeRendition.request(ResumeBlob(pk=rendition.source_blob_id), ['thumbnail'])
+        if rendition.kind == 'thumbnail':
+            # Queryset updates fire no signals; cached folder trees carry the thumbnail URL
+            FolderStructureManager.invalidate_for_blob(rendition.source_blob_id)
+        self.stdout.write(f"Rendered {rendition.kind} for blob {rendition.source_blob_id}")
@@ -0,0 +1,299 @@
+import re
+import threading
+import zlib
+from datetime import timedelta
+
+import numpy as np
+from django.conf import settings
+from django.core.cache import cache
+from django.utils import timezone
+
+from .models import Company, Job, ResumeRendition
+from .utils import DirectoryCache
+
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9][a-z0-9+#]*(?:\.[a-z0-9]+)*")
+STOP_WORDS = frozenset("""
+    a about above after again all also am an and any are as at be been being both but by can could did do does
+    doing during each few for from further had has have having he her here hers him his how i if in into is it
+    its itself just me more most my no nor not of off on once only or other our ours out over own same she should
+    so some such than that the their theirs them then there these they this those through to too under until up
+    very was we were what when where which while who whom why will with you your yours
+""".split())
+
+
+class MatchingNotReady(Exception):
+    """The resume's text hasn't been extracted (yet); `pending` is False when it never will be"""
+
+    def __init__(self, message, pending=True):
+        super().__init__(message)
+        self.pending = pending
+
+
+def term_counts(text):
+    """(sorted hashed term ids as int32, their counts as float32) of a text"""
+    dimensions = settings.REFERLY_MATCHING['DIMENSIONS']
+    hashes = np.fromiter(
+        (
+            zlib.crc32(token.encode('utf-8')) % dimensions
+            for token in TOKEN_PATTERN.findall(text.lower())
+            if len(token) > 1 and token not in STOP_WORDS
+        ),
+        dtype=np.int64,
+    )
+    indices, counts = np.unique(hashes, return_counts=True)
+    return indices.astype(np.int32), counts.astype(np.float32)
+
+
+def segment_sums(values, indptr):
+    """Per-row sums of CSR `values` (`np.add.reduceat` on the non-empty rows, 0 for empty ones)"""
+    sums = np.zeros(len(indptr) - 1, dtype=np.float32)
+    starts = indptr[:-1]
+    filled = starts < indptr[1:]
+    if filled.any():
+        sums[filled] = np.add.reduceat(values, starts[filled])
+    return sums
+
+
+def stack_rows(rows):
+    """CSR (indptr, indices, values) from a list of (indices, values) rows"""
+    indptr = np.zeros(len(rows) + 1, dtype=np.int64)
+    np.cumsum([len(indices) for indices, _ in rows], out=indptr[1:])
+    if not indptr[-1]:
+        return indptr, np.zeros(0, dtype=np.int32), np.zeros(0, dtype=np.float32)
+    return (
+        indptr,
+        np.concatenate([indices for indices, _ in rows]),
+        np.concatenate([values for _, values in rows]),
+    )
+
+
+class MatchIndex:
+    """
+    Immutable TF-IDF snapshot of the active jobs.
+    A job's document is its title plus its company's profile, so instead of one row per job the matrix
+    keeps one sparse row per title and per company (CSR arrays) and two small int arrays mapping each job
+    to them. Cosine similarity of a resume against every job is then two sparse mat-vec products and a
+    gather; job norms (which need the title x company cross terms) are precomputed.
+    """
+
+    def __init__(self, versions, companies, jobs):
+        self.versions = versions
+        dimensions = settings.REFERLY_MATCHING['DIMENSIONS']
+        title_weight = settings.REFERLY_MATCHING['TITLE_WEIGHT']
+
+        company_pks = list(companies)
+        company_row = {pk: row for row, pk in enumerate(company_pks)}
+        titles = sorted({title for _, title in jobs.values()})
+        title_row = {title: row for row, title in enumerate(titles)}
+        # Jobs of deactivated companies aren't offered
+        listed = [
+            (pk, company_row[company], title_row[title])
+            for pk, (company, title) in jobs.items() if company in company_row
+        ]
+        self.job_pks = np.array([pk for pk, _, _ in listed], dtype=np.int64)
+        self.job_company = np.array([row for _, row, _ in listed], dtype=np.int32)
+        self.job_title = np.array([row for _, _, row in listed], dtype=np.int32)
+
+        self.company_indptr, self.company_indices, company_counts = stack_rows([companies[pk] for pk in company_pks])
+        labels = dict(Job.JOB_TYPE_CHOICES)
+        self.title_indptr, self.title_indices, title_counts = stack_rows([
+            (indices, counts * np.float32(title_weight))
+            for indices, counts in (term_counts(labels.get(title, title.replace('-', ' '))) for title in titles)
+        ])
+
+        # Document frequency over the job documents: a company's terms occur in each of its jobs, a title's
+        # in each job with that title, and a term in both a job's title and its company counts once
+        total = len(listed)
+        company_jobs = np.bincount(self.job_company, minlength=len(company_pks)).astype(np.float64)
+        title_jobs = np.bincount(self.job_title, minlength=len(titles)).astype(np.float64)
+        frequency = np.bincount(
+            self.company_indices, weights=np.repeat(company_jobs, np.diff(self.company_indptr)), minlength=dimensions
+        ) + np.bincount(
+            self.title_indices, weights=np.repeat(title_jobs, np.diff(self.title_indptr)), minlength=dimensions
+        )
+        in_title = np.zeros(dimensions, dtype=bool)
+        for row in range(len(titles)):
+            start, end = self.title_indptr[row], self.title_indptr[row + 1]
+            in_title[self.title_indices[start:end]] = True
+            # Jobs with this title per company, spread over the company's postings that are title terms too
+            pair_jobs = np.bincount(self.job_company[self.job_title == row], minlength=len(company_pks))
+            shared = in_title[self.company_indices]
+            frequency -= np.bincount(
+                self.company_indices[shared],
+                weights=np.repeat(pair_jobs, np.diff(self.company_indptr))[shared],
+                minlength=dimensions,
+            )
+            in_title[self.title_indices[start:end]] = False
+        self.idf = (np.log((1 + total) / (1 + frequency)) + 1).astype(np.float32)
+
+        self.company_weights = company_counts * self.idf[self.company_indices]
+        self.title_weights = title_counts * self.idf[self.title_indices]
+        company_squares = segment_sums(self.company_weights ** 2, self.company_indptr)
+        title_squares = segment_sums(self.title_weights ** 2, self.title_indptr)
+        # |title + company|^2 = |title|^2 + |company|^2 + 2 title.company, for the pairs that exist
+        cross = np.zeros(len(listed), dtype=np.float32)
+        dense = np.zeros(dimensions, dtype=np.float32)
+        for row in range(len(titles)):
+            start, end = self.title_indptr[row], self.title_indptr[row + 1]
+            dense[self.title_indices[start:end]] = self.title_weights[start:end]
+            dots = segment_sums(self.company_weights * dense[self.company_indices], self.company_indptr)
+            dense[self.title_indices[start:end]] = 0
+            selected = self.job_title == row
+            cross[selected] = dots[self.job_company[selected]]
+        self.job_norms = np.sqrt(title_squares[self.job_title] + company_squares[self.job_company] + 2 * cross)
+
+        # Company rows again, grouped by term (postings), so a query only reads the resume's terms
+        order = np.argsort(self.company_indices, kind='stable')
+        self.posting_rows = np.repeat(
+            np.arange(len(company_pks), dtype=np.int32), np.diff(self.company_indptr)
+        )[order]
+        self.posting_weights = self.company_weights[order]
+        self.posting_ptr = np.searchsorted(self.company_indices[order], np.arange(dimensions + 1))
+        self.company_count = len(company_pks)
+
+    def company_dots(self, indices, weights):
+        """Dot product of every company row with a sparse query, reading only the query terms' postings"""
+        starts = self.posting_ptr[indices]
+        lengths = self.posting_ptr[indices + 1] - starts
+        total = int(lengths.sum())
+        if not total:
+            return np.zeros(self.company_count, dtype=np.float32)
+        # Positions of all the postings, concatenated: start of each run + offset inside it
+        offsets = np.arange(total) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+        positions = np.repeat(starts, lengths) + offsets
+        return np.bincount(
+            self.posting_rows[positions],
+            weights=self.posting_weights[positions] * np.repeat(weights, lengths),
+            minlength=self.company_count,
+        ).astype(np.float32)
+
+    def __len__(self):
+        return len(self.job_pks)
+
+    def top(self, indices, counts, limit):
+        """[(job pk, cosine similarity)] of the `limit` best jobs for a resume's term counts, best first"""
+        if not len(self.job_pks) or not len(indices):
+            return []
+        weights = counts * self.idf[indices]
+        norm = np.sqrt(np.dot(weights, weights))
+        company_dots = self.company_dots(indices, weights)
+        dense = np.zeros(len(self.idf), dtype=np.float32)
+        dense[indices] = weights
+        title_dots = segment_sums(self.title_weights * dense[self.title_indices], self.title_indptr)
+        denominator = self.job_norms * norm
+        scores = np.divide(
+            title_dots[self.job_title] + company_dots[self.job_company], denominator,
+            out=np.zeros(len(self.job_pks), dtype=np.float32), where=denominator > 0,
+        )
+        limit = min(limit, len(scores))
+        best = np.argpartition(-scores, limit - 1)[:limit]
+        best = best[np.argsort(-scores[best], kind='stable')]
+        return [(int(pk), float(score)) for pk, score in zip(self.job_pks[best], scores[best])]
+
+
+class JobMatcher:
+    """
+    Ranks active jobs against a resume's extracted text.
+    Each process keeps the parsed term counts of the active companies and jobs and a `MatchIndex` built
+    from them. Writes to companies or jobs change their `DirectoryCache.versions` (counters in the shared
+    cache, or in DirectoryStat without one: one indexed read per request); the next request then re-reads only
+    the rows updated since the previous refresh (falling back to a full load when rows were deleted)
+    and swaps in a new index.
+    """
+    MODELS = (Company, Job)
+
+    _lock = threading.Lock()
+    _index = None
+    _companies = None  # pk -> term counts of name + about_us
+    _jobs = None  # pk -> (company pk, title)
+    _watermark = None
+
+    @staticmethod
+    def company_terms(name, about_us):
+        return term_counts(f"{name}\n{about_us}")
+
+    @classmethod
+    def index(cls):
+        versions = DirectoryCache.versions(cls.MODELS)
+        index = cls._index
+        if index is not None and index.versions == versions:
+            return index
+        with cls._lock:
+            if cls._index is not None and cls._index.versions == versions:
+                return cls._index
+            started = timezone.now()
+            if cls._companies is None or not cls._refresh():
+                cls._load()
+            cls._watermark = started
+            cls._index = MatchIndex(versions, cls._companies, cls._jobs)
+            return cls._index
+
+    @classmethod
+    def _load(cls):
+        cls._companies = {
+            pk: cls.company_terms(name, about_us)
+            for pk, name, about_us in Company.objects.filter(is_active=True).order_by().values_list(
+                'pk', 'name', 'about_us'
+            ).iterator(chunk_size=2000)
+        }
+        cls._jobs = {
+            pk: (company, title)
+            for pk, company, title in Job.objects.filter(is_active=True).order_by().values_list(
+                'pk', 'company_id', 'title'
+            ).iterator(chunk_size=10000)
+        }
+
+    @classmethod
+    def _refresh(cls):
+        """Apply rows updated since the last refresh; False when the counts show rows were deleted"""
+        since = cls._watermark - timedelta(seconds=settings.REFERLY_MATCHING['REFRESH_OVERLAP'])
+        for pk, name, about_us, is_active in Company.objects.filter(updated_at__gte=since).values_list(
+            'pk', 'name', 'about_us', 'is_active'
+        ):
+            if is_active:
+                cls._companies[pk] = cls.company_terms(name, about_us)
+            else:
+                cls._companies.pop(pk, None)
+        for pk, company, title, is_active in Job.objects.filter(updated_at__gte=since).values_list(
+            'pk', 'company_id', 'title', 'is_active'
+        ):
+            if is_active:
+                cls._jobs[pk] = (company, title)
+            else:
+                cls._jobs.pop(pk, None)
+        return (
+            Company.objects.filter(is_active=True).count() == len(cls._companies)
+            and Job.objects.filter(is_active=True).count() == len(cls._jobs)
+        )
+
+    @staticmethod
+    def resume_terms(resume):
+        """Term counts of the resume's extracted text, cached per text content"""
+        if not resume.blob_id:
+            raise MatchingNotReady("Resume content has not been moved to blob storage yet", pending=False)
+        rendition = resume.get_rendition('text')
+        if rendition is None:
+            # Uploaded before matching existed: extract now
+            ResumeRendition.request(resume.blob, ['text'])
+            raise MatchingNotReady("Resume text is being extracted")
+        if rendition.status == ResumeRendition.STATUS_FAILED:
+            raise MatchingNotReady("Resume text could not be extracted", pending=False)
+        if rendition.status != ResumeRendition.STATUS_READY:
+            raise MatchingNotReady("Resume text is being extracted")
+
+        key = f"referly:matching:resume:{rendition.output_blob.sha256}:{settings.REFERLY_MATCHING['DIMENSIONS']}"
+        packed = cache.get(key)
+        if packed is None:
+            text = b''.join(rendition.output_blob.iter_content()).decode('utf-8', 'replace')
+            indices, counts = term_counts(text)
+            cache.set(key, indices.tobytes() + counts.tobytes(), settings.REFERLY_MATCHING['RESUME_CACHE_TIMEOUT'])
+            return indices, counts
+        size = len(packed) // 8
+        return np.frombuffer(packed, dtype=np.int32, count=size), np.frombuffer(packed, dtype=np.float32, offset=4 * size)
+
+    @classmethod
+    def top_jobs(cls, resume, limit):
+        """[(job pk, score)] best first; raises MatchingNotReady until the resume text is available"""
+        indices, counts = cls.resume_terms(resume)
+        return cls.index().top(indices, counts, limit)
@@ -1,14 +1,41 @@
-from django.db import models
+from django.conf import settings
+from django.db import IntegrityError, connection, models, transaction
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVector, SearchVectorField
+from django.db.models import Count, ExpressionWrapper, F, Func, Max, OuterRef, Q, Subquery, Value
+from django.db.models.functions import Coalesce, Greatest
 from django.contrib.auth.models import User
+from django.utils import timezone
+from datetime import timedelta
+import hashlib
+import logging
+import tempfile
+import uuid
+import zlib
+
+from .compiler import TemplateCompiler
+from .fields import CompressedBinaryField, CompressedTextField, HEADER_SIZE, FORMAT_RAW, stored_format
+from .storage import get_resume_storage, DEFAULT_CHUNK_SIZE
 
 # Create your models here.
 
+logger = logging.getLogger(__name__)
+
+# Text search configuration used for both the stored tsvectors and incoming queries
+SEARCH_CONFIG = 'english'
+
+
 class Template(models.Model):
     """Template model for storing HTML email templates"""
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='referly_templates')
     user_template_id = models.PositiveIntegerField()  # Auto-increment per user (1, 2, 3...)
     name = models.CharField(max_length=255)
-    html_content = models.TextField()  # Store HTML as string
+    html_content = CompressedTextField()  # HTML, stored compressed
+    content_hash = models.CharField(max_length=64, blank=True, default='')  # SHA-256 of html_content (ETag)
+    size = models.PositiveIntegerField(default=0)  # UTF-8 byte size of html_content, kept in sync on save
+    compiled_html = models.TextField(blank=True, default='')  # Sanitized, CSS-inlined, minified HTML used for sending
+    variables = models.JSONField(default=list, blank=True)  # Placeholder names found in compiled_html
+    compiled_hash = models.CharField(max_length=64, blank=True, default='')  # content_hash the artifact was built from
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     is_active = models.BooleanField(default=True)
@@ -18,28 +45,245 @@ class Template(models.Model):
         unique_together = [['user', 'user_template_id'], ['user', 'name']]
         ordering = ['user', 'user_template_id']
         
+    @staticmethod
+    def hash_content(encoded):
+        return hashlib.sha256(encoded).hexdigest()
+
+    def compile(self):
+        """Refresh the derived columns (hash, size, compiled artifact) from html_content"""
+        encoded = self.html_content.encode('utf-8')
+        self.content_hash = self.hash_content(encoded)
+        self.size = len(encoded)
+        if self.compiled_hash != self.content_hash:
+            self.compiled_html, self.variables = TemplateCompiler.compile(self.html_content)
+            self.compiled_hash = self.content_hash
+
     def save(self, *args, **kwargs):
-        if not self.user_template_id:
-            # Auto-assign next template ID for this user
-            last_template = Template.objects.filter(user=self.user).order_by('-user_template_id').first()
-            self.user_template_id = (last_template.user_template_id + 1) if last_template else 1
-        super().save(*args, **kwargs)
+        update_fields = kwargs.get('update_fields')
+        html_field = self._meta.get_field('html_content')
+        # Content loaded but never accessed can't have changed: skip decompressing it
+        if (update_fields is None or 'html_content' in update_fields) and not html_field.is_untouched(self):
+            self.compile()
+        if update_fields is not None and 'html_content' in update_fields:
+            kwargs['update_fields'] = set(update_fields) | {
+                'content_hash', 'size', 'compiled_html', 'variables', 'compiled_hash'
+            }
+        if not self._state.adding:
+            super().save(*args, **kwargs)
+            return
+        # New rows take their per-user ID and quota slot from the locked UserQuota row;
+        # a failed insert rolls both back
+        with transaction.atomic():
+            allocated_id = UserQuota.allocate(self.user, 'template', count=self.is_active)
+            if not self.user_template_id:
+                self.user_template_id = allocated_id
+            super().save(*args, **kwargs)
+
+    def render(self, context):
+        """Personalize the compiled template: placeholder substitution only, no HTML parsing"""
+        if self.compiled_hash != self.content_hash:
+            # Row written behind the model's back (raw update / not yet backfilled)
+            self.compile()
+        plan = TemplateCompiler.render_plan((self.pk, self.updated_at), self.compiled_html)
+        return TemplateCompiler.render(plan, context)
+
+    def render_many(self, contexts):
+        """Mail merge: yield one rendered HTML per recipient context"""
+        for context in contexts:
+            yield self.render(context)
+
+    def soft_delete(self):
+        """Mark the template inactive and free its quota slot (idempotent)"""
+        with transaction.atomic():
+            if Template.objects.filter(pk=self.pk, is_active=True).update(is_active=False):
+                UserQuota.release(self.user_id, 'template')
+        self.is_active = False
     
     def __str__(self):
         return f"Template #{self.user_template_id}: {self.name} (User: {self.user.username})"
 
 
+RESUME_MIME_TYPES = {
+    'pdf': 'application/pdf',
+    'docx': 'application/vnd.openxmlformats-officedocument.wordprocessingml.document',
+}
+
+# Leading bytes every valid upload of that type starts with (PDF header / ZIP local file header)
+RESUME_SIGNATURES = {
+    'pdf': b'%PDF-',
+    'docx': b'PK\x03\x04',
+}
+
+MAX_RESUME_SIZE = 5 * 1024 * 1024  # 5MB
+
+
+def _iter_bytes(content, chunk_size):
+    """Yield chunks from bytes or a binary file-like object"""
+    if isinstance(content, (bytes, bytearray, memoryview)):
+        view = memoryview(content)
+        for offset in range(0, len(view), chunk_size):
+            yield bytes(view[offset:offset + chunk_size])
+        return
+    yield from iter(lambda: content.read(chunk_size), b'')
+
+
+class ResumeBlobManager(models.Manager):
+    """Default manager that never pulls the blob bytes unless they are accessed"""
+
+    def get_queryset(self):
+        return super().get_queryset().defer('content')
+
+
+class ResumeBlob(models.Model):
+    """
+    Content-addressed resume bytes keyed by SHA-256.
+    Identical uploads share one blob; `ref_count` tracks how many active resumes point at it.
+    """
+    sha256 = models.CharField(max_length=64, unique=True)
+    size = models.PositiveIntegerField()  # Size in bytes
+    content = CompressedBinaryField(null=True, blank=True)  # Bytes when using the database backend (compressed)
+    storage_key = models.CharField(max_length=255, blank=True, default='')  # Object key in external storage
+    ref_count = models.IntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    objects = ResumeBlobManager()
+
+    class Meta:
+        db_table = 'referly_resumeblob'
+
+    @staticmethod
+    def digest(content):
+        """Return (sha256 hex digest, size) of bytes or a seekable file-like object"""
+        sha = hashlib.sha256()
+        size = 0
+        for chunk in _iter_bytes(content, DEFAULT_CHUNK_SIZE):
+            sha.update(chunk)
+            size += len(chunk)
+        if hasattr(content, 'seek'):
+            content.seek(0)
+        return sha.hexdigest(), size
+
+    @classmethod
+    def acquire(cls, content):
+        """
+        Store bytes (or a file-like object) once and return the blob with one more reference.
+        Re-uploading identical bytes only bumps the reference count.
+        """
+        sha256, size = cls.digest(content)
+        with transaction.atomic():
+            blob, _ = cls.objects.select_for_update().get_or_create(sha256=sha256, defaults={'size': size})
+            if not blob.storage_key and not cls.objects.filter(pk=blob.pk, content__isnull=False).exists():
+                blob._write(content)
+            cls.objects.filter(pk=blob.pk).update(ref_count=F('ref_count') + 1)
+        return blob
+
+    def release(self):
+        """Drop one reference; orphans (ref_count <= 0) are reclaimed by `gc_resume_blobs`"""
+        ResumeBlob.objects.filter(pk=self.pk).update(ref_count=F('ref_count') - 1)
+
+    def _write(self, content):
+        storage = get_resume_storage()
+        if storage is None:
+            self.content = bytes(content) if isinstance(content, (bytes, bytearray, memoryview)) else content.read()
+            self.save(update_fields=['content'])
+            return
+
+        # Deterministic key: concurrent writers of the same bytes produce the same object
+        self.storage_key = self.storage_key_for(self.sha256)
+        storage.save(self.storage_key, content)
+        self.save(update_fields=['storage_key'])
+
+    @staticmethod
+    def storage_key_for(sha256):
+        return f"blobs/{sha256[:2]}/{sha256}"
+
+    @classmethod
+    def discard_orphan(cls, sha256):
+        """
+        Delete the storage object an `acquire` of `sha256` wrote in a transaction that then rolled back,
+        unless a concurrent upload of the same bytes has committed a blob pointing at it. The row lock
+        orders this with such uploads; call it after the rollback.
+        """
+        storage = get_resume_storage()
+        if storage is None:
+            return
+        with transaction.atomic():
+            blob, created = cls.objects.select_for_update().get_or_create(sha256=sha256, defaults={'size': 0})
+            if created:
+                storage.delete(cls.storage_key_for(sha256))
+                blob.delete()
+
+    @staticmethod
+    def _substr(position, length):
+        return Func(F('content'), Value(position), Value(length), function='SUBSTR', output_field=models.BinaryField())
+
+    def iter_content(self, chunk_size=None, start=0, end=None):
+        """
+        Yield the blob bytes in chunks without materialising the whole file.
+        `start`/`end` select an inclusive byte range (HTTP Range requests).
+        """
+        chunk_size = chunk_size or DEFAULT_CHUNK_SIZE
+        if self.storage_key:
+            yield from get_resume_storage(required=True).open(self.storage_key, chunk_size, start=start, end=end)
+            return
+
+        if start or end is not None:
+            # Let Postgres slice the bytea so only the requested range leaves the database.
+            # Only possible for bytes stored uncompressed (the usual case for PDF/DOCX),
+            # so the header is fetched along with the slice.
+            length = (self.size if end is None else end + 1) - start
+            head, part = ResumeBlob.objects.filter(pk=self.pk).annotate(
+                head=self._substr(1, HEADER_SIZE),
+                part=self._substr(start + 1 + HEADER_SIZE, length),
+            ).values_list('head', 'part').get()
+            fmt = stored_format(bytes(head or b''))
+            if fmt == FORMAT_RAW:
+                content = part
+            elif fmt is None:
+                # Legacy row without a header (until `compress_stored_content` rewrites it)
+                content = ResumeBlob.objects.filter(pk=self.pk).annotate(
+                    part=self._substr(start + 1, length)
+                ).values_list('part', flat=True).get()
+            else:
+                content = self.content[start:start + length]
+        else:
+            content = self.content
+        yield from _iter_bytes(content or b'', chunk_size)
+
+    def delete_content(self):
+        """Remove the stored object from external storage"""
+        if self.storage_key:
+            get_resume_storage(required=True).delete(self.storage_key)
+
+    def __str__(self):
+        return f"Blob {self.sha256[:12]} ({self.size} bytes, {self.ref_count} refs)"
+
+
+class ResumeManager(models.Manager):
+    """Default manager that never pulls the file bytes unless they are accessed"""
+
+    def get_queryset(self):
+        return super().get_queryset().defer('file_content')
+
+    def with_blob(self):
+        """Join the blob metadata (hash, storage key) without its bytes"""
+        return self.get_queryset().select_related('blob').defer('blob__content')
+
+
 class Resume(models.Model):
-    """Resume model for storing PDF/DOCX files as binary data"""
+    """Resume model for storing PDF/DOCX file metadata; bytes live in a shared ResumeBlob"""
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='referly_resumes')
     user_resume_id = models.PositiveIntegerField()  # Auto-increment per user (1, 2, 3...)
     name = models.CharField(max_length=255)
     file_extension = models.CharField(max_length=10)  # "pdf" or "docx"
-    file_content = models.BinaryField()  # BLOB storage for actual file
+    blob = models.ForeignKey(ResumeBlob, on_delete=models.SET_NULL, null=True, blank=True, related_name='resumes')
+    file_content = CompressedBinaryField(null=True, blank=True)  # Legacy BLOB storage, moved by `migrate_resume_blobs`
     file_size = models.PositiveIntegerField()  # Track file size in bytes
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     is_active = models.BooleanField(default=True)
+
+    objects = ResumeManager()
     
     class Meta:
         db_table = 'referly_resume'
@@ -47,39 +291,429 @@ class Resume(models.Model):
         ordering = ['user', 'user_resume_id']
         
     def save(self, *args, **kwargs):
-        if not self.user_resume_id:
-            # Auto-assign next resume ID for this user
-            last_resume = Resume.objects.filter(user=self.user).order_by('-user_resume_id').first()
-            self.user_resume_id = (last_resume.user_resume_id + 1) if last_resume else 1
-        super().save(*args, **kwargs)
+        if not self._state.adding:
+            super().save(*args, **kwargs)
+            return
+        # Per-user ID and quota slot come from the locked UserQuota row (see Template.save)
+        with transaction.atomic():
+            allocated_id = UserQuota.allocate(self.user, 'resume', count=self.is_active)
+            if not self.user_resume_id:
+                self.user_resume_id = allocated_id
+            super().save(*args, **kwargs)
+
+    @property
+    def mime_type(self):
+        return RESUME_MIME_TYPES.get(self.file_extension, 'application/octet-stream')
+
+    @classmethod
+    def upload(cls, user, name, file_extension, content, file_size):
+        """Create a resume from uploaded bytes (or a seekable file) and queue its renditions"""
+        resume = cls(user=user, name=name, file_extension=file_extension, file_size=file_size)
+        # Identical bytes are stored once; only metadata goes to the resume row
+        resume.store_content(content)
+        try:
+            resume.save()
+        except Exception:
+            resume.blob.release()
+            raise
+
+        # Picked up by the `render_resumes` worker; identical files reuse earlier renders.
+        # DOCX thumbnails are queued once their PDF rendition exists. The text feeds job matching.
+        if file_extension == 'docx':
+            ResumeRendition.request(resume.blob, [*settings.REFERLY_DOCX_RENDITIONS, 'text'])
+        else:
+            ResumeRendition.request(resume.blob, ['thumbnail', 'text'])
+        return resume
+
+    def store_content(self, content):
+        """Point this resume at the (deduplicated) blob holding `content`"""
+        self.blob = ResumeBlob.acquire(content)
+        self.file_content = None
+
+    def soft_delete(self):
+        """
+        Mark the resume inactive, drop its blob reference and free its quota slot.
+        Safe to call more than once: only the call that flips is_active releases.
+        """
+        with transaction.atomic():
+            released = Resume.objects.filter(pk=self.pk, is_active=True).update(is_active=False)
+            if released:
+                UserQuota.release(self.user_id, 'resume')
+                if self.blob_id:
+                    ResumeBlob(pk=self.blob_id).release()
+        self.is_active = False
+
+    def iter_content(self, chunk_size=None, start=0, end=None):
+        """Yield the resume bytes (or the inclusive range start..end) in chunks"""
+        if self.blob_id:
+            yield from self.blob.iter_content(chunk_size, start=start, end=end)
+            return
+        content = memoryview(self.file_content or b'')[start:None if end is None else end + 1]
+        yield from _iter_bytes(content, chunk_size or DEFAULT_CHUNK_SIZE)
+
+    def read_content(self):
+        """Return the full resume bytes (email attachments, base64 previews)"""
+        return b''.join(self.iter_content())
+
+    def get_rendition(self, kind):
+        """Return the rendition of this resume's content, or None when none was requested"""
+        if not self.blob_id:
+            return None
+        return ResumeRendition.objects.select_related('output_blob').defer('output_blob__content').filter(
+            source_blob_id=self.blob_id, kind=kind
+        ).first()
     
     def __str__(self):
         return f"Resume #{self.user_resume_id}: {self.name}.{self.file_extension} (User: {self.user.username})"
 
 
+class ResumeRendition(models.Model):
+    """
+    Rendered artifact (PDF/HTML preview, thumbnail, extracted text) of a resume blob, produced by the
+    `render_resumes` worker.
+    Keyed on the source blob, so identical uploads are rendered once.
+    """
+    KIND_CHOICES = [
+        ('pdf', 'PDF'),
+        ('html', 'HTML'),
+        ('thumbnail', 'First-page thumbnail'),
+        ('text', 'Extracted text'),
+    ]
+    STATUS_PENDING = 'pending'
+    STATUS_PROCESSING = 'processing'
+    STATUS_READY = 'ready'
+    STATUS_FAILED = 'failed'
+    STATUS_CHOICES = [
+        (STATUS_PENDING, 'Pending'),
+        (STATUS_PROCESSING, 'Processing'),
+        (STATUS_READY, 'Ready'),
+        (STATUS_FAILED, 'Failed'),
+    ]
+    MIME_TYPES = {
+        'pdf': 'application/pdf',
+        'html': 'text/html; charset=utf-8',
+        'thumbnail': 'image/webp',
+        'text': 'text/plain; charset=utf-8',
+    }
+    EXTENSIONS = {
+        'pdf': 'pdf',
+        'html': 'html',
+        'thumbnail': 'webp',
+        'text': 'txt',
+    }
+
+    source_blob = models.ForeignKey(ResumeBlob, on_delete=models.CASCADE, related_name='renditions')
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default=STATUS_PENDING)
+    output_blob = models.ForeignKey(ResumeBlob, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    attempts = models.PositiveIntegerField(default=0)
+    error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'referly_resumerendition'
+        unique_together = [['source_blob', 'kind']]
+        indexes = [models.Index(fields=['status', 'updated_at'])]
+
+    @property
+    def mime_type(self):
+        return self.MIME_TYPES[self.kind]
+
+    @property
+    def extension(self):
+        return self.EXTENSIONS[self.kind]
+
+    @classmethod
+    def request(cls, blob, kinds):
+        """Queue renditions for a blob; already rendered (or queued) kinds are left alone"""
+        for kind in kinds:
+            cls.objects.get_or_create(source_blob=blob, kind=kind)
+
+    def __str__(self):
+        return f"{self.kind} rendition of {self.source_blob_id} ({self.status})"
+
+
+class UploadSessionError(Exception):
+    """Raised when a chunk or finalize request doesn't fit the upload session"""
+
+
+class ChunkOutOfOrder(UploadSessionError):
+    """The chunk is ahead of what the server has received; the client should resume from `expected`"""
+
+    def __init__(self, message, expected):
+        super().__init__(message)
+        self.expected = expected
+
+
+class ResumeUploadSession(models.Model):
+    """
+    Resumable, chunked resume upload: chunks are PUT in order and written to storage as they arrive,
+    so a dropped connection only loses the chunk in flight.
+    """
+    STATUS_OPEN = 'open'
+    STATUS_COMPLETED = 'completed'
+    STATUS_CHOICES = [
+        (STATUS_OPEN, 'Open'),
+        (STATUS_COMPLETED, 'Completed'),
+    ]
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='referly_upload_sessions')
+    name = models.CharField(max_length=255)
+    file_extension = models.CharField(max_length=10)  # "pdf" or "docx"
+    total_size = models.PositiveIntegerField()  # Declared size in bytes
+    chunk_size = models.PositiveIntegerField()
+    received_bytes = models.PositiveIntegerField(default=0)
+    next_chunk = models.PositiveIntegerField(default=0)  # Index of the next chunk expected
+    crc32 = models.PositiveBigIntegerField(default=0)  # Running CRC-32 of the bytes received so far
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=STATUS_OPEN)
+    resume = models.ForeignKey('Resume', on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    expires_at = models.DateTimeField()
+
+    class Meta:
+        db_table = 'referly_resumeuploadsession'
+        indexes = [models.Index(fields=['status', 'expires_at'])]
+
+    def save(self, *args, **kwargs):
+        if not self.expires_at:
+            self.expires_at = timezone.now() + timedelta(hours=settings.REFERLY_UPLOAD_SESSION_TTL_HOURS)
+        super().save(*args, **kwargs)
+
+    @property
+    def total_chunks(self):
+        return -(-self.total_size // self.chunk_size)
+
+    @property
+    def is_expired(self):
+        return self.expires_at <= timezone.now()
+
+    def expected_chunk_size(self, index):
+        if index == self.total_chunks - 1:
+            return self.total_size - index * self.chunk_size
+        return self.chunk_size
+
+    def write_chunk(self, index, data, crc32=None):
+        """
+        Validate and store chunk `index`. Re-sending an already stored chunk is a no-op,
+        so clients can simply retry the last chunk after a disconnect.
+        """
+        with transaction.atomic():
+            session = ResumeUploadSession.objects.select_for_update().get(pk=self.pk)
+            if session.status != self.STATUS_OPEN or session.is_expired:
+                raise UploadSessionError("Upload session is no longer open.")
+            if index >= session.total_chunks:
+                raise UploadSessionError(f"Chunk index out of range (0-{session.total_chunks - 1}).")
+            if len(data) != session.expected_chunk_size(index):
+                raise UploadSessionError(
+                    f"Chunk {index} must be {session.expected_chunk_size(index)} bytes, got {len(data)}."
+                )
+            if crc32 is not None and zlib.crc32(data) != crc32:
+                raise UploadSessionError(f"Checksum mismatch for chunk {index}.")
+            if index < session.next_chunk:
+                return session
+            if index > session.next_chunk:
+                raise ChunkOutOfOrder(f"Expected chunk {session.next_chunk}.", expected=session.next_chunk)
+            if index == 0 and not data.startswith(RESUME_SIGNATURES[session.file_extension]):
+                raise UploadSessionError(f"File content is not a valid {session.file_extension.upper()} document.")
+
+            ResumeUploadChunk(session=session, index=index, size=len(data)).write(data)
+            ResumeUploadSession.objects.filter(pk=session.pk).update(
+                received_bytes=F('received_bytes') + len(data),
+                next_chunk=F('next_chunk') + 1,
+                crc32=zlib.crc32(data, session.crc32),
+                updated_at=timezone.now(),
+            )
+            session.refresh_from_db()
+        return session
+
+    def assemble(self):
+        """Concatenate the stored chunks into a seekable temporary file (spooled to disk when large)"""
+        output = tempfile.SpooledTemporaryFile(max_size=settings.REFERLY_UPLOAD_CHUNK_SIZE * 4)
+        for chunk in self.chunks.order_by('index'):
+            for piece in chunk.iter_content():
+                output.write(piece)
+        output.seek(0)
+        return output
+
+    def finalize(self, sha256=None):
+        """Turn a fully received session into a Resume (raises QuotaExceeded when the user is full)"""
+        uploaded = None
+        try:
+            with transaction.atomic():
+                session = ResumeUploadSession.objects.select_for_update().get(pk=self.pk)
+                if session.status == self.STATUS_COMPLETED and session.resume_id:
+                    return session.resume
+                if session.status != self.STATUS_OPEN or session.is_expired:
+                    raise UploadSessionError("Upload session is no longer open.")
+                if session.received_bytes != session.total_size:
+                    raise UploadSessionError(
+                        f"Upload incomplete: {session.received_bytes} of {session.total_size} bytes received."
+                    )
+
+                quota = UserQuota.for_user(session.user)
+                if not quota.can_create_resume():
+                    # Checked before assembling so nothing is written for a doomed upload
+                    raise QuotaExceeded(f"Resume limit reached. Maximum {quota.max_resumes} resumes allowed.")
+
+                with session.assemble() as content:
+                    digest = ResumeBlob.digest(content)[0]
+                    if sha256 and digest != sha256.lower():
+                        raise UploadSessionError("SHA-256 of the assembled file does not match.")
+                    uploaded = digest
+                    resume = Resume.upload(
+                        session.user, session.name, session.file_extension, content, session.total_size
+                    )
+                ResumeUploadSession.objects.filter(pk=session.pk).update(
+                    status=self.STATUS_COMPLETED, resume=resume, updated_at=timezone.now()
+                )
+                session.discard_chunks()
+        except Exception:
+            if uploaded:
+                # e.g. QuotaExceeded from a concurrent upload taking the last slot: the blob row is
+                # rolled back, the storage object Resume.upload wrote is not
+                ResumeBlob.discard_orphan(uploaded)
+            raise
+        return resume
+
+    def discard_chunks(self):
+        """Delete the staged chunks; their storage objects go once the deletion commits"""
+        storage_keys = [key for key in self.chunks.values_list('storage_key', flat=True) if key]
+        self.chunks.all().delete()
+        if storage_keys:
+            transaction.on_commit(lambda: ResumeUploadChunk.delete_objects(storage_keys))
+
+    def __str__(self):
+        return f"Upload {self.id} ({self.received_bytes}/{self.total_size} bytes, {self.status})"
+
+
+class ResumeUploadChunk(models.Model):
+    """One received chunk of an upload session, staged in the configured storage until finalize"""
+    session = models.ForeignKey(ResumeUploadSession, on_delete=models.CASCADE, related_name='chunks')
+    index = models.PositiveIntegerField()
+    size = models.PositiveIntegerField()
+    content = models.BinaryField(null=True, blank=True)  # Bytes when using the database backend
+    storage_key = models.CharField(max_length=255, blank=True, default='')
+
+    class Meta:
+        db_table = 'referly_resumeuploadchunk'
+        unique_together = [['session', 'index']]
+
+    def write(self, data):
+        storage = get_resume_storage()
+        if storage is None:
+            self.content = data
+        else:
+            self.storage_key = f"uploads/{self.session_id}/{self.index:05d}"
+            storage.save(self.storage_key, data)
+        self.save()
+
+    def iter_content(self):
+        if self.storage_key:
+            yield from get_resume_storage(required=True).open(self.storage_key)
+        else:
+            yield bytes(self.content or b'')
+
+    @staticmethod
+    def delete_objects(storage_keys):
+        storage = get_resume_storage(required=True)
+        for key in storage_keys:
+            storage.delete(key)
+
+
+class QuotaExceeded(Exception):
+    """Raised when a user has no template/resume slots left"""
+
+
 class UserQuota(models.Model):
-    """User quota model for tracking template and resume limits"""
+    """
+    User quota model for tracking template and resume limits.
+    Usage counters and the per-user ID sequences are materialized here and only change
+    under this row's lock, so quota checks and ID assignment are a single row read.
+    """
     user = models.OneToOneField(User, on_delete=models.CASCADE, related_name='referly_quota')
     max_templates = models.PositiveIntegerField(default=2)
     max_resumes = models.PositiveIntegerField(default=2)
+    template_count = models.PositiveIntegerField(default=0)  # Active templates
+    resume_count = models.PositiveIntegerField(default=0)  # Active resumes
+    next_template_id = models.PositiveIntegerField(default=1)  # Next user_template_id to hand out
+    next_resume_id = models.PositiveIntegerField(default=1)  # Next user_resume_id to hand out
     created_at = models.DateTimeField(auto_now_add=True)
 
+    # kind -> (counter field, ID sequence field, limit field)
+    COUNTERS = {
+        'template': ('template_count', 'next_template_id', 'max_templates'),
+        'resume': ('resume_count', 'next_resume_id', 'max_resumes'),
+    }
+
     class Meta:
         db_table = 'referly_userquota'
-    
+
+    @staticmethod
+    def counters_for(user):
+        """Recompute counters and ID sequences from the template/resume tables"""
+        counters = {}
+        for kind, related in (('template', user.referly_templates), ('resume', user.referly_resumes)):
+            count_field, next_field, _ = UserQuota.COUNTERS[kind]
+            stats = related.aggregate(current=Count('id', filter=Q(is_active=True)), last=Max(f'user_{kind}_id'))
+            counters[count_field] = stats['current']
+            counters[next_field] = (stats['last'] or 0) + 1
+        return counters
+
+    @classmethod
+    def for_user(cls, user, lock=False):
+        """Return the user's quota row, creating it (seeded from existing rows) on first use"""
+        queryset = cls.objects.select_for_update() if lock else cls.objects
+        try:
+            return queryset.get(user=user)
+        except cls.DoesNotExist:
+            pass
+        try:
+            with transaction.atomic():
+                return cls.objects.create(user=user, **cls.counters_for(user))
+        except IntegrityError:
+            # Created concurrently
+            return queryset.get(user=user)
+
+    @classmethod
+    def allocate(cls, user, kind, count=True):
+        """
+        Reserve the next per-user ID for a new template/resume and (when `count`) take a quota slot.
+        Must run inside the transaction that inserts the row; raises QuotaExceeded when full.
+        """
+        count_field, next_field, max_field = cls.COUNTERS[kind]
+        quota = cls.for_user(user, lock=True)
+        updates = {next_field: F(next_field) + 1}
+        if count:
+            if getattr(quota, count_field) >= getattr(quota, max_field):
+                raise QuotaExceeded(
+                    f"{kind.capitalize()} limit reached. Maximum {getattr(quota, max_field)} {kind}s allowed."
+                )
+            updates[count_field] = F(count_field) + 1
+        cls.objects.filter(pk=quota.pk).update(**updates)
+        return getattr(quota, next_field)
+
+    @classmethod
+    def release(cls, user_id, kind):
+        """Give back a quota slot when a template/resume is deactivated or deleted"""
+        count_field = cls.COUNTERS[kind][0]
+        cls.objects.filter(user_id=user_id, **{f'{count_field}__gt': 0}).update(**{count_field: F(count_field) - 1})
+
     @property
     def current_templates(self):
-        return self.user.referly_templates.filter(is_active=True).count()
+        return self.template_count
     
     @property
     def current_resumes(self):
-        return self.user.referly_resumes.filter(is_active=True).count()
+        return self.resume_count
         
     def can_create_template(self):
-        return self.current_templates < self.max_templates
+        return self.template_count < self.max_templates
         
     def can_create_resume(self):
-        return self.current_resumes < self.max_resumes
+        return self.resume_count < self.max_resumes
     
     def get_template_by_user_id(self, template_id):
         """Get template by user-specific ID"""
@@ -99,7 +733,80 @@ class UserQuota(models.Model):
         return f"Quota for {self.user.username}: Templates({self.current_templates}/{self.max_templates}), Resumes({self.current_resumes}/{self.max_resumes})"
 
 
-class Company(models.Model):
+class RollupTracked:
+    """
+    Rows folded incrementally into denormalized rollups (Company counters, DirectoryStat).
+    `save()` locks the previous state of TRACKED_FIELDS and applies (previous, current) in the same
+    transaction; hard deletes apply (state, None) from a post_delete signal.
+    """
+    TRACKED_FIELDS = ()
+    # Company column counting the active rows of the model, if any
+    COMPANY_COUNTER = None
+    # DirectoryStat name prefix of the model's stats, if any
+    STATS_SCOPE = None
+    
+    def tracked_state(self):
+        return {name: getattr(self, self._meta.get_field(name).attname) for name in self.TRACKED_FIELDS}
+    
+    @classmethod
+    def stat_names(cls, state):
+        """DirectoryStat names (without the scope) a row in `state` counts towards"""
+        return []
+    
+    def apply_rollups(self, previous, current):
+        if self.COMPANY_COUNTER:
+            Company.adjust_counter(
+                self.COMPANY_COUNTER,
+                previous['company'] if previous and previous['is_active'] else None,
+                current['company'] if current and current['is_active'] else None,
+            )
+        if self.STATS_SCOPE:
+            DirectoryStat.apply(
+                self.STATS_SCOPE,
+                self.stat_names(previous) if previous else [],
+                self.stat_names(current) if current else [],
+            )
+    
+    @classmethod
+    def apply_bulk_rollups(cls, changes):
+        """
+        `apply_rollups` for many rows at once, for bulk writes that skip save(): `changes` are
+        (previous, current) state pairs, netted into one delta per company counter and stat.
+        """
+        if cls.COMPANY_COUNTER:
+            deltas = {}
+            for previous, current in changes:
+                if previous and previous['is_active']:
+                    deltas[previous['company']] = deltas.get(previous['company'], 0) - 1
+                if current and current['is_active']:
+                    deltas[current['company']] = deltas.get(current['company'], 0) + 1
+            Company.adjust_counters(cls.COMPANY_COUNTER, deltas)
+        if cls.STATS_SCOPE:
+            deltas = {}
+            for previous, current in changes:
+                for name in cls.stat_names(previous) if previous else []:
+                    deltas[name] = deltas.get(name, 0) - 1
+                for name in cls.stat_names(current) if current else []:
+                    deltas[name] = deltas.get(name, 0) + 1
+            DirectoryStat.apply_deltas(cls.STATS_SCOPE, deltas)
+    
+    def save(self, *args, **kwargs):
+        update_fields = kwargs.get('update_fields')
+        tracked = set(self.TRACKED_FIELDS) | {self._meta.get_field(name).attname for name in self.TRACKED_FIELDS}
+        if update_fields is not None and not tracked & set(update_fields):
+            super().save(*args, **kwargs)
+            return
+        with transaction.atomic():
+            previous = None
+            if not self._state.adding:
+                previous = type(self)._base_manager.select_for_update().filter(pk=self.pk).values(
+                    *self.TRACKED_FIELDS
+                ).first()
+            super().save(*args, **kwargs)
+            self.apply_rollups(previous, self.tracked_state())
+
+
+class Company(RollupTracked, models.Model):
     """Company model for storing company information"""
     # Your custom company ID (unique)
     company_id = models.CharField(max_length=50, unique=True)  # Your custom ID like "COMP001", "COMP002"
@@ -122,16 +829,116 @@ class Company(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
+    # Active HR contacts / jobs, maintained by HRContact.save / Job.save (`rebuild_company_counters` repairs drift)
+    hr_contacts_count = models.PositiveIntegerField(default=0, editable=False)
+    jobs_count = models.PositiveIntegerField(default=0, editable=False)
+    
+    # Weighted full-text document, maintained by signals / `rebuild_search_vectors`
+    search_vector = SearchVectorField(null=True, editable=False)
+    
+    COUNTER_FIELDS = ('hr_contacts_count', 'jobs_count')
+    TRACKED_FIELDS = ('is_active', 'company_size')
+    STATS_SCOPE = 'companies'
+    
     class Meta:
         db_table = 'referly_company'
         ordering = ['company_id']
+        indexes = [
+            GinIndex(fields=['search_vector'], name='referly_company_search_gin'),
+            # Typeahead: ILIKE prefix and word-similarity (typo) matches on the name
+            GinIndex(fields=['name'], opclasses=['gin_trgm_ops'], name='referly_company_name_trgm'),
+            # Directory listing: active companies in keyset order (company_id, pk)
+            models.Index(fields=['company_id', 'id'], condition=Q(is_active=True), name='referly_company_active_idx'),
+        ]
+    
+    @staticmethod
+    def search_document():
+        """tsvector expression: name (A) > about_us (B) > headquarters (C)"""
+        return (
+            SearchVector('name', weight='A', config=SEARCH_CONFIG)
+            + SearchVector('about_us', weight='B', config=SEARCH_CONFIG)
+            + SearchVector('headquarters', weight='C', config=SEARCH_CONFIG)
+        )
+    
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Contacts and jobs index the company name: `refresh_search_vector` only reindexes them when it changed
+        instance._loaded_name = instance.__dict__.get('name')
+        return instance
+    
+    @property
+    def name_changed(self):
+        return getattr(self, '_loaded_name', None) != self.name
+    
+    def save(self, *args, **kwargs):
+        # The counters only move through `adjust_counter`: never write back a stale loaded value
+        if not self._state.adding and kwargs.get('update_fields') is None:
+            deferred = self.get_deferred_fields()
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.name not in self.COUNTER_FIELDS and field.attname not in deferred
+            ]
+        super().save(*args, **kwargs)
+        self._loaded_name = self.name
+    
+    @staticmethod
+    def adjust_counter(field, before, after):
+        """Move one unit of `field` from company pk `before` to `after` (None: not counted anywhere)"""
+        if before == after:
+            return
+        if before is not None:
+            Company.objects.filter(pk=before, **{f'{field}__gt': 0}).update(**{field: F(field) - 1})
+        if after is not None:
+            Company.objects.filter(pk=after).update(**{field: F(field) + 1})
+    
+    @staticmethod
+    def adjust_counters(field, deltas):
+        """Apply {company pk: delta} to `field` with one UPDATE per distinct delta"""
+        by_delta = {}
+        for pk, delta in deltas.items():
+            if delta and pk is not None:
+                by_delta.setdefault(delta, []).append(pk)
+        for delta, pks in by_delta.items():
+            Company.objects.filter(pk__in=pks).update(**{field: Greatest(F(field) + delta, 0)})
+    
+    @staticmethod
+    def counter_values():
+        """Correlated COUNT subqueries recomputing the counters from the contact/job tables"""
+        def active_count(model):
+            counts = model.objects.filter(company=OuterRef('pk'), is_active=True).order_by().values('company')
+            return Coalesce(Subquery(counts.annotate(total=Count('pk')).values('total')), 0)
+        return {'hr_contacts_count': active_count(HRContact), 'jobs_count': active_count(Job)}
+    
+    @classmethod
+    def stat_names(cls, state):
+        if not state['is_active']:
+            return ['total']
+        return ['total', 'active', f"size:{state['company_size']}"]
+    
+    @staticmethod
+    def aggregate_stats():
+        """All company stats from one GROUP BY company_size scan with conditional counts"""
+        stats = {'total': 0, 'active': 0}
+        rows = Company.objects.order_by().values('company_size').annotate(
+            total=Count('pk'), active=Count('pk', filter=Q(is_active=True))
+        )
+        for row in rows:
+            stats['total'] += row['total']
+            stats['active'] += row['active']
+            stats[f"size:{row['company_size']}"] = row['active']
+        return stats
     
     def __str__(self):
         return f"{self.company_id}: {self.name}"
 
 
-class HRContact(models.Model):
+class HRContact(RollupTracked, models.Model):
     """HR Contact model for storing HR contact information"""
+    TRACKED_FIELDS = ('company', 'is_active', 'email_verified', 'linkedin_verified')
+    COMPANY_COUNTER = 'hr_contacts_count'
+    STATS_SCOPE = 'hr_contacts'
+    
     # Link to company
     company = models.ForeignKey(Company, on_delete=models.CASCADE, related_name='hr_contacts')
     
@@ -149,9 +956,54 @@ class HRContact(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
+    # Weighted full-text document, maintained by signals / `rebuild_search_vectors`
+    search_vector = SearchVectorField(null=True, editable=False)
+    
     class Meta:
         db_table = 'referly_hrcontact'
         ordering = ['company__company_id', 'first_name', 'last_name']
+        indexes = [
+            GinIndex(fields=['search_vector'], name='referly_hrcontact_search_gin'),
+            GinIndex(fields=['first_name'], opclasses=['gin_trgm_ops'], name='referly_hrcontact_first_trgm'),
+            GinIndex(fields=['last_name'], opclasses=['gin_trgm_ops'], name='referly_hrcontact_last_trgm'),
+            # A company's active contacts in listing order
+            models.Index(
+                fields=['company', 'first_name', 'last_name', 'id'], condition=Q(is_active=True),
+                name='referly_hrcontact_active_idx',
+            ),
+        ]
+    
+    @staticmethod
+    def search_document():
+        """tsvector expression: first/last name (A) > email (B) > company name (C)"""
+        company_name = Subquery(Company.objects.filter(pk=OuterRef('company_id')).order_by().values('name')[:1])
+        return (
+            SearchVector('first_name', 'last_name', weight='A', config=SEARCH_CONFIG)
+            + SearchVector('email', weight='B', config=SEARCH_CONFIG)
+            + SearchVector(company_name, weight='C', config=SEARCH_CONFIG)
+        )
+    
+    @classmethod
+    def stat_names(cls, state):
+        if not state['is_active']:
+            return ['total']
+        names = ['total', 'active']
+        if state['email_verified']:
+            names.append('verified_emails')
+        if state['linkedin_verified']:
+            names.append('verified_linkedin')
+        return names
+    
+    @staticmethod
+    def aggregate_stats():
+        """All HR contact stats from one scan with conditional counts"""
+        active = Q(is_active=True)
+        return HRContact.objects.aggregate(
+            total=Count('pk'),
+            active=Count('pk', filter=active),
+            verified_emails=Count('pk', filter=active & Q(email_verified=True)),
+            verified_linkedin=Count('pk', filter=active & Q(linkedin_verified=True)),
+        )
     
     def __str__(self):
         return f"{self.first_name} {self.last_name} - {self.company.name}"
@@ -161,8 +1013,11 @@ class HRContact(models.Model):
         return f"{self.first_name} {self.last_name}"
 
 
-class Job(models.Model):
+class Job(RollupTracked, models.Model):
     """Job model for storing job listings"""
+    TRACKED_FIELDS = ('company', 'is_active')
+    COMPANY_COUNTER = 'jobs_count'
+    
     JOB_TYPE_CHOICES = [
         ('software-developer', 'Software Developer'),
         ('web-developer', 'Web Developer'),
@@ -194,10 +1049,282 @@ class Job(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
+    # Weighted full-text document, maintained by signals / `rebuild_search_vectors`
+    search_vector = SearchVectorField(null=True, editable=False)
+    
     class Meta:
         db_table = 'referly_job'
         ordering = ['-posted_date']
         unique_together = ['company', 'job_type']  # One job type per company
+        indexes = [
+            GinIndex(fields=['search_vector'], name='referly_job_search_gin'),
+            # Job board and per-company listings: newest active jobs first, keyset on (posted_date, pk)
+            models.Index(fields=['-posted_date', '-id'], condition=Q(is_active=True), name='referly_job_active_posted_idx'),
+            models.Index(
+                fields=['company', '-posted_date', '-id'], condition=Q(is_active=True),
+                name='referly_job_company_posted_idx',
+            ),
+        ]
+    
+    @staticmethod
+    def search_document():
+        """tsvector expression: title (A) > job type (B) > company name (C)"""
+        company_name = Subquery(Company.objects.filter(pk=OuterRef('company_id')).order_by().values('name')[:1])
+        # Titles are slugs ("backend-developer"); the parser splits them on the hyphen
+        return (
+            SearchVector('title', weight='A', config=SEARCH_CONFIG)
+            + SearchVector('job_type', weight='B', config=SEARCH_CONFIG)
+            + SearchVector(company_name, weight='C', config=SEARCH_CONFIG)
+        )
+    
+    @staticmethod
+    def has_hr_expression():
+        """
+        `has_hr` annotation: the company has active HR contacts, read from its denormalized counter
+        (an EXISTS probe gets planned as a hashed scan of every active contact)
+        """
+        return ExpressionWrapper(Q(company__hr_contacts_count__gt=0), output_field=models.BooleanField())
     
     def __str__(self):
         return f"{self.title} - {self.company.name}"
+
+
+class DirectoryStat(models.Model):
+    """
+    Rollup of company / HR contact stats, one row per `<scope>.<name>` (e.g. `companies.size:1-50`),
+    kept current by RollupTracked writes so the stats views read a handful of rows instead of the tables.
+    The `version` scope holds DirectoryCache's per-model write counters when there is no shared cache.
+    """
+    name = models.CharField(max_length=150, unique=True)
+    value = models.BigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        db_table = 'referly_directorystat'
+        ordering = ['name']
+    
+    @staticmethod
+    def sources():
+        return {'companies': Company, 'hr_contacts': HRContact}
+    
+    @staticmethod
+    def apply(scope, before, after):
+        """Move one unit from each stat in `before` to each stat in `after`"""
+        deltas = {}
+        for name in before:
+            deltas[name] = deltas.get(name, 0) - 1
+        for name in after:
+            deltas[name] = deltas.get(name, 0) + 1
+        DirectoryStat.apply_deltas(scope, deltas)
+    
+    @staticmethod
+    def lock(scope, shared):
+        """
+        Transaction-level advisory lock on a scope: writers applying deltas share it, a rebuild takes it
+        exclusively, so no delta can commit between the rebuild's aggregate and its rows replacing the old ones
+        """
+        key = zlib.crc32(f'referly:directorystat:{scope}'.encode('utf-8'))
+        with connection.cursor() as cursor:
+            cursor.execute(f"SELECT pg_advisory_xact_lock{'_shared' if shared else ''}(%s)", [key])
+    
+    @staticmethod
+    def apply_deltas(scope, deltas):
+        """Add {name: delta} to the scope's stats"""
+        if not any(deltas.values()):
+            return
+        with transaction.atomic():
+            DirectoryStat.lock(scope, shared=True)
+            missing = []
+            for name, delta in deltas.items():
+                if delta and not DirectoryStat.objects.filter(name=f'{scope}.{name}').update(
+                    value=F('value') + delta, updated_at=timezone.now()
+                ):
+                    missing.append((name, delta))
+            # New breakdown keys (a new company size...) only start counting once the scope has been seeded;
+            # until then `for_scope` computes everything from the tables
+            if missing and DirectoryStat.objects.filter(name=f'{scope}.total').exists():
+                for name, delta in missing:
+                    try:
+                        with transaction.atomic():
+                            DirectoryStat.objects.create(name=f'{scope}.{name}', value=delta)
+                    except IntegrityError:
+                        DirectoryStat.objects.filter(name=f'{scope}.{name}').update(value=F('value') + delta)
+    
+    @staticmethod
+    def increment(name):
+        """Add one to a standalone counter row, creating it on first use"""
+        if DirectoryStat.objects.filter(name=name).update(value=F('value') + 1, updated_at=timezone.now()):
+            return
+        try:
+            with transaction.atomic():
+                DirectoryStat.objects.create(name=name, value=1)
+        except IntegrityError:
+            DirectoryStat.objects.filter(name=name).update(value=F('value') + 1, updated_at=timezone.now())
+    
+    @staticmethod
+    def rebuild(scope):
+        """Replace the scope's rows with a fresh single-pass aggregate; returns {name: value}"""
+        with transaction.atomic():
+            # Waits for writers whose deltas aren't committed yet; the aggregate then includes their rows
+            DirectoryStat.lock(scope, shared=False)
+            stats = DirectoryStat.sources()[scope].aggregate_stats()
+            DirectoryStat.objects.filter(name__startswith=f'{scope}.').delete()
+            DirectoryStat.objects.bulk_create(
+                [DirectoryStat(name=f'{scope}.{name}', value=value) for name, value in stats.items()]
+            )
+        return stats
+    
+    @staticmethod
+    def for_scope(scope):
+        """{name: value} of a scope from the rollup (seeded from the tables on first use)"""
+        prefix = f'{scope}.'
+        stats = {
+            name[len(prefix):]: value
+            for name, value in DirectoryStat.objects.filter(name__startswith=prefix).values_list('name', 'value')
+        }
+        if 'total' not in stats:
+            stats = DirectoryStat.rebuild(scope)
+        return stats
+
+
+class JobReclaimed(Exception):
+    """The bulk upload job was claimed again (its worker looked stale) since this worker claimed it"""
+
+
+class BulkUploadJob(models.Model):
+    """
+    Excel bulk upload imported off the request thread: the upload view stores the sheet (BulkUploadSheet)
+    and queues the job id on RabbitMQ, the `process_bulk_uploads` worker imports it a chunk of rows per
+    transaction and records progress here after each one, so the status endpoint can be polled.
+    """
+    KIND_COMPANIES = 'companies'
+    KIND_HR_CONTACTS = 'hr_contacts'
+    KIND_CHOICES = [
+        (KIND_COMPANIES, 'Companies'),
+        (KIND_HR_CONTACTS, 'HR contacts'),
+    ]
+    STATUS_QUEUED = 'queued'
+    STATUS_RUNNING = 'running'
+    STATUS_COMPLETED = 'completed'
+    STATUS_FAILED = 'failed'
+    STATUS_CHOICES = [
+        (STATUS_QUEUED, 'Queued'),
+        (STATUS_RUNNING, 'Running'),
+        (STATUS_COMPLETED, 'Completed'),
+        (STATUS_FAILED, 'Failed'),
+    ]
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='referly_bulk_uploads')
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES)
+    file_name = models.CharField(max_length=255, blank=True)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default=STATUS_QUEUED)
+    total_rows = models.PositiveIntegerField(null=True, blank=True)  # Known once the worker has read the sheet
+    processed_rows = models.PositiveIntegerField(default=0)  # Rows imported and committed so far
+    error_count = models.PositiveIntegerField(default=0)  # Rows rejected so far
+    result = models.JSONField(null=True, blank=True)  # Running totals; the upload response body once completed
+    error = models.TextField(blank=True)  # Why the job failed
+    attempts = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        db_table = 'referly_bulkuploadjob'
+        ordering = ['-created_at']
+        indexes = [models.Index(fields=['status', 'updated_at'])]
+
+    @classmethod
+    def submit(cls, user, kind, uploaded_file):
+        """Store the sheet and create the job; it is queued on RabbitMQ once the transaction commits"""
+        with transaction.atomic():
+            job = cls.objects.create(user=user, kind=kind, file_name=uploaded_file.name[:255])
+            BulkUploadSheet(job=job).write(uploaded_file)
+            transaction.on_commit(job.enqueue)
+        return job
+
+    def enqueue(self):
+        from .queue_service import QueueService
+
+        try:
+            QueueService().publish(settings.REFERLY_BULK_UPLOAD['QUEUE'], {'job_id': str(self.pk)})
+        except Exception:
+            # The job stays queued in the database; the worker sweeps those up when it starts
+            # (and `process_bulk_uploads --once` drains them without RabbitMQ)
+            logger.exception("Could not queue bulk upload job %s", self.pk)
+
+    @classmethod
+    def claimable(cls):
+        """Queued jobs, and running ones whose worker stopped reporting progress"""
+        stale = timezone.now() - timedelta(minutes=settings.REFERLY_BULK_UPLOAD['STALE_MINUTES'])
+        return cls.objects.filter(Q(status=cls.STATUS_QUEUED) | Q(status=cls.STATUS_RUNNING, updated_at__lt=stale))
+
+    @classmethod
+    def claim(cls, job_id):
+        """Mark the job running for this worker; None when it's finished or another worker has it"""
+        with transaction.atomic():
+            job = cls.claimable().select_for_update(skip_locked=True).filter(pk=job_id).first()
+            if job is None:
+                return None
+            job.status = cls.STATUS_RUNNING
+            job.attempts += 1
+            job.started_at = job.started_at or timezone.now()
+            job.save(update_fields=['status', 'attempts', 'started_at', 'updated_at'])
+        return job
+
+    def save_progress(self, *fields):
+        """
+        Save `fields` (and bump updated_at), unless another worker has claimed the job since:
+        then raise JobReclaimed, rolling back the caller's transaction (the chunk it imported)
+        """
+        updated = BulkUploadJob.objects.filter(pk=self.pk, attempts=self.attempts).update(
+            updated_at=timezone.now(), **{name: getattr(self, name) for name in fields}
+        )
+        if not updated:
+            raise JobReclaimed(f"Bulk upload {self.pk} was claimed by another worker")
+
+    def finish(self, status, **fields):
+        """Record the outcome and delete the stored sheet; raises JobReclaimed like save_progress"""
+        with transaction.atomic():
+            updated = BulkUploadJob.objects.filter(pk=self.pk, attempts=self.attempts).update(
+                status=status, finished_at=timezone.now(), updated_at=timezone.now(), **fields
+            )
+            if not updated:
+                raise JobReclaimed(f"Bulk upload {self.pk} was claimed by another worker")
+            BulkUploadSheet.objects.filter(job=self).delete()
+        self.status = status
+        for name, value in fields.items():
+            setattr(self, name, value)
+
+    def __str__(self):
+        return f"{self.get_kind_display()} upload {self.pk} ({self.status})"
+
+
+class BulkUploadSheet(models.Model):
+    """
+    The Excel file of a bulk upload job, staged in the configured storage until the job finishes.
+    Deleting the row (finish, or the job's cascade) removes the storage object once the deletion commits.
+    """
+    job = models.OneToOneField(BulkUploadJob, on_delete=models.CASCADE, related_name='sheet')
+    content = models.BinaryField(null=True, blank=True)  # Bytes when using the database backend
+    storage_key = models.CharField(max_length=255, blank=True, default='')
+
+    class Meta:
+        db_table = 'referly_bulkuploadsheet'
+
+    def write(self, uploaded_file):
+        uploaded_file.seek(0)
+        storage = get_resume_storage()
+        if storage is None:
+            self.content = uploaded_file.read()
+        else:
+            self.storage_key = f"bulk-uploads/{self.job_id}"
+            storage.save(self.storage_key, uploaded_file)
+        self.save()
+
+    def iter_content(self):
+        if self.storage_key:
+            yield from get_resume_storage(required=True).open(self.storage_key)
+        else:
+            yield bytes(self.content or b'')
@@ -0,0 +1,151 @@
+import base64
+import datetime
+import json
+
+from django.conf import settings
+from django.core.exceptions import FieldDoesNotExist
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Q
+
+
+class CursorEncoder(DjangoJSONEncoder):
+    """DjangoJSONEncoder rounds datetimes to milliseconds; cursors need the exact value"""
+
+    def default(self, o):
+        if isinstance(o, datetime.datetime):
+            return o.isoformat()
+        return super().default(o)
+
+
+class InvalidCursor(Exception):
+    """Raised when a client sends a cursor we didn't issue (or one for another ordering)"""
+
+
+class KeysetPaginator:
+    """
+    Cursor pagination on the queryset's ordering (or the model's `Meta.ordering`) plus the primary key
+    as tie-breaker. Each page is `WHERE (sort key) > (last row's key) ... LIMIT n`, so deep pages cost
+    the same as the first one. Cursors are opaque base64 tokens carrying the last row's sort values.
+    """
+
+    def __init__(self, request):
+        self.request = request
+        options = settings.REFERLY_PAGINATION
+        try:
+            page_size = int(request.query_params.get('page_size', options['PAGE_SIZE']))
+        except ValueError:
+            page_size = options['PAGE_SIZE']
+        self.page_size = max(1, min(page_size, options['MAX_PAGE_SIZE']))
+
+    @staticmethod
+    def ordering_for(queryset):
+        """[(path, descending)] from the queryset's order_by / Meta.ordering, ending with the primary key"""
+        ordering = list(queryset.query.order_by or queryset.model._meta.ordering)
+        keys = []
+        for term in ordering:
+            if not isinstance(term, str) or term == '?':
+                raise ValueError(f"Keyset pagination needs plain field orderings, got {term!r}")
+            descending = term.startswith('-')
+            path = term.lstrip('-')
+            if path in ('pk', queryset.model._meta.pk.name):
+                path = 'pk'
+            keys.append((path, descending))
+        if not any(path == 'pk' for path, _ in keys):
+            keys.append(('pk', keys[-1][1] if keys else False))
+        else:
+            # Nothing after the primary key can change the order
+            keys = keys[:[path for path, _ in keys].index('pk') + 1]
+        return keys
+
+    @staticmethod
+    def key_paths(queryset):
+        """Paths the cursor is built from (`.values()` querysets must select them)"""
+        return [path for path, _ in KeysetPaginator.ordering_for(queryset)]
+
+    @staticmethod
+    def encode(values):
+        raw = json.dumps(values, cls=CursorEncoder, separators=(',', ':')).encode('utf-8')
+        return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+    @staticmethod
+    def decode(cursor, keys, model):
+        try:
+            values = json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+        except (ValueError, TypeError):
+            raise InvalidCursor("Malformed cursor")
+        if not isinstance(values, list) or len(values) != len(keys):
+            raise InvalidCursor("Cursor does not match this listing")
+        return [KeysetPaginator.to_python(model, path, value) for (path, _), value in zip(keys, values)]
+
+    @staticmethod
+    def to_python(model, path, value):
+        """Restore a JSON cursor value with the type of the field it sorts on (datetimes etc.)"""
+        if value is None:
+            return None
+        field = None
+        for part in path.split('__'):
+            try:
+                field = model._meta.pk if part == 'pk' else model._meta.get_field(part)
+            except FieldDoesNotExist:
+                # Annotation such as a search rank
+                return value
+            if field.is_relation:
+                model = field.related_model
+        try:
+            return field.to_python(value)
+        except Exception:
+            raise InvalidCursor("Malformed cursor value")
+
+    @staticmethod
+    def value_of(obj, path):
+        if isinstance(obj, dict):
+            # `.values()` row
+            return obj[path]
+        parts = path.split('__')
+        for index, part in enumerate(parts):
+            try:
+                field = obj._meta.get_field(part)
+            except (AttributeError, FieldDoesNotExist):
+                field = None
+            # `company__company_id` is the local FK column: no need to load the company
+            if field is not None and field.many_to_one and parts[index + 1:] == [field.target_field.name]:
+                return getattr(obj, field.attname)
+            obj = getattr(obj, part)
+            if obj is None:
+                return None
+        return obj
+
+    @staticmethod
+    def after(keys, values):
+        """Q for rows strictly after `values` in the (mixed direction) sort order"""
+        # (a > x) OR (a = x AND b > y) OR (a = x AND b = y AND pk > z) ...
+        condition = Q(pk__in=[])
+        for index, (path, descending) in enumerate(keys):
+            step = Q(**{f"{path}__{'lt' if descending else 'gt'}": values[index]})
+            for previous_index in range(index):
+                step &= Q(**{keys[previous_index][0]: values[previous_index]})
+            condition |= step
+        return condition
+
+    def paginate(self, queryset):
+        """Return (rows of this page, next cursor or None)"""
+        keys = self.ordering_for(queryset)
+        queryset = queryset.order_by(*[f"{'-' if descending else ''}{path}" for path, descending in keys])
+        cursor = self.request.query_params.get('cursor')
+        if cursor:
+            queryset = queryset.filter(self.after(keys, self.decode(cursor, keys, queryset.model)))
+
+        # One extra row tells us whether there is a next page without a COUNT(*)
+        rows = list(queryset[:self.page_size + 1])
+        next_cursor = None
+        if len(rows) > self.page_size:
+            rows = rows[:self.page_size]
+            next_cursor = self.encode([self.value_of(rows[-1], path) for path, _ in keys])
+        return rows, next_cursor
+
+    def response_data(self, data, next_cursor):
+        return {
+            "results": data,
+            "next_cursor": next_cursor,
+            "page_size": self.page_size,
+        }
@@ -0,0 +1,85 @@
+import functools
+import json
+import threading
+
+from django.conf import settings
+
+
+class QueueService:
+    """
+    RabbitMQ client, same connection settings and message format as the queue service's
+    `producer.services.QueueService`: durable queues, persistent JSON messages.
+    pika is imported lazily so the API runs without it; only code that queues work needs it.
+    """
+
+    def __init__(self):
+        import pika
+
+        cfg = settings.RABBITMQ
+        self.credentials = pika.PlainCredentials(cfg["USER"], cfg["PASSWORD"])
+        self.parameters = pika.ConnectionParameters(
+            host=cfg["HOST"],
+            port=cfg["PORT"],
+            credentials=self.credentials,
+            heartbeat=600,
+            blocked_connection_timeout=300,
+        )
+
+    def _get_channel(self):
+        import pika
+
+        connection = pika.BlockingConnection(self.parameters)
+        channel = connection.channel()
+        return connection, channel
+
+    def publish(self, queue_name, payload):
+        import pika
+
+        connection, channel = self._get_channel()
+        try:
+            channel.queue_declare(queue=queue_name, durable=True)
+            channel.basic_publish(
+                exchange="",
+                routing_key=queue_name,
+                body=json.dumps(payload),
+                properties=pika.BasicProperties(content_type="application/json", delivery_mode=2),
+            )
+        finally:
+            connection.close()
+
+    def consume(self, queue_name, handler):
+        """
+        Block, calling `handler(payload)` for each message one at a time. The handler runs on a worker
+        thread while this one keeps servicing the connection, so heartbeats go out however long it takes;
+        the message is acked once it returns (or raises), and work in flight when a consumer dies is
+        redelivered to another one.
+        """
+        connection, channel = self._get_channel()
+        channel.queue_declare(queue=queue_name, durable=True)
+        channel.basic_qos(prefetch_count=1)
+        workers = []
+
+        def work(delivery_tag, payload):
+            try:
+                handler(payload)
+            finally:
+                # Channel calls are only safe on the connection's thread
+                connection.add_callback_threadsafe(functools.partial(channel.basic_ack, delivery_tag=delivery_tag))
+
+        def callback(ch, method, properties, body):
+            try:
+                payload = json.loads(body)
+            except ValueError:
+                payload = None
+            workers[:] = [worker for worker in workers if worker.is_alive()]
+            worker = threading.Thread(target=work, args=(method.delivery_tag, payload))
+            worker.start()
+            workers.append(worker)
+
+        channel.basic_consume(queue=queue_name, on_message_callback=callback, auto_ack=False)
+        try:
+            channel.start_consuming()
+        finally:
+            for worker in workers:
+                worker.join()
+            connection.close()
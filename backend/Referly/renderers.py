@@ -0,0 +1,50 @@
+import datetime
+
+from rest_framework.renderers import BaseRenderer, JSONRenderer
+from rest_framework.utils import encoders
+
+
+def _datetime_representation(value):
+    """Same string as DRF's DateTimeField (ISO 8601 with microseconds, `Z` for UTC)"""
+    value = value.isoformat()
+    if value.endswith('+00:00'):
+        value = value[:-6] + 'Z'
+    return value
+
+
+class _FallbackEncoder(encoders.JSONEncoder):
+    """DRF's encoder trims datetimes to milliseconds; keep them identical to serializer output"""
+
+    def default(self, obj):
+        if isinstance(obj, datetime.datetime):
+            return _datetime_representation(obj)
+        return super().default(obj)
+
+
+class _FallbackRenderer(JSONRenderer):
+    encoder_class = _FallbackEncoder
+
+
+class ORJSONRenderer(BaseRenderer):
+    """
+    JSON renderer on orjson, several times faster than the stdlib encoder behind DRF's JSONRenderer.
+    Raw `.values()` rows (datetimes, UUIDs...) render exactly like serializer output, so list endpoints
+    can skip serializers. Falls back to DRF's JSONRenderer when orjson isn't installed.
+    """
+    media_type = 'application/json'
+    format = 'json'
+    charset = None
+
+    _default = encoders.JSONEncoder().default
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        try:
+            import orjson
+        except ImportError:
+            return _FallbackRenderer().render(data, accepted_media_type, renderer_context)
+        # Anything orjson doesn't know natively (lazy translations, Decimal...) goes through DRF's encoder
+        return orjson.dumps(
+            data, default=self._default, option=orjson.OPT_UTC_Z | orjson.OPT_NON_STR_KEYS
+        )
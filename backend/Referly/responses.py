@@ -0,0 +1,127 @@
+import re
+
+from django.http import HttpResponse, StreamingHttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+
+RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+
+def conditional_headers(response, etag=None, last_modified=None):
+    """Attach validators so browsers can revalidate with If-None-Match / If-Modified-Since"""
+    if etag:
+        response['ETag'] = quote_etag(etag)
+    if last_modified:
+        response['Last-Modified'] = http_date(last_modified.timestamp())
+    return response
+
+
+def not_modified_response(request, etag=None, last_modified=None):
+    """
+    Return a 304 (or 412) response when the client's validators still match, else None.
+    Callers should only load the payload after this returns None.
+    """
+    response = get_conditional_response(
+        request,
+        etag=quote_etag(etag) if etag else None,
+        last_modified=int(last_modified.timestamp()) if last_modified else None,
+    )
+    if response is not None:
+        conditional_headers(response, etag, last_modified)
+    return response
+
+
+def parse_range(header, size):
+    """
+    Parse a single `Range: bytes=...` header into an inclusive (start, end) pair.
+    Returns None when the header is absent or not a single byte range (serve the full body),
+    and raises ValueError when the range cannot be satisfied.
+    """
+    match = RANGE_RE.match(header.strip()) if header else None
+    if not match:
+        return None
+
+    first, last = match.groups()
+    if not first and not last:
+        return None
+    if not first:
+        # Suffix range: the last N bytes
+        length = int(last)
+        if length == 0:
+            raise ValueError("Empty suffix range")
+        return max(size - length, 0), size - 1
+
+    start = int(first)
+    end = min(int(last), size - 1) if last else size - 1
+    if start >= size or start > end:
+        raise ValueError("Range not satisfiable")
+    return start, end
+
+
+def blob_file_response(request, blob, filename, content_type, last_modified, disposition, size=None):
+    """
+    Serve stored bytes with strong ETag / Last-Modified validators and single-range (206) support.
+    `blob` is anything with `iter_content(start=, end=)`; only the requested slice is read from storage.
+    """
+    etag = blob.sha256 if getattr(blob, 'sha256', None) else None
+    not_modified = not_modified_response(request, etag, last_modified)
+    if not_modified is not None:
+        return not_modified
+
+    size = blob.size if size is None else size
+    byte_range = None
+    if_range = request.headers.get('If-Range')
+    # A stale If-Range means the client's partial copy is outdated: send the whole file
+    if not if_range or (etag and if_range == quote_etag(etag)):
+        try:
+            byte_range = parse_range(request.headers.get('Range'), size)
+        except ValueError:
+            response = HttpResponse(status=416)
+            response['Content-Range'] = f'bytes */{size}'
+            return response
+
+    if byte_range:
+        start, end = byte_range
+        response = StreamingHttpResponse(
+            blob.iter_content(start=start, end=end), status=206, content_type=content_type
+        )
+        response['Content-Range'] = f'bytes {start}-{end}/{size}'
+        response['Content-Length'] = end - start + 1
+    else:
+        response = StreamingHttpResponse(blob.iter_content(), content_type=content_type)
+        response['Content-Length'] = size
+
+    response['Accept-Ranges'] = 'bytes'
+    response['Content-Disposition'] = f'{disposition}; filename="{filename}"'
+    response['Cache-Control'] = 'private, no-cache'
+    return conditional_headers(response, etag, last_modified)
+
+
+def resume_file_response(request, resume, disposition):
+    """Serve the original resume file (see `blob_file_response`)"""
+    # Legacy resumes without a blob are served straight from `file_content` (no ETag)
+    return blob_file_response(
+        request,
+        resume.blob if resume.blob_id else resume,
+        filename=f"{resume.name}.{resume.file_extension}",
+        content_type=resume.mime_type,
+        last_modified=resume.updated_at,
+        disposition=disposition,
+        size=resume.file_size,
+    )
+
+
+def rendition_file_response(request, resume, rendition, disposition='inline'):
+    """Serve a ready rendition (e.g. the PDF preview of a DOCX resume)"""
+    response = blob_file_response(
+        request,
+        rendition.output_blob,
+        filename=f"{resume.name}.{rendition.extension}",
+        content_type=rendition.mime_type,
+        last_modified=rendition.updated_at,
+        disposition=disposition,
+    )
+    if rendition.kind == 'html':
+        # Converted markup is untrusted: no scripts, no same-origin access
+        response['Content-Security-Policy'] = 'sandbox'
+    return response
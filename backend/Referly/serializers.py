@@ -1,22 +1,111 @@
 from rest_framework import serializers
-from .models import Template, Resume, UserQuota, Company, HRContact, Job
+from .models import Template, Resume, ResumeUploadSession, UserQuota, Company, HRContact, Job, BulkUploadJob, MAX_RESUME_SIZE
+from .pagination import KeysetPaginator
+from django.conf import settings
 from django.contrib.auth.models import User
 import base64
 import hashlib
 
 
-class TemplateSerializer(serializers.ModelSerializer):
+def requested_fields(request):
+    """Field names of a `?fields=a,b` sparse fieldset (None: all fields)"""
+    raw = request.query_params.get('fields', '')
+    return [name.strip() for name in raw.split(',') if name.strip()] or None
+
+
+class SparseFieldsMixin:
+    """Accepts `fields=[...]` to render only those fields"""
+    
+    def __init__(self, *args, fields=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        if fields is not None:
+            self.check_fields(fields, self.fields)
+            for name in set(self.fields) - set(fields):
+                self.fields.pop(name)
+    
+    @staticmethod
+    def check_fields(fields, available):
+        unknown = sorted(set(fields) - set(available))
+        if unknown:
+            raise serializers.ValidationError({'fields': [f"Unknown field(s): {', '.join(unknown)}"]})
+
+
+class ValuesFastPathMixin(SparseFieldsMixin):
+    """
+    Serializer-free reads for list endpoints: rows come from `.values()` and are rendered as they are
+    (see `renderers.ORJSONRenderer`). `VALUES` maps every output field to the ORM path it is read from,
+    or to `(function, path, ...)` when it is computed from columns. Writes keep using the serializer.
+    """
+    VALUES = {}
+    
+    @classmethod
+    def fast_columns(cls, fields=None):
+        if fields is not None:
+            cls.check_fields(fields, cls.VALUES)
+        names = [name for name in cls.VALUES if fields is None or name in fields]
+        return [
+            (name, cls.VALUES[name], None) if isinstance(cls.VALUES[name], str)
+            else (name, cls.VALUES[name][1:], cls.VALUES[name][0])
+            for name in names
+        ]
+    
+    @classmethod
+    def fast_paths(cls, fields=None):
+        paths = set()
+        for _, source, function in cls.fast_columns(fields):
+            paths.update(source if function else [source])
+        return paths
+    
+    @classmethod
+    def fast_rows(cls, rows, fields=None):
+        """Output dicts from `.values()` rows holding at least `fast_paths(fields)`"""
+        columns = cls.fast_columns(fields)
+        if all(function is None for _, _, function in columns):
+            return [{name: row[path] for name, path, _ in columns} for row in rows]
+        return [
+            {
+                name: function(*[row[path] for path in source]) if function else row[source]
+                for name, source, function in columns
+            }
+            for row in rows
+        ]
+    
+    @classmethod
+    def fast_list(cls, queryset, fields=None):
+        return cls.fast_rows(queryset.values(*cls.fast_paths(fields)), fields)
+    
+    @classmethod
+    def fast_page(cls, paginator, queryset, fields=None):
+        """(rows, next cursor) of one keyset page, also selecting the columns the cursor is built from"""
+        paths = cls.fast_paths(fields) | set(KeysetPaginator.key_paths(queryset))
+        rows, next_cursor = paginator.paginate(queryset.values(*paths))
+        return cls.fast_rows(rows, fields), next_cursor
+
+
+class TemplateSerializer(ValuesFastPathMixin, serializers.ModelSerializer):
     """Serializer for Template model"""
     user_id = serializers.IntegerField(source='user_template_id', read_only=True)
     size = serializers.SerializerMethodField()
     
+    VALUES = {
+        'id': 'id',
+        'user_id': 'user_template_id',
+        'name': 'name',
+        # `.values()` returns the stored (compressed) bytes
+        'html_content': (Template._meta.get_field('html_content').to_python, 'html_content'),
+        'variables': 'variables',
+        'created_at': 'created_at',
+        'updated_at': 'updated_at',
+        'size': 'size',
+    }
+    
     class Meta:
         model = Template
-        fields = ['id', 'user_id', 'name', 'html_content', 'created_at', 'updated_at', 'size']
-        read_only_fields = ['id', 'user_id', 'created_at', 'updated_at']
+        fields = ['id', 'user_id', 'name', 'html_content', 'variables', 'created_at', 'updated_at', 'size']
+        read_only_fields = ['id', 'user_id', 'variables', 'created_at', 'updated_at']
     
     def get_size(self, obj):
-        return len(obj.html_content.encode('utf-8'))
+        return obj.size
 
 
 class TemplateCreateSerializer(serializers.ModelSerializer):
@@ -37,6 +126,17 @@ class TemplateUpdateSerializer(serializers.ModelSerializer):
         fields = ['html_content']
 
 
+class TemplateRenderSerializer(serializers.Serializer):
+    """Recipient variables for rendering a compiled template (one context or a mail-merge list)"""
+    context = serializers.DictField(required=False)
+    contexts = serializers.ListField(child=serializers.DictField(), required=False, max_length=500)
+    
+    def validate(self, attrs):
+        if 'context' not in attrs and 'contexts' not in attrs:
+            raise serializers.ValidationError("Provide either 'context' or 'contexts'.")
+        return attrs
+
+
 class ResumeSerializer(serializers.ModelSerializer):
     """Serializer for Resume model (without binary content)"""
     user_id = serializers.IntegerField(source='user_resume_id', read_only=True)
@@ -73,19 +173,60 @@ class ResumeUploadSerializer(serializers.ModelSerializer):
             raise serializers.ValidationError("Only PDF and DOCX files are allowed.")
         
         # Check file size (max 5MB)
-        if value.size > 5 * 1024 * 1024:
+        if value.size > MAX_RESUME_SIZE:
             raise serializers.ValidationError("File size cannot exceed 5MB.")
         
         return value
     
     def create(self, validated_data):
         file = validated_data.pop('file')
-        validated_data['user'] = self.context['request'].user
-        validated_data['file_extension'] = file.name.split('.')[-1].lower()
-        validated_data['file_content'] = file.read()
-        validated_data['file_size'] = file.size
-        
-        return super().create(validated_data)
+        file.seek(0)
+        return Resume.upload(
+            user=self.context['request'].user,
+            name=validated_data['name'],
+            file_extension=file.name.split('.')[-1].lower(),
+            content=file,
+            file_size=file.size,
+        )
+
+
+class ResumeUploadSessionCreateSerializer(serializers.Serializer):
+    """Serializer for starting a resumable (chunked) resume upload"""
+    name = serializers.CharField(max_length=255)
+    filename = serializers.CharField(max_length=255)
+    total_size = serializers.IntegerField(min_value=1, max_value=MAX_RESUME_SIZE)
+    
+    def validate_filename(self, value):
+        if not value.lower().endswith(('.pdf', '.docx')):
+            raise serializers.ValidationError("Only PDF and DOCX files are allowed.")
+        return value
+    
+    def validate_name(self, value):
+        if Resume.objects.filter(user=self.context['request'].user, name=value).exists():
+            raise serializers.ValidationError("A resume with this name already exists.")
+        return value
+    
+    def create(self, validated_data):
+        return ResumeUploadSession.objects.create(
+            user=self.context['request'].user,
+            name=validated_data['name'],
+            file_extension=validated_data['filename'].rsplit('.', 1)[-1].lower(),
+            total_size=validated_data['total_size'],
+            chunk_size=settings.REFERLY_UPLOAD_CHUNK_SIZE,
+        )
+
+
+class ResumeUploadSessionSerializer(serializers.ModelSerializer):
+    """Serializer for upload session progress (what to send next after a reconnect)"""
+    upload_id = serializers.UUIDField(source='id', read_only=True)
+    total_chunks = serializers.ReadOnlyField()
+    resume_id = serializers.IntegerField(read_only=True)
+    
+    class Meta:
+        model = ResumeUploadSession
+        fields = ['upload_id', 'name', 'file_extension', 'total_size', 'chunk_size', 'total_chunks',
+                 'received_bytes', 'next_chunk', 'crc32', 'status', 'resume_id', 'expires_at']
+        read_only_fields = fields
 
 
 class UserQuotaSerializer(serializers.ModelSerializer):
@@ -134,21 +275,15 @@ class ResumePreviewSerializer(serializers.ModelSerializer):
         fields = ['id', 'name', 'file_extension', 'base64_content', 'mime_type', 'file_size']
     
     def get_base64_content(self, obj):
-        return base64.b64encode(obj.file_content).decode('utf-8')
+        return base64.b64encode(obj.read_content()).decode('utf-8')
     
     def get_mime_type(self, obj):
-        if obj.file_extension == 'pdf':
-            return 'application/pdf'
-        elif obj.file_extension == 'docx':
-            return 'application/vnd.openxmlformats-officedocument.wordprocessingml.document'
-        return 'application/octet-stream'
+        return obj.mime_type
 
 
 # Company Serializers
-class CompanySerializer(serializers.ModelSerializer):
-    """Serializer for Company model"""
-    hr_contacts_count = serializers.SerializerMethodField()
-    jobs_count = serializers.SerializerMethodField()
+class CompanySerializer(ValuesFastPathMixin, serializers.ModelSerializer):
+    """Serializer for Company model (counts are the denormalized Company columns)"""
     
     class Meta:
         model = Company
@@ -157,11 +292,32 @@ class CompanySerializer(serializers.ModelSerializer):
                  'jobs_count', 'is_active', 'created_at', 'updated_at']
         read_only_fields = ['id', 'created_at', 'updated_at', 'hr_contacts_count', 'jobs_count']
     
-    def get_hr_contacts_count(self, obj):
-        return obj.hr_contacts.filter(is_active=True).count()
+    # Plain columns only
+    VALUES = {name: name for name in Meta.fields}
+
+
+class CompanySearchResultSerializer(CompanySerializer):
+    """Company search hit with its relevance score"""
+    rank = serializers.FloatField(read_only=True)
     
-    def get_jobs_count(self, obj):
-        return obj.jobs.filter(is_active=True).count()
+    class Meta(CompanySerializer.Meta):
+        fields = CompanySerializer.Meta.fields + ['rank']
+
+
+class FacetValueSerializer(serializers.Serializer):
+    value = serializers.CharField()
+    count = serializers.IntegerField()
+
+
+class FacetPageSerializer(serializers.Serializer):
+    """Search page plus per-value counts of each facet ({facet: [{value, count}]}, most common first)"""
+    next_cursor = serializers.CharField(allow_null=True)
+    page_size = serializers.IntegerField()
+    facets = serializers.DictField(child=FacetValueSerializer(many=True))
+
+
+class CompanyFacetPageSerializer(FacetPageSerializer):
+    results = CompanySearchResultSerializer(many=True)
 
 
 class CompanyCreateSerializer(serializers.ModelSerializer):
@@ -256,10 +412,21 @@ class HRContactUpdateSerializer(serializers.ModelSerializer):
         return value
 
 
-class HRContactListSerializer(serializers.ModelSerializer):
+class HRContactListSerializer(ValuesFastPathMixin, serializers.ModelSerializer):
     company_name = serializers.CharField(source='company.name', read_only=True)
     company_id = serializers.CharField(source='company.company_id', read_only=True)
     full_name = serializers.ReadOnlyField()
+    
+    VALUES = {
+        'id': 'id',
+        'company_id': 'company__company_id',
+        'company_name': 'company__name',
+        'full_name': (lambda first_name, last_name: f"{first_name} {last_name}", 'first_name', 'last_name'),
+        'email': 'email',
+        'email_verified': 'email_verified',
+        'linkedin_verified': 'linkedin_verified',
+        'created_at': 'created_at',
+    }
 
     class Meta:
         model = HRContact
@@ -275,6 +442,14 @@ class HRContactListSerializer(serializers.ModelSerializer):
         ]
 
 
+class HRContactSearchResultSerializer(HRContactListSerializer):
+    """HR contact search hit with its relevance score"""
+    rank = serializers.FloatField(read_only=True)
+
+    class Meta(HRContactListSerializer.Meta):
+        fields = HRContactListSerializer.Meta.fields + ['rank']
+
+
 
 # Bulk Upload Serializers
 class CompanyBulkUploadSerializer(serializers.Serializer):
@@ -298,18 +473,40 @@ class HRContactBulkUploadSerializer(serializers.Serializer):
 
 
 class BulkUploadResponseSerializer(serializers.Serializer):
-    """Serializer for bulk upload response"""
-    success_count = serializers.IntegerField()
-    error_count = serializers.IntegerField()
-    errors = serializers.ListField(child=serializers.CharField(), required=False)
-    warnings = serializers.ListField(child=serializers.CharField(), required=False)
+    """Serializer for bulk upload response (the result of a completed bulk upload job)"""
+    success = serializers.BooleanField()
+    message = serializers.CharField()
+    total_rows = serializers.IntegerField()
+    created = serializers.IntegerField()
+    updated = serializers.IntegerField(required=False)  # HR contacts only (upserted on email)
+    errors = serializers.IntegerField()
+    error_details = serializers.ListField(child=serializers.CharField())
+    created_company_ids = serializers.ListField(child=serializers.CharField(), required=False)
+    created_emails = serializers.ListField(child=serializers.CharField(), required=False)
+
+
+class BulkUploadJobSerializer(serializers.ModelSerializer):
+    """Serializer for bulk upload job progress (poll until status is completed or failed)"""
+    job_id = serializers.UUIDField(source='id', read_only=True)
+    error_details = serializers.SerializerMethodField()
+    # Running totals while the job runs, the upload response once it has completed
+    result = BulkUploadResponseSerializer(read_only=True, allow_null=True)
+    
+    class Meta:
+        model = BulkUploadJob
+        fields = ['job_id', 'kind', 'status', 'file_name', 'total_rows', 'processed_rows', 'error_count',
+                 'error_details', 'result', 'error', 'created_at', 'started_at', 'finished_at']
+        read_only_fields = fields
+    
+    def get_error_details(self, obj):
+        """First "Row N: ..." errors found so far"""
+        return (obj.result or {}).get('error_details', [])
 
 
 class CompanyStatsSerializer(serializers.Serializer):
     """Serializer for company statistics"""
     total_companies = serializers.IntegerField()
     active_companies = serializers.IntegerField()
-    companies_by_industry = serializers.DictField()
     companies_by_size = serializers.DictField()
 
 
@@ -341,12 +538,12 @@ class JobSerializer(serializers.ModelSerializer):
                            'company_id', 'title_display', 'job_type_display', 'hasHR']
 
     def get_hasHR(self, obj):
-        # If view annotated the queryset with `has_hr` (Exists subquery), prefer that value
+        # If view annotated the queryset with `has_hr` (Job.has_hr_expression), prefer that value
         if hasattr(obj, 'has_hr'):
             return bool(getattr(obj, 'has_hr'))
 
-        # Fallback: perform a fast existence check
-        return obj.company.hr_contacts.filter(is_active=True).exists()
+        # Fallback: the company's active HR contact counter
+        return obj.company.hr_contacts_count > 0
 
 
 class JobCreateSerializer(serializers.ModelSerializer):
@@ -377,7 +574,11 @@ class JobUpdateSerializer(serializers.ModelSerializer):
         fields = ['title', 'job_type', 'is_active']
 
 
-class JobListSerializer(serializers.ModelSerializer):
+# get_title_display / get_job_type_display without a model instance
+JOB_TYPE_LABELS = dict(Job.JOB_TYPE_CHOICES)
+
+
+class JobListSerializer(ValuesFastPathMixin, serializers.ModelSerializer):
     """Simplified serializer for job lists"""
     company_name = serializers.CharField(source='company.name', read_only=True)
     company_id = serializers.CharField(source='company.company_id', read_only=True)
@@ -386,6 +587,19 @@ class JobListSerializer(serializers.ModelSerializer):
     
     # Expose whether this job has at least one active HR contact for its company
     hasHR = serializers.SerializerMethodField()
+    
+    # The fast path expects querysets annotated with `has_hr`
+    VALUES = {
+        'id': 'id',
+        'title': 'title',
+        'title_display': (lambda value: JOB_TYPE_LABELS.get(value, value), 'title'),
+        'job_type': 'job_type',
+        'job_type_display': (lambda value: JOB_TYPE_LABELS.get(value, value), 'job_type'),
+        'company_id': 'company__company_id',
+        'company_name': 'company__name',
+        'posted_date': 'posted_date',
+        'hasHR': (bool, 'has_hr'),
+    }
 
     class Meta:
         model = Job
@@ -395,4 +609,27 @@ class JobListSerializer(serializers.ModelSerializer):
     def get_hasHR(self, obj):
         if hasattr(obj, 'has_hr'):
             return bool(getattr(obj, 'has_hr'))
-        return obj.company.hr_contacts.filter(is_active=True).exists()
\ No newline at end of file
+        return obj.company.hr_contacts_count > 0
+
+
+class JobMatchSerializer(JobListSerializer):
+    """Job recommended for a resume, with its similarity score (0..1)"""
+    score = serializers.FloatField(read_only=True)
+    
+    # `score` comes from the matcher, not the database
+    VALUES = {**JobListSerializer.VALUES, 'score': 'score'}
+    
+    class Meta(JobListSerializer.Meta):
+        fields = JobListSerializer.Meta.fields + ['score']
+
+
+class JobSearchResultSerializer(JobListSerializer):
+    """Job search hit with its relevance score"""
+    rank = serializers.FloatField(read_only=True)
+
+    class Meta(JobListSerializer.Meta):
+        fields = JobListSerializer.Meta.fields + ['rank']
+
+
+class JobFacetPageSerializer(FacetPageSerializer):
+    results = JobSearchResultSerializer(many=True)
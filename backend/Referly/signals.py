@@ -0,0 +1,68 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_delete
+from django.dispatch import receiver
+
+from .models import BulkUploadSheet, Company, HRContact, Job, Resume, Template, UserQuota
+from .storage import get_resume_storage
+from .utils import DirectoryCache, FolderStructureManager
+
+
+@receiver(pre_delete, sender=Resume)
+def release_resume_blob(sender, instance, **kwargs):
+    """Hard deletes (views, admin, user cascades) drop the blob reference of still-active resumes"""
+    instance.soft_delete()
+
+
+@receiver(pre_delete, sender=Template)
+def release_template_slot(sender, instance, **kwargs):
+    """Hard deletes of still-active templates free their quota slot"""
+    instance.soft_delete()
+
+
+@receiver(post_save, sender=Template)
+@receiver(post_delete, sender=Template)
+@receiver(post_save, sender=Resume)
+@receiver(post_delete, sender=Resume)
+@receiver(post_save, sender=UserQuota)
+@receiver(post_delete, sender=UserQuota)
+def invalidate_folder_structure(sender, instance, **kwargs):
+    """Any change to a user's templates, resumes or limits invalidates their cached folder tree"""
+    FolderStructureManager.invalidate(instance.user_id)
+
+
+@receiver(post_save, sender=Company)
+@receiver(post_save, sender=HRContact)
+@receiver(post_save, sender=Job)
+def refresh_search_vector(sender, instance, created, update_fields=None, **kwargs):
+    """Recompute the row's weighted tsvector in SQL (bulk writes use `rebuild_search_vectors`)"""
+    sender.objects.filter(pk=instance.pk).update(search_vector=sender.search_document())
+    if sender is Company and not created and (update_fields is None or 'name' in update_fields) and instance.name_changed:
+        # Contacts and jobs index their company's name (`update_fields` always lists it: compare to the loaded one)
+        HRContact.objects.filter(company=instance).update(search_vector=HRContact.search_document())
+        Job.objects.filter(company=instance).update(search_vector=Job.search_document())
+
+
+@receiver(post_delete, sender=Company)
+@receiver(post_delete, sender=HRContact)
+@receiver(post_delete, sender=Job)
+def release_rollups(sender, instance, **kwargs):
+    """Hard deletes take the row out of its company's counter and the directory stats"""
+    instance.apply_rollups(instance.tracked_state(), None)
+
+
+@receiver(post_save, sender=Company)
+@receiver(post_delete, sender=Company)
+@receiver(post_save, sender=HRContact)
+@receiver(post_delete, sender=HRContact)
+@receiver(post_save, sender=Job)
+@receiver(post_delete, sender=Job)
+def bump_directory_version(sender, instance, **kwargs):
+    """Any committed company / contact / job write moves cached directory responses to a new version"""
+    DirectoryCache.bump_on_commit(sender)
+
+
+@receiver(post_delete, sender=BulkUploadSheet)
+def delete_bulk_upload_sheet(sender, instance, **kwargs):
+    """Finished (or deleted) jobs drop their sheet's storage object once the deletion commits"""
+    if instance.storage_key:
+        transaction.on_commit(lambda: get_resume_storage(required=True).delete(instance.storage_key))
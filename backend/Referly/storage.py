@@ -0,0 +1,174 @@
+import os
+from functools import lru_cache
+from pathlib import Path
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+
+
+DEFAULT_CHUNK_SIZE = 64 * 1024
+
+
+class BaseResumeStorage:
+    """
+    Interface for resume byte storage backends.
+    Backends only deal with opaque object keys; metadata stays in Postgres.
+    """
+    supports_presigned_urls = False
+
+    def __init__(self, options):
+        self.options = options
+
+    def save(self, key, content):
+        """Store bytes or a file-like object under `key`"""
+        raise NotImplementedError
+
+    def open(self, key, chunk_size=DEFAULT_CHUNK_SIZE, start=0, end=None):
+        """Return an iterator over the stored bytes (optionally the inclusive slice start..end) in `chunk_size` pieces"""
+        raise NotImplementedError
+
+    def delete(self, key):
+        raise NotImplementedError
+
+    def exists(self, key):
+        raise NotImplementedError
+
+    def presigned_url(self, key, filename, content_type, disposition='attachment', expires=None):
+        """Return a short-lived URL the client can fetch the object from directly"""
+        raise NotImplementedError(f"{type(self).__name__} does not support presigned URLs")
+
+
+class FileSystemResumeStorage(BaseResumeStorage):
+    """Stores resume objects on local disk (development / single-node setups)"""
+
+    def __init__(self, options):
+        super().__init__(options)
+        self.location = Path(options.get('LOCATION') or Path(settings.BASE_DIR) / 'referly_storage')
+
+    def _path(self, key):
+        path = (self.location / key).resolve()
+        if self.location.resolve() not in path.parents:
+            raise ValueError(f"Invalid storage key: {key}")
+        return path
+
+    def save(self, key, content):
+        path = self._path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_suffix(path.suffix + '.part')
+        with open(tmp_path, 'wb') as f:
+            if isinstance(content, (bytes, bytearray, memoryview)):
+                f.write(content)
+            else:
+                for chunk in iter(lambda: content.read(DEFAULT_CHUNK_SIZE), b''):
+                    f.write(chunk)
+        os.replace(tmp_path, path)
+
+    def open(self, key, chunk_size=DEFAULT_CHUNK_SIZE, start=0, end=None):
+        with open(self._path(key), 'rb') as f:
+            f.seek(start)
+            remaining = None if end is None else end - start + 1
+            while remaining is None or remaining > 0:
+                chunk = f.read(chunk_size if remaining is None else min(chunk_size, remaining))
+                if not chunk:
+                    break
+                if remaining is not None:
+                    remaining -= len(chunk)
+                yield chunk
+
+    def delete(self, key):
+        try:
+            self._path(key).unlink()
+        except FileNotFoundError:
+            pass
+
+    def exists(self, key):
+        return self._path(key).exists()
+
+
+class S3ResumeStorage(BaseResumeStorage):
+    """Stores resume objects in an S3-compatible bucket (MinIO in our docker setup)"""
+    supports_presigned_urls = True
+
+    def __init__(self, options):
+        super().__init__(options)
+        import boto3
+        from botocore.config import Config
+
+        self.bucket = options['BUCKET']
+        self.client = boto3.client(
+            's3',
+            endpoint_url=options.get('ENDPOINT_URL') or None,
+            aws_access_key_id=options.get('ACCESS_KEY'),
+            aws_secret_access_key=options.get('SECRET_KEY'),
+            region_name=options.get('REGION'),
+            config=Config(signature_version='s3v4', s3={'addressing_style': 'path'}),
+        )
+
+    def save(self, key, content):
+        if isinstance(content, (bytes, bytearray, memoryview)):
+            self.client.put_object(Bucket=self.bucket, Key=key, Body=bytes(content))
+        else:
+            # upload_fileobj streams multipart uploads instead of buffering the whole file
+            self.client.upload_fileobj(content, self.bucket, key)
+
+    def open(self, key, chunk_size=DEFAULT_CHUNK_SIZE, start=0, end=None):
+        params = {'Bucket': self.bucket, 'Key': key}
+        if start or end is not None:
+            params['Range'] = f"bytes={start}-{'' if end is None else end}"
+        body = self.client.get_object(**params)['Body']
+        try:
+            yield from body.iter_chunks(chunk_size)
+        finally:
+            body.close()
+
+    def delete(self, key):
+        self.client.delete_object(Bucket=self.bucket, Key=key)
+
+    def exists(self, key):
+        from botocore.exceptions import ClientError
+
+        try:
+            self.client.head_object(Bucket=self.bucket, Key=key)
+            return True
+        except ClientError:
+            return False
+
+    def presigned_url(self, key, filename, content_type, disposition='attachment', expires=None):
+        return self.client.generate_presigned_url(
+            'get_object',
+            Params={
+                'Bucket': self.bucket,
+                'Key': key,
+                'ResponseContentType': content_type,
+                'ResponseContentDisposition': f'{disposition}; filename="{filename}"',
+            },
+            ExpiresIn=expires or self.options.get('PRESIGNED_URL_EXPIRY', 300),
+        )
+
+
+STORAGE_BACKENDS = {
+    'filesystem': FileSystemResumeStorage,
+    's3': S3ResumeStorage,
+}
+
+
+@lru_cache(maxsize=None)
+def _build_storage(backend):
+    try:
+        storage_class = STORAGE_BACKENDS[backend]
+    except KeyError:
+        raise ImproperlyConfigured(f"Unknown REFERLY_STORAGE backend: {backend}")
+    return storage_class(settings.REFERLY_STORAGE)
+
+
+def get_resume_storage(required=False):
+    """
+    Return the configured external storage backend.
+    Returns None for the "database" backend (bytes stay in Postgres) unless `required` is set.
+    """
+    backend = settings.REFERLY_STORAGE.get('BACKEND', 'database')
+    if backend == 'database':
+        if required:
+            raise ImproperlyConfigured("Resume has an external storage key but REFERLY_STORAGE uses the database backend")
+        return None
+    return _build_storage(backend)
@@ -1,3 +1,2026 @@
-from django.test import TestCase
+import base64
+import hashlib
+import io
+import json
+import math
+import os
+import random
+import shutil
+import tempfile
+import threading
+import unittest
+from datetime import timedelta
+from unittest import mock
 
-# Create your tests here.
+import pandas as pd
+from django.contrib.auth.models import User
+from django.contrib.postgres.search import SearchQuery
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import ImproperlyConfigured
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection, transaction
+from django.test import RequestFactory, SimpleTestCase, TestCase, TransactionTestCase
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.request import Request
+from rest_framework.test import APIClient, APIRequestFactory
+
+from accounts.models import CustomUser
+from features.models import Feature, UserFeature
+from .compiler import TemplateCompiler
+from .converters import ConversionError, ThumbnailGenerator
+from .fields import FORMAT_RAW, FORMAT_ZLIB, FORMAT_ZSTD, StoredValue, compress, decompress, stored_format
+from .management.commands.process_bulk_uploads import Command as BulkUploadWorker
+from .management.commands.render_resumes import Command as RenderWorker
+from .matching import JobMatcher, MatchIndex, term_counts
+from .pagination import InvalidCursor, KeysetPaginator
+from .renderers import ORJSONRenderer
+from .responses import parse_range, resume_file_response
+from .storage import _build_storage
+from .serializers import CompanySerializer, HRContactListSerializer, JobListSerializer, TemplateSerializer
+from .utils import (
+    CompanyBulkImporter, DirectoryCache, FolderStructureManager, HRContactBulkImporter, LRUCache, ResumeEmailEncoder,
+    Typeahead,
+)
+from .models import SEARCH_CONFIG, BulkUploadJob, BulkUploadSheet, Company, DirectoryStat, HRContact, Job, JobReclaimed, QuotaExceeded, Resume, ResumeBlob, ResumeRendition, ResumeUploadSession, Template, UserQuota
+
+
+LOCAL_CACHE = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+
+
+def referly_client(username='referly'):
+    """APIClient logged in as a new user with the Referly feature enabled"""
+    user = User.objects.create(username=username)
+    feature, _ = Feature.objects.get_or_create(code='referly', defaults={'name': 'Referly'})
+    UserFeature.objects.create(user=user, feature=feature, is_active=True)
+    client = APIClient()
+    client.force_authenticate(user)
+    return client
+
+
+def use_shared_cache(test):
+    """Run the rest of `test` on a FileBasedCache, which is shared between processes like Redis"""
+    directory = tempfile.mkdtemp()
+    test.addCleanup(shutil.rmtree, directory, True)
+    shared = override_settings(CACHES={
+        'default': {'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache', 'LOCATION': directory},
+    })
+    shared.enable()
+    test.addCleanup(shared.disable)
+
+
+@unittest.skipUnless(connection.vendor == 'postgresql', 'Query plans are checked against PostgreSQL')
+class HotPathQueryPlanTests(TestCase):
+    """
+    Seed a production-like directory, ANALYZE it, then EXPLAIN every query the hot list views run and
+    fail if the planner falls back to a sequential scan of the tables those views page through.
+    Guards the partial / composite indexes on Company, HRContact and Job (and Template's user key).
+    """
+    COMPANIES = 2000
+    CONTACTS_PER_COMPANY = 20
+    JOBS_PER_COMPANY = 12
+    USERS = 500
+    TEMPLATES_PER_USER = 8
+
+    @classmethod
+    def setUpTestData(cls):
+        now = timezone.now()
+        # bulk_create skips save() and the signals: no rollups or search vectors, just rows
+        companies = Company.objects.bulk_create([
+            Company(
+                company_id=f'COMP{index:05d}', name=f'Company {index}', headquarters='Berlin',
+                company_size='51-200', is_active=index % 10 != 0,
+            )
+            for index in range(cls.COMPANIES)
+        ])
+        HRContact.objects.bulk_create([
+            HRContact(
+                company=company, first_name=f'First{contact}', last_name=f'Last{contact}',
+                email=f'hr{contact}@{company.company_id.lower()}.example', is_active=contact % 8 != 0,
+                email_verified=contact % 3 == 0,
+            )
+            for company in companies
+            for contact in range(cls.CONTACTS_PER_COMPANY)
+        ], batch_size=2000)
+        job_types = [value for value, _ in Job.JOB_TYPE_CHOICES][:cls.JOBS_PER_COMPANY]
+        jobs = Job.objects.bulk_create([
+            Job(company=company, title=job_type, job_type=job_type, is_active=offset % 6 != 0)
+            for company in companies
+            for offset, job_type in enumerate(job_types)
+        ], batch_size=2000)
+        # posted_date is auto_now_add: spread it out afterwards so the ordering isn't one big tie
+        for index, job in enumerate(jobs):
+            job.posted_date = now - timedelta(minutes=7 * index)
+        Job.objects.bulk_update(jobs, ['posted_date'], batch_size=2000)
+
+        users = User.objects.bulk_create([User(username=f'user{index}') for index in range(cls.USERS)])
+        Template.objects.bulk_create([
+            Template(
+                user=user, user_template_id=number, name=f'Template {number}',
+                html_content='<p>Hi {{ name }}</p>', is_active=number % 5 != 0,
+            )
+            for user in users
+            for number in range(1, cls.TEMPLATES_PER_USER + 1)
+        ], batch_size=2000)
+
+        cls.user = users[0]
+        feature = Feature.objects.create(name='Referly', code='referly')
+        UserFeature.objects.create(user=cls.user, feature=feature, is_active=True)
+        cls.company = companies[1]
+
+        with connection.cursor() as cursor:
+            for model in (Company, HRContact, Job, Template):
+                cursor.execute(f'ANALYZE {model._meta.db_table}')
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        # Directory listings are cached across requests: make every request reach the database
+        cache.clear()
+
+    @staticmethod
+    def explain(sql):
+        with connection.cursor() as cursor:
+            cursor.execute(f'EXPLAIN {sql}')
+            return '\n'.join(row[0] for row in cursor.fetchall())
+
+    def get_with_plans(self, url, tables, params=None):
+        """GET `url` and return (response, EXPLAIN output of each captured query touching `tables`)"""
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(url, params)
+        self.assertEqual(response.status_code, 200, response.content)
+        plans = [
+            self.explain(query['sql']) for query in context.captured_queries
+            if query['sql'].startswith('SELECT') and any(f'"{table}"' in query['sql'] for table in tables)
+        ]
+        self.assertTrue(plans, f'No queries against {tables} captured for {url}')
+        return response, plans
+
+    def assertIndexScans(self, url, models, params=None):
+        tables = [model._meta.db_table for model in models]
+        response, plans = self.get_with_plans(url, tables, params)
+        for plan in plans:
+            for table in tables:
+                self.assertNotIn(f'Seq Scan on {table}', plan, f'{url} scans {table} sequentially:\n{plan}')
+        return response
+
+    def test_job_list(self):
+        # Active jobs by -posted_date; `has_hr` comes from the company counter, not the contacts table
+        url = reverse('referly:job_list')
+        response = self.assertIndexScans(url, [Job, Company, HRContact])
+        # Deeper pages add the keyset predicate on (posted_date, pk)
+        cursor = response.json()['next_cursor']
+        self.assertIsNotNone(cursor)
+        self.assertIndexScans(url, [Job, Company, HRContact], {'cursor': cursor})
+
+    def test_jobs_by_company(self):
+        url = reverse('referly:jobs_by_company', args=[self.company.company_id])
+        self.assertIndexScans(url, [Company, Job, HRContact])
+
+    def test_hr_contacts_by_company(self):
+        url = reverse('referly:hr_by_company', args=[self.company.company_id])
+        response = self.assertIndexScans(url, [Company, HRContact], {'page_size': 10})
+        cursor = response.json()['next_cursor']
+        self.assertIsNotNone(cursor)
+        self.assertIndexScans(url, [Company, HRContact], {'page_size': 10, 'cursor': cursor})
+
+    def test_company_list(self):
+        url = reverse('referly:company_list')
+        response = self.assertIndexScans(url, [Company])
+        cursor = response.json()['next_cursor']
+        self.assertIsNotNone(cursor)
+        self.assertIndexScans(url, [Company], {'cursor': cursor})
+
+    def test_template_list(self):
+        self.assertIndexScans(reverse('referly:template_list'), [Template])
+
+
+class TemplateSanitizerTests(SimpleTestCase):
+    """`TemplateCompiler.compile` must not let script reach the compiled HTML in any spelling"""
+
+    def compiled(self, html):
+        return TemplateCompiler.compile(html)[0]
+
+    def test_script_schemes_are_dropped_however_obfuscated(self):
+        for href in [
+            'javascript:alert(1)', ' JaVaScRiPt:alert(1)', 'java&#9;script:alert(1)', 'java&#x0A;script:alert(1)',
+            '&#1;javascript:alert(1)', 'vbscript:msgbox(1)', 'data:text/html,<script>alert(1)</script>',
+            'data:image/svg+xml,<svg onload=alert(1)>',
+        ]:
+            with self.subTest(href=href):
+                self.assertEqual(self.compiled(f'<a href="{href}">x</a>'), '<a>x</a>')
+
+    def test_allowed_and_relative_urls_are_kept(self):
+        for url in ['https://example.com/a', 'http://example.com', 'mailto:hr@example.com', 'cid:logo', '/jobs?id=1',
+                    '{{ link }}', 'data:image/png;base64,iVBORw0KGgo=']:
+            with self.subTest(url=url):
+                self.assertEqual(self.compiled(f'<img src="{url}">'), f'<img src="{url}">')
+
+    def test_unsafe_inline_styles_are_dropped(self):
+        for style in [
+            'background:url(javascript:alert(1))', "background:url( 'java\tscript:alert(1)' )",
+            'width:expression(alert(1))', 'background:u\\72l(j\\61vascript:alert(1))', 'e/**/xpression(alert(1))',
+            'behavior:url(x.htc)', '-moz-binding:url(x.xml#xss)',
+        ]:
+            with self.subTest(style=style):
+                self.assertEqual(self.compiled(f'<p style="{style}">x</p>'), '<p>x</p>')
+        self.assertEqual(
+            self.compiled('<p style="background:url(https://example.com/bg.png); color: red">x</p>'),
+            '<p style="background:url(https://example.com/bg.png);color:red">x</p>',
+        )
+
+    def test_unsafe_stylesheet_rules_are_not_inlined_or_retained(self):
+        html = (
+            '<html><head><style>p{color:red} .x{background:url(javascript:alert(1))} '
+            '@media (max-width:600px){p{background:url(vbscript:x)}}</style></head>'
+            '<body><p class="x">a</p></body></html>'
+        )
+        self.assertEqual(self.compiled(html), '<html><head></head><body><p class="x" style="color:red">a</p></body></html>')
+
+    def test_meta_refresh_and_forms_are_removed(self):
+        self.assertEqual(self.compiled('<meta http-equiv=refresh content="0;url=javascript:alert(1)"><p>Hi</p>'), '<p>Hi</p>')
+        self.assertEqual(
+            self.compiled(
+                '<form action="https://evil.example"><p>Hi {{ name }}</p><input name="password">'
+                '<select><option>a</option></select><textarea>b</textarea><button>Send</button></form>'
+            ),
+            '<p>Hi {{ name }}</p>',
+        )
+
+    def test_nothing_inside_dropped_elements_survives(self):
+        self.assertEqual(self.compiled('<script><!DOCTYPE html><!--[if mso]>x<![endif]-->alert(1)</script><p>a</p>'), '<p>a</p>')
+        self.assertEqual(self.compiled('<!DOCTYPE html><p onclick="alert(1)">a</p>'), '<!DOCTYPE html><p>a</p>')
+
+
+class DirectoryCacheTests(TestCase):
+    """Directory responses are cached under per-model versions, and every write makes them unreachable"""
+
+    def setUp(self):
+        cache.clear()
+        self.client = referly_client()
+        self.url = reverse('referly:company_list')
+
+    def use_shared_cache(self):
+        use_shared_cache(self)
+
+    def names(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200, response.content)
+        return [row['name'] for row in response.json()['results']]
+
+    def test_bump_misses_and_rebuilds(self):
+        self.use_shared_cache()
+        request = Request(APIRequestFactory().get('/', {'search': 'acme'}))
+        builds = []
+
+        def build():
+            builds.append(1)
+            return {'build': len(builds)}
+
+        self.assertEqual(DirectoryCache.get_or_build('companies', request, [Company, Job], build), {'build': 1})
+        self.assertEqual(DirectoryCache.get_or_build('companies', request, [Company, Job], build), {'build': 1})
+        DirectoryCache.bump(Job)
+        self.assertEqual(DirectoryCache.get_or_build('companies', request, [Company, Job], build), {'build': 2})
+        self.assertEqual(DirectoryCache.get_or_build('companies', request, [Company, Job], build), {'build': 2})
+
+    def test_writes_invalidate_cached_listings_on_commit(self):
+        self.use_shared_cache()
+        Company.objects.create(company_id='ACME', name='Acme')
+        self.assertEqual(self.names(), ['Acme'])
+        with self.assertNumQueries(1):
+            # Cache hit: only the feature permission check
+            self.assertEqual(self.names(), ['Acme'])
+        with self.captureOnCommitCallbacks(execute=True):
+            Company.objects.create(company_id='BETA', name='Beta')
+        self.assertEqual(self.names(), ['Acme', 'Beta'])
+
+    @override_settings(CACHES=LOCAL_CACHE)
+    def test_per_process_cache_is_keyed_on_database_versions(self):
+        # LocMemCache (no CACHE_URL) never sees another process's cache, but does see its version counters
+        with self.captureOnCommitCallbacks(execute=True):
+            company = Company.objects.create(company_id='ACME', name='Acme')
+        self.assertEqual(self.names(), ['Acme'])
+        with self.assertNumQueries(2):
+            # Cache hit: the feature permission check and the version counters
+            self.assertEqual(self.names(), ['Acme'])
+        with self.captureOnCommitCallbacks(execute=True):
+            Company.objects.create(company_id='BETA', name='Beta')
+        self.assertEqual(self.names(), ['Acme', 'Beta'])
+        with self.captureOnCommitCallbacks(execute=True):
+            company.name = 'Acme Corp'
+            company.save()
+        self.assertEqual(self.names(), ['Acme Corp', 'Beta'])
+
+    @override_settings(CACHES=LOCAL_CACHE)
+    def test_versions_are_counted_in_the_database_without_shared_cache(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            company = Company.objects.create(company_id='ACME', name='Acme')
+        before = DirectoryCache.versions([Company, Job])
+        self.assertEqual(before, [1, 0])
+        with self.captureOnCommitCallbacks(execute=True):
+            company.is_active = False
+            company.save()
+        after_update = DirectoryCache.versions([Company, Job])
+        self.assertEqual(after_update, [2, 0])
+        with self.captureOnCommitCallbacks(execute=True):
+            Company.objects.filter(pk=company.pk).delete()
+        with self.assertNumQueries(1):
+            self.assertEqual(DirectoryCache.versions([Company, Job]), [3, 0])
+
+
+class MatchIndexTests(SimpleTestCase):
+    """`MatchIndex` scores are the exact TF-IDF cosine of the resume against each job's document"""
+    VOCABULARY = (
+        'python data cloud developer engineer web mobile machine learning backend frontend devops platform '
+        'analytics payments retail health security startup remote kubernetes django react'
+    ).split()
+
+    @staticmethod
+    def title_text(title):
+        return dict(Job.JOB_TYPE_CHOICES)[title]
+
+    def brute_force(self, companies, jobs, resume):
+        """{job pk: cosine} from one dense term dict per job document, computed the textbook way"""
+        weight = settings.REFERLY_MATCHING['TITLE_WEIGHT']
+        documents = {}
+        for pk, (company, title) in jobs.items():
+            counts = {}
+            for indices, values, factor in (
+                (*term_counts(self.title_text(title)), weight), (*companies[company], 1.0),
+            ):
+                for index, value in zip(indices.tolist(), values.tolist()):
+                    counts[index] = counts.get(index, 0.0) + value * factor
+            documents[pk] = counts
+        frequency = {}
+        for counts in documents.values():
+            for index in counts:
+                frequency[index] = frequency.get(index, 0) + 1
+        total = len(documents)
+
+        def idf(index):
+            return math.log((1 + total) / (1 + frequency.get(index, 0))) + 1
+
+        query = {index: value * idf(index) for index, value in zip(*(part.tolist() for part in resume))}
+        query_norm = math.sqrt(sum(value * value for value in query.values()))
+        scores = {}
+        for pk, counts in documents.items():
+            vector = {index: value * idf(index) for index, value in counts.items()}
+            norm = math.sqrt(sum(value * value for value in vector.values()))
+            dot = sum(value * vector.get(index, 0.0) for index, value in query.items())
+            scores[pk] = dot / (norm * query_norm) if norm and query_norm else 0.0
+        return scores
+
+    def check(self, vocabulary):
+        generator = random.Random(7)
+        titles = [value for value, _ in Job.JOB_TYPE_CHOICES]
+        companies = {
+            pk: term_counts(' '.join(generator.choice(vocabulary) for _ in range(generator.randint(3, 40))))
+            for pk in range(1, 48)
+        }
+        jobs = {}
+        for company in companies:
+            for title in generator.sample(titles, 8):
+                jobs[len(jobs) + 1] = (company, title)
+        resume = term_counts('Senior python developer: data engineering, cloud platform, machine learning, web')
+        index = MatchIndex(None, companies, jobs)
+        expected = self.brute_force(companies, jobs, resume)
+        ranked = index.top(*resume, limit=len(jobs))
+        self.assertEqual(len(ranked), len(jobs))
+        for pk, score in ranked:
+            self.assertAlmostEqual(score, expected[pk], places=5)
+        self.assertEqual([pk for pk, _ in ranked[:5]], sorted(expected, key=lambda pk: (-expected[pk], pk))[:5])
+
+    def test_scores_match_brute_force_when_titles_and_companies_share_terms(self):
+        # "python", "developer", "data", "cloud"... occur in both titles and company profiles
+        self.check(self.VOCABULARY)
+
+    def test_scores_match_brute_force_with_disjoint_vocabularies(self):
+        self.check(['alpha', 'bravo', 'charlie', 'delta', 'echo', 'foxtrot', 'golf', 'hotel'])
+
+
+@override_settings(CACHES=LOCAL_CACHE)
+class JobMatcherTests(TestCase):
+    """`JobMatcher` keeps one index per process and only rebuilds it after a committed company / job write"""
+    DATA = b'%PDF-1.4 matching'
+
+    def setUp(self):
+        cache.clear()
+        patcher = mock.patch.multiple(JobMatcher, _index=None, _companies=None, _jobs=None, _watermark=None)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.snake = Company.objects.create(company_id='SNAKE', name='Snake', about_us='Python and Django backends')
+            self.paint = Company.objects.create(company_id='PAINT', name='Paint', about_us='React frontends and design')
+            self.python_job = Job.objects.create(company=self.snake, title='python-developer', job_type='python-developer')
+            self.frontend_job = Job.objects.create(company=self.paint, title='frontend-developer', job_type='frontend-developer')
+        self.client = referly_client()
+        self.user = self.client.handler._force_user
+        self.resume = Resume.upload(self.user, 'CV', 'pdf', self.DATA, len(self.DATA))
+
+    def extract(self, text):
+        rendition = self.resume.get_rendition('text')
+        rendition.output_blob = ResumeBlob.acquire(text.encode('utf-8'))
+        rendition.status = ResumeRendition.STATUS_READY
+        rendition.save()
+
+    def matches(self, **params):
+        return self.client.get(reverse('referly:resume_matching_jobs', args=[self.resume.pk]), params)
+
+    def test_index_is_reused_until_a_write_commits(self):
+        index = JobMatcher.index()
+        with self.assertNumQueries(1):
+            # Only the version probe: one indexed read of the DirectoryStat counters
+            self.assertIs(JobMatcher.index(), index)
+        with self.captureOnCommitCallbacks(execute=True):
+            job = Job.objects.create(company=self.paint, title='data-scientist', job_type='data-scientist')
+        refreshed = JobMatcher.index()
+        self.assertIsNot(refreshed, index)
+        self.assertIn(job.pk, refreshed.job_pks)
+        with self.captureOnCommitCallbacks(execute=True):
+            job.is_active = False
+            job.save()
+        self.assertNotIn(job.pk, JobMatcher.index().job_pks)
+
+    def test_ranks_jobs_against_the_resume_text(self):
+        self.extract('Senior Python developer: Django backends, APIs')
+        ranked = JobMatcher.top_jobs(self.resume, 2)
+        self.assertEqual([pk for pk, _ in ranked], [self.python_job.pk, self.frontend_job.pk])
+        self.assertGreater(ranked[0][1], ranked[1][1])
+
+    def test_endpoint_waits_for_text_extraction(self):
+        response = self.matches()
+        self.assertEqual(response.status_code, 202, response.content)
+        self.assertEqual(response.json()['status'], 'pending')
+
+    def test_endpoint_returns_scored_jobs(self):
+        self.extract('Senior Python developer: Django backends, APIs')
+        response = self.matches()
+        self.assertEqual(response.status_code, 200, response.content)
+        results = response.json()['results']
+        self.assertEqual([row['id'] for row in results], [self.python_job.pk, self.frontend_job.pk])
+        self.assertGreater(results[0]['score'], results[1]['score'])
+        self.assertEqual(len(self.matches(limit='-3').json()['results']), 1)
+
+    def test_endpoint_is_scoped_to_the_owner(self):
+        other = referly_client('other')
+        response = other.get(reverse('referly:resume_matching_jobs', args=[self.resume.pk]))
+        self.assertEqual(response.status_code, 404)
+
+
+class DirectoryStatTests(TestCase):
+    def test_stats_endpoints_count_active_rows(self):
+        client = referly_client()
+        acme = Company.objects.create(company_id='ACME', name='Acme', company_size='1-50')
+        Company.objects.create(company_id='OLD', name='Old', company_size='1-50', is_active=False)
+        HRContact.objects.create(company=acme, first_name='Ada', last_name='L', email='ada@acme.example', email_verified=True)
+        HRContact.objects.create(company=acme, first_name='Bob', last_name='B', email='bob@acme.example', is_active=False)
+
+        companies = client.get(reverse('referly:company_stats')).json()
+        self.assertEqual(companies, {'total_companies': 1, 'active_companies': 1, 'companies_by_size': {'1-50': 1}})
+        contacts = client.get(reverse('referly:hr_contact_stats')).json()
+        self.assertEqual(contacts['total_hr_contacts'], 1)
+        self.assertEqual(contacts['verified_emails'], 1)
+        self.assertEqual(contacts['contacts_by_company'], {'Acme': 1})
+
+
+class DirectoryStatRebuildTests(TransactionTestCase):
+    """A rebuild racing a write must neither lose nor double count its delta"""
+
+    def run_in_thread(self, target):
+        def run():
+            try:
+                target()
+            finally:
+                connection.close()
+        thread = threading.Thread(target=run)
+        thread.start()
+        return thread
+
+    def test_rebuild_waits_for_uncommitted_deltas(self):
+        Company.objects.create(company_id='ACME', name='Acme', company_size='1-50')
+        DirectoryStat.rebuild('companies')
+        written = threading.Event()
+        release = threading.Event()
+
+        def write():
+            with transaction.atomic():
+                # save() applies the stat deltas under the scope's shared lock
+                Company.objects.create(company_id='BETA', name='Beta', company_size='1-50')
+                written.set()
+                release.wait(10)
+
+        rebuilt = {}
+        writer = self.run_in_thread(write)
+        self.assertTrue(written.wait(10))
+        rebuilder = self.run_in_thread(lambda: rebuilt.update(DirectoryStat.rebuild('companies')))
+        rebuilder.join(0.5)
+        self.assertTrue(rebuilder.is_alive(), 'rebuild did not wait for the open write')
+        release.set()
+        writer.join(10)
+        rebuilder.join(10)
+        self.assertEqual(rebuilt['active'], 2)
+        self.assertEqual(DirectoryStat.for_scope('companies'), {'total': 2, 'active': 2, 'size:1-50': 2})
+
+
+class UserQuotaTests(TestCase):
+    """Quota slots and per-user IDs come from the locked UserQuota row, never from counting the tables"""
+    DATA = b'%PDF-1.4 quota'
+
+    def setUp(self):
+        self.client = referly_client()
+        self.user = self.client.handler._force_user
+
+    def upload(self, name):
+        return Resume.upload(self.user, name, 'pdf', self.DATA, len(self.DATA))
+
+    def quota(self):
+        return UserQuota.objects.get(user=self.user)
+
+    def test_ids_are_sequential_and_never_reused(self):
+        first = self.upload('First')
+        second = self.upload('Second')
+        self.assertEqual((first.user_resume_id, second.user_resume_id), (1, 2))
+        first.soft_delete()
+        third = self.upload('Third')
+        self.assertEqual(third.user_resume_id, 3)
+        quota = self.quota()
+        self.assertEqual((quota.resume_count, quota.next_resume_id), (2, 4))
+
+    def test_full_quota_raises_without_taking_an_id_or_blob(self):
+        self.upload('First')
+        self.upload('Second')
+        with self.assertRaises(QuotaExceeded):
+            self.upload('Third')
+        quota = self.quota()
+        self.assertEqual((quota.resume_count, quota.next_resume_id), (2, 3))
+        self.assertEqual(ResumeBlob.objects.get(sha256=hashlib.sha256(self.DATA).hexdigest()).ref_count, 2)
+
+    def test_soft_delete_releases_once(self):
+        resume = self.upload('First')
+        template = Template.objects.create(user=self.user, name='Intro', html_content='<p>Hi</p>')
+        for _ in range(2):
+            resume.soft_delete()
+            template.soft_delete()
+        quota = self.quota()
+        self.assertEqual((quota.resume_count, quota.template_count), (0, 0))
+        # Hard deletes of rows already released don't release again
+        Resume.objects.get(pk=resume.pk).delete()
+        Template.objects.get(pk=template.pk).delete()
+        self.assertEqual((self.quota().resume_count, self.quota().template_count), (0, 0))
+
+    def test_check_is_a_single_row_read(self):
+        self.upload('First')
+        quota = UserQuota.for_user(self.user)
+        with self.assertNumQueries(1):
+            quota = UserQuota.for_user(self.user)
+        self.assertTrue(quota.can_create_resume())
+
+    def test_missing_row_is_seeded_from_the_tables(self):
+        self.upload('First')
+        self.upload('Second').soft_delete()
+        Template.objects.create(user=self.user, name='Intro', html_content='<p>Hi</p>')
+        UserQuota.objects.filter(user=self.user).delete()
+        quota = UserQuota.for_user(self.user)
+        self.assertEqual(
+            (quota.resume_count, quota.next_resume_id, quota.template_count, quota.next_template_id), (1, 3, 1, 2)
+        )
+
+    def test_endpoints_refuse_past_the_limit(self):
+        for name in ('First', 'Second'):
+            Template.objects.create(user=self.user, name=name, html_content='<p>Hi</p>')
+        response = self.client.post(reverse('referly:template_create'), {'name': 'Third', 'html_content': '<p>Hi</p>'})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('Maximum 2 templates', response.json()['error'])
+        self.assertEqual(self.quota().next_template_id, 3)
+
+
+class UserQuotaConcurrencyTests(TransactionTestCase):
+    """Concurrent uploads race on the UserQuota row lock, not on a COUNT(*) check"""
+
+    def test_parallel_uploads_cannot_overshoot_the_limit(self):
+        user = User.objects.create(username='racer')
+        UserQuota.for_user(user)
+        results = []
+        barrier = threading.Barrier(4)
+
+        def upload(index):
+            data = f'%PDF-1.4 racer {index}'.encode()
+            barrier.wait(10)
+            try:
+                results.append(Resume.upload(user, f'CV {index}', 'pdf', data, len(data)).user_resume_id)
+            except QuotaExceeded:
+                results.append(None)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=upload, args=(index,)) for index in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join(30)
+        self.assertEqual(sorted(result for result in results if result), [1, 2])
+        self.assertEqual(results.count(None), 2)
+        quota = UserQuota.objects.get(user=user)
+        self.assertEqual((quota.resume_count, quota.next_resume_id), (2, 3))
+
+
+class CompanyCounterTests(TestCase):
+    """hr_contacts_count / jobs_count follow contact and job writes through `adjust_counter`"""
+
+    def setUp(self):
+        self.acme = Company.objects.create(company_id='ACME', name='Acme')
+        self.beta = Company.objects.create(company_id='BETA', name='Beta')
+
+    def counts(self, company):
+        company = Company.objects.get(pk=company.pk)
+        return company.hr_contacts_count, company.jobs_count
+
+    def test_creates_count_active_rows_only(self):
+        HRContact.objects.create(company=self.acme, first_name='Ada', last_name='L', email='ada@acme.example')
+        HRContact.objects.create(company=self.acme, first_name='Bob', last_name='B', email='bob@acme.example', is_active=False)
+        Job.objects.create(company=self.acme, title='web-developer', job_type='web-developer')
+        self.assertEqual(self.counts(self.acme), (1, 1))
+
+    def test_moves_and_deactivation(self):
+        contact = HRContact.objects.create(company=self.acme, first_name='Ada', last_name='L', email='ada@acme.example')
+        job = Job.objects.create(company=self.acme, title='web-developer', job_type='web-developer')
+        contact.company = self.beta
+        contact.save()
+        job.company = self.beta
+        job.save()
+        self.assertEqual((self.counts(self.acme), self.counts(self.beta)), ((0, 0), (1, 1)))
+        # Saving again without a tracked change moves nothing
+        contact.first_name = 'Ada Augusta'
+        contact.save()
+        self.assertEqual(self.counts(self.beta), (1, 1))
+        job.is_active = False
+        job.save()
+        self.assertEqual(self.counts(self.beta), (1, 0))
+        job.is_active = True
+        job.save()
+        Job.objects.get(pk=job.pk).delete()
+        contact.delete()
+        self.assertEqual(self.counts(self.beta), (0, 0))
+
+    def test_delete_endpoints_decrement(self):
+        client = referly_client()
+        contact = HRContact.objects.create(company=self.acme, first_name='Ada', last_name='L', email='ada@acme.example')
+        job = Job.objects.create(company=self.acme, title='web-developer', job_type='web-developer')
+        self.assertEqual(client.delete(reverse('referly:hr_contact_detail', args=[contact.pk])).status_code, 204)
+        self.assertEqual(client.delete(reverse('referly:job_detail', args=[job.pk])).status_code, 204)
+        self.assertEqual(self.counts(self.acme), (0, 0))
+
+    def test_stale_company_instance_keeps_the_counters(self):
+        company = Company.objects.get(pk=self.acme.pk)
+        HRContact.objects.create(company=self.acme, first_name='Ada', last_name='L', email='ada@acme.example')
+        company.about_us = 'Rockets'
+        company.save()
+        self.assertEqual(self.counts(self.acme), (1, 0))
+
+    def test_counters_never_go_negative(self):
+        Company.adjust_counter('jobs_count', self.acme.pk, None)
+        self.assertEqual(self.counts(self.acme), (0, 0))
+
+    def test_rebuild_repairs_drift(self):
+        HRContact.objects.create(company=self.acme, first_name='Ada', last_name='L', email='ada@acme.example')
+        Job.objects.create(company=self.beta, title='web-developer', job_type='web-developer')
+        Company.objects.update(hr_contacts_count=7, jobs_count=7)
+        call_command('rebuild_company_counters', stdout=io.StringIO())
+        self.assertEqual((self.counts(self.acme), self.counts(self.beta)), ((1, 0), (0, 1)))
+
+    def test_listing_reads_the_columns(self):
+        client = referly_client()
+
+        def list_queries():
+            cache.clear()
+            with CaptureQueriesContext(connection) as context:
+                response = client.get(reverse('referly:company_list'))
+            self.assertEqual(response.status_code, 200)
+            return len(context.captured_queries), response.json()['results']
+
+        HRContact.objects.create(company=self.acme, first_name='Ada', last_name='L', email='ada@acme.example')
+        few, results = list_queries()
+        self.assertEqual([(row['company_id'], row['hr_contacts_count']) for row in results], [('ACME', 1), ('BETA', 0)])
+        for index in range(10):
+            Company.objects.create(company_id=f'C{index}', name=f'Company {index}')
+        many, _ = list_queries()
+        self.assertEqual(many, few)
+
+
+class CompanyBulkImporterTests(TestCase):
+    def setUp(self):
+        Company.objects.create(company_id='EXIST', name='Existing', website='https://existing.example', company_size='1-50')
+        # Seeded, so the import has to move the rollup rather than have it recomputed
+        DirectoryStat.for_scope('companies')
+
+    def test_valid_rows_are_created_and_each_row_reports_its_first_error(self):
+        df = pd.DataFrame({
+            'Company Name': ['Acme', '', 'Beta', 'Acme', 'Gamma', 'Existing', 'Delta'],
+            'Website': ['https://acme.example', 'https://x.example', '', 'https://acme.example', 'https://g.example',
+                        'https://e.example', 'https://d.example'],
+            'Company ID': ['ACME', '', '', '', 'EXIST', '', ''],
+            'Founded Year': ['1999', '', 'abc', '', '', '', '19.5'],
+            'Company Size': ['51-200', '', '', '', '', '', ''],
+        })
+        result = CompanyBulkImporter.run(df)
+
+        self.assertEqual(result, {
+            'success': True,
+            'message': 'Uploaded 1 companies',
+            'total_rows': 7,
+            'created': 1,
+            'errors': 6,
+            'error_details': [
+                'Row 3: Missing company name',
+                'Row 4: Missing website',
+                "Row 5: Company name 'Acme' already exists",
+                "Row 6: Company ID 'EXIST' already exists",
+                "Row 7: Company name 'Existing' already exists",
+                "Row 8: Founded year '19.5' is not a valid year",
+            ],
+            'created_company_ids': ['ACME'],
+        })
+        acme = Company.objects.get(company_id='ACME')
+        self.assertEqual((acme.name, acme.founded_year, acme.company_size, acme.is_active), ('Acme', 1999, '51-200', True))
+        self.assertEqual(
+            DirectoryStat.for_scope('companies'), {'total': 2, 'active': 2, 'size:1-50': 1, 'size:51-200': 1}
+        )
+        self.assertEqual(DirectoryStat.for_scope('companies'), DirectoryStat.rebuild('companies'))
+        self.assertQuerySetEqual(
+            Company.objects.filter(search_vector=SearchQuery('acme', config=SEARCH_CONFIG)), [acme]
+        )
+
+    def test_error_details_are_capped_but_every_error_is_counted(self):
+        df = pd.DataFrame({'Company Name': [''] * 25, 'Website': ['https://x.example'] * 25})
+        result = CompanyBulkImporter.run(df)
+        self.assertEqual(result['errors'], 25)
+        self.assertEqual(len(result['error_details']), CompanyBulkImporter.MAX_ERROR_DETAILS)
+        self.assertEqual(result['error_details'][-1], 'Row 21: Missing company name')
+
+    def test_generated_ids_skip_taken_ones(self):
+        Company.objects.create(company_id='NORTHWIND_TRADERS_IN', name='Northwind', website='https://n.example')
+        df = pd.DataFrame({
+            'Company Name': ['Northwind Traders International', 'Northwind Traders India', 'Small Co'],
+            'Website': ['https://a.example', 'https://b.example', 'https://c.example'],
+        })
+        result = CompanyBulkImporter.run(df)
+        self.assertEqual(
+            result['created_company_ids'], ['NORTHWIND_TRADERS_IN_1', 'NORTHWIND_TRADERS_IN_2', 'SMALL_CO']
+        )
+        self.assertEqual(
+            Company.objects.get(name='Northwind Traders India').company_id, 'NORTHWIND_TRADERS_IN_2'
+        )
+
+    def test_founded_year_accepts_whole_numbers_only(self):
+        df = pd.DataFrame({
+            'Company Name': ['A', 'B', 'C', 'D', 'E'],
+            'Website': ['https://x.example'] * 5,
+            # Excel hands numeric cells over as floats
+            'Founded Year': [2001.0, '1890', '', -5, '20x1'],
+        })
+        result = CompanyBulkImporter.run(df)
+        self.assertEqual(result['error_details'], [
+            "Row 5: Founded year '-5' is not a valid year",
+            "Row 6: Founded year '20x1' is not a valid year",
+        ])
+        years = dict(Company.objects.filter(name__in=['A', 'B', 'C']).values_list('name', 'founded_year'))
+        self.assertEqual(years, {'A': 2001, 'B': 1890, 'C': None})
+
+    def test_legacy_location_and_employee_count_columns(self):
+        df = pd.DataFrame({
+            'Company': ['Acme'],
+            'Domain': ['https://acme.example'],
+            'Location': ['Berlin'],
+            'Employee Count Range': ['201-500'],
+        })
+        CompanyBulkImporter.run(df)
+        acme = Company.objects.get(name='Acme')
+        self.assertEqual((acme.website, acme.headquarters, acme.company_size), ('https://acme.example', 'Berlin', '201-500'))
+        self.assertEqual(DirectoryStat.for_scope('companies')['size:201-500'], 1)
+
+
+class HRContactBulkImporterTests(TestCase):
+    def setUp(self):
+        self.acme = Company.objects.create(company_id='ACME', name='Acme', website='https://acme.example')
+        self.beta = Company.objects.create(company_id='BETA', name='Beta', website='https://beta.example')
+        DirectoryStat.for_scope('hr_contacts')
+
+    def sheet(self, *rows):
+        return pd.DataFrame(rows, columns=['First Name', 'Last Name', 'Email', 'Company ID', 'Company Name'])
+
+    def test_errors_and_duplicate_emails_in_the_file(self):
+        Company.objects.create(company_id='ACME2', name='ACME', website='https://acme2.example')
+        result = HRContactBulkImporter.run(self.sheet(
+            ('Ada', 'Lovelace', 'Ada@Acme.example', 'ACME', ''),
+            ('Ada', 'Again', 'ada@acme.example', 'BETA', ''),
+            ('', 'Nameless', 'not-an-email', 'ACME', ''),
+            ('Bob', 'Builder', 'bob@example', 'ACME', ''),
+            ('Cy', 'Nomad', 'cy@acme.example', '', ''),
+            ('Di', 'Lost', 'di@acme.example', 'NOPE', ''),
+            ('Ed', 'Twice', 'ed@acme.example', '', 'acme'),
+            ('Flo', 'Found', 'flo@beta.example', '', 'beta'),
+        ))
+        self.assertEqual(result, {
+            'success': True,
+            'message': 'Uploaded 2 HR contacts (2 new, 0 updated)',
+            'total_rows': 8,
+            'created': 2,
+            'updated': 0,
+            'errors': 6,
+            'error_details': [
+                'Row 3: Duplicate email in file: ada@acme.example',
+                'Row 4: Missing first name',
+                'Row 5: Invalid email format: bob@example',
+                'Row 6: Missing company reference (company_id or company_name)',
+                'Row 7: Company ID not found: NOPE',
+                'Row 8: Multiple companies found with name: acme',
+            ],
+            'created_emails': ['ada@acme.example', 'flo@beta.example'],
+        })
+        self.assertEqual(HRContact.objects.get(email='ada@acme.example').company, self.acme)
+        self.assertEqual(HRContact.objects.get(email='flo@beta.example').company, self.beta)
+        self.assertQuerySetEqual(
+            HRContact.objects.filter(search_vector=SearchQuery('lovelace', config=SEARCH_CONFIG)).values_list('email', flat=True),
+            ['ada@acme.example'],
+        )
+
+    def test_reupload_updates_and_keeps_verification(self):
+        HRContact.objects.create(
+            company=self.acme, first_name='Ada', last_name='L', email='ada@acme.example',
+            email_verified=True, linkedin_verified=True,
+        )
+        result = HRContactBulkImporter.run(self.sheet(
+            ('Ada', 'Lovelace', 'ada@acme.example', 'ACME', ''),
+            ('Bob', 'Builder', 'bob@acme.example', 'ACME', ''),
+        ))
+        self.assertEqual((result['created'], result['updated']), (1, 1))
+        self.assertEqual(result['message'], 'Uploaded 2 HR contacts (1 new, 1 updated)')
+        self.assertEqual(result['created_emails'], ['bob@acme.example'])
+        ada = HRContact.objects.get(email='ada@acme.example')
+        self.assertEqual((ada.last_name, ada.email_verified, ada.linkedin_verified), ('Lovelace', True, True))
+        self.assertEqual(HRContact.objects.count(), 2)
+        self.assertEqual(DirectoryStat.for_scope('hr_contacts'), DirectoryStat.rebuild('hr_contacts'))
+
+    def test_company_move_and_reactivation_update_the_rollups(self):
+        HRContact.objects.create(company=self.acme, first_name='Ada', last_name='L', email='ada@acme.example')
+        HRContact.objects.create(
+            company=self.acme, first_name='Bob', last_name='B', email='bob@acme.example',
+            email_verified=True, is_active=False,
+        )
+        self.assertEqual(
+            DirectoryStat.for_scope('hr_contacts'),
+            {'total': 2, 'active': 1, 'verified_emails': 0, 'verified_linkedin': 0},
+        )
+        HRContactBulkImporter.run(self.sheet(
+            ('Ada', 'L', 'ada@acme.example', 'BETA', ''),
+            ('Bob', 'B', 'bob@acme.example', 'ACME', ''),
+        ))
+        self.acme.refresh_from_db()
+        self.beta.refresh_from_db()
+        self.assertEqual((self.acme.hr_contacts_count, self.beta.hr_contacts_count), (1, 1))
+        self.assertTrue(HRContact.objects.get(email='bob@acme.example').is_active)
+        self.assertEqual(
+            DirectoryStat.for_scope('hr_contacts'),
+            {'total': 2, 'active': 2, 'verified_emails': 1, 'verified_linkedin': 0},
+        )
+        self.assertEqual(DirectoryStat.for_scope('hr_contacts'), DirectoryStat.rebuild('hr_contacts'))
+        # The search document follows the new company
+        self.assertQuerySetEqual(
+            HRContact.objects.filter(search_vector=SearchQuery('beta', config=SEARCH_CONFIG)).values_list('email', flat=True),
+            ['ada@acme.example'],
+        )
+
+    def test_query_count_does_not_grow_with_the_sheet(self):
+        def sheet(prefix, size):
+            return self.sheet(*[
+                (f'First{index}', f'Last{index}', f'{prefix}{index}@acme.example', 'ACME' if index % 2 else '', 'Beta')
+                for index in range(size)
+            ])
+
+        with CaptureQueriesContext(connection) as small:
+            HRContactBulkImporter.run(sheet('small', 2))
+        # Unchanged rows move no rollups, so a re-upload has its own (also constant) count
+        with CaptureQueriesContext(connection) as small_again:
+            HRContactBulkImporter.run(sheet('small', 2))
+        with self.assertNumQueries(len(small)):
+            HRContactBulkImporter.run(sheet('large', 200))
+        with self.assertNumQueries(len(small_again)):
+            HRContactBulkImporter.run(sheet('large', 200))
+
+
+@override_settings(REFERLY_BULK_UPLOAD={**settings.REFERLY_BULK_UPLOAD, 'CHUNK_ROWS': 2})
+class BulkUploadJobTests(TestCase):
+    def submit(self, df):
+        buffer = io.BytesIO()
+        df.to_excel(buffer, index=False)
+        user = User.objects.create(username='uploader')
+        return BulkUploadJob.submit(user, BulkUploadJob.KIND_COMPANIES, SimpleUploadedFile('companies.xlsx', buffer.getvalue()))
+
+    def companies(self, count, missing_website=()):
+        return pd.DataFrame({
+            'Company Name': [f'Company {index}' for index in range(count)],
+            'Website': ['' if index in missing_website else f'https://c{index}.example' for index in range(count)],
+        })
+
+    def worker(self):
+        return BulkUploadWorker(stdout=io.StringIO(), stderr=io.StringIO())
+
+    def test_claim_is_exclusive_until_the_job_goes_stale(self):
+        job = self.submit(self.companies(1))
+        claimed = BulkUploadJob.claim(job.pk)
+        self.assertEqual((claimed.status, claimed.attempts), (BulkUploadJob.STATUS_RUNNING, 1))
+        self.assertIsNone(BulkUploadJob.claim(job.pk))
+        BulkUploadJob.objects.filter(pk=job.pk).update(updated_at=timezone.now() - timedelta(hours=1))
+        self.assertEqual(BulkUploadJob.claim(job.pk).attempts, 2)
+        with self.assertRaises(JobReclaimed):
+            claimed.finish(BulkUploadJob.STATUS_COMPLETED)
+
+    def test_combine_sums_counts_and_caps_lists(self):
+        def part(created, errors):
+            return {
+                'success': True, 'message': '', 'total_rows': created + errors, 'created': created, 'errors': errors,
+                'error_details': [f'Row {index}: bad' for index in range(min(errors, 20))],
+                'created_company_ids': [f'C{index}' for index in range(min(created, 10))],
+            }
+
+        first = part(8, 15)
+        self.assertIs(CompanyBulkImporter.combine(None, first, CompanyBulkImporter.message), first)
+        combined = CompanyBulkImporter.combine(first, part(4, 10), CompanyBulkImporter.message)
+        self.assertEqual(
+            {key: combined[key] for key in ('success', 'message', 'total_rows', 'created', 'errors')},
+            {'success': True, 'message': 'Uploaded 12 companies', 'total_rows': 37, 'created': 12, 'errors': 25},
+        )
+        self.assertEqual(len(combined['error_details']), 20)
+        self.assertEqual(combined['created_company_ids'], [f'C{index}' for index in range(8)] + ['C0', 'C1'])
+
+    def test_chunked_import_keeps_sheet_row_numbers(self):
+        job = self.submit(self.companies(5, missing_website={1, 4}))
+        self.worker().process(job.pk)
+        job.refresh_from_db()
+        self.assertEqual(job.status, BulkUploadJob.STATUS_COMPLETED)
+        self.assertEqual((job.total_rows, job.processed_rows, job.error_count), (5, 5, 2))
+        self.assertEqual(job.result['message'], 'Uploaded 3 companies')
+        self.assertEqual(job.result['error_details'], ['Row 3: Missing website', 'Row 6: Missing website'])
+        self.assertEqual(Company.objects.count(), 3)
+        self.assertFalse(BulkUploadSheet.objects.filter(job=job).exists())
+
+    def test_reclaimed_job_resumes_after_the_last_committed_chunk(self):
+        job = self.submit(self.companies(5, missing_website={0}))
+        run = CompanyBulkImporter.run
+        calls = []
+
+        def dies_on_second_chunk(df):
+            calls.append(len(df))
+            if len(calls) == 2:
+                raise KeyboardInterrupt
+            return run(df)
+
+        with mock.patch.object(CompanyBulkImporter, 'run', side_effect=dies_on_second_chunk):
+            with self.assertRaises(KeyboardInterrupt):
+                self.worker().process(job.pk)
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.processed_rows), (BulkUploadJob.STATUS_RUNNING, 2))
+        self.assertEqual(Company.objects.count(), 1)
+
+        BulkUploadJob.objects.filter(pk=job.pk).update(updated_at=timezone.now() - timedelta(hours=1))
+        self.worker().process(job.pk)
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts, job.processed_rows), (BulkUploadJob.STATUS_COMPLETED, 2, 5))
+        self.assertEqual(
+            {key: job.result[key] for key in ('total_rows', 'created', 'errors', 'error_details')},
+            {'total_rows': 5, 'created': 4, 'errors': 1, 'error_details': ['Row 2: Missing website']},
+        )
+        self.assertEqual(Company.objects.count(), 4)
+
+    def test_stale_worker_cannot_commit_a_chunk_after_the_job_is_reclaimed(self):
+        job = self.submit(self.companies(3))
+        stale = BulkUploadJob.claim(job.pk)
+        stale.total_rows = 3
+        stale.save_progress('total_rows')
+        BulkUploadJob.objects.filter(pk=job.pk).update(updated_at=timezone.now() - timedelta(hours=1))
+        BulkUploadJob.claim(job.pk)
+        with self.assertRaises(JobReclaimed):
+            self.worker().run(stale)
+        self.assertEqual(Company.objects.count(), 0)
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.processed_rows, job.result), (BulkUploadJob.STATUS_RUNNING, 0, None))
+        self.assertTrue(BulkUploadSheet.objects.filter(job=job).exists())
+
+
+    def test_sheet_is_stored_under_the_job_not_as_a_resume_blob(self):
+        location = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, location, True)
+        storage_settings = override_settings(REFERLY_STORAGE={'BACKEND': 'filesystem', 'LOCATION': location})
+        storage_settings.enable()
+        self.addCleanup(storage_settings.disable)
+        _build_storage.cache_clear()
+        self.addCleanup(_build_storage.cache_clear)
+
+        job = self.submit(self.companies(2))
+        self.assertFalse(ResumeBlob.objects.exists())
+        self.assertEqual(job.sheet.storage_key, f'bulk-uploads/{job.pk}')
+        path = os.path.join(location, 'bulk-uploads', str(job.pk))
+        self.assertTrue(os.path.exists(path))
+        with self.captureOnCommitCallbacks(execute=True):
+            self.worker().process(job.pk)
+        self.assertFalse(BulkUploadSheet.objects.filter(job=job).exists())
+        self.assertFalse(os.path.exists(path))
+
+    def test_deleting_a_job_deletes_its_sheet(self):
+        job = self.submit(self.companies(2))
+        job.delete()
+        self.assertFalse(BulkUploadSheet.objects.exists())
+
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+
+class CompressionTests(SimpleTestCase):
+    HTML = ('<html><body>' + '<p style="color: #333">Hello {{first_name}}, ü ✓</p>' * 200 + '</body></html>').encode('utf-8')
+
+    def assertRoundTrips(self, data, codec, expected_format):
+        stored = compress(data, codec=codec)
+        self.assertEqual(stored[:2], bytes((0x00, expected_format)))
+        self.assertEqual(stored_format(stored), expected_format)
+        self.assertEqual(decompress(stored), data)
+        self.assertEqual(decompress(StoredValue(stored)), data)
+
+    def test_zlib_round_trip(self):
+        self.assertRoundTrips(self.HTML, 'zlib', FORMAT_ZLIB)
+
+    @unittest.skipUnless(zstandard, 'zstandard is not installed')
+    def test_zstd_round_trip(self):
+        self.assertRoundTrips(self.HTML, 'zstd', FORMAT_ZSTD)
+
+    def test_small_and_incompressible_values_are_stored_raw(self):
+        self.assertRoundTrips(b'', 'zlib', FORMAT_RAW)
+        self.assertRoundTrips(b'<p>short</p>', 'zlib', FORMAT_RAW)
+        self.assertRoundTrips(random.Random(0).randbytes(4096), 'zlib', FORMAT_RAW)
+
+    def test_legacy_rows_without_a_header_are_read_as_is(self):
+        for legacy in (b'%PDF-1.4 legacy resume', b'PK\x03\x04docx', '<p>plain ü</p>'.encode('utf-8'), b'\x00'):
+            self.assertIsNone(stored_format(legacy))
+            self.assertEqual(decompress(legacy), legacy)
+
+    def test_unknown_format_and_codec_are_rejected(self):
+        with self.assertRaises(ValueError):
+            decompress(b'\x00\x7fpayload')
+        with self.assertRaises(ImproperlyConfigured):
+            compress(self.HTML, codec='lz4')
+
+
+class CompressedFieldTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create(username='writer')
+        self.html = CompressionTests.HTML.decode('utf-8')
+
+    def test_text_round_trip_and_values_return_stored_bytes(self):
+        template = Template.objects.create(user=self.user, name='Intro', html_content=self.html)
+        self.assertEqual(Template.objects.get(pk=template.pk).html_content, self.html)
+
+        stored = Template.objects.filter(pk=template.pk).values_list('html_content', flat=True).get()
+        self.assertIsInstance(stored, bytes)
+        self.assertEqual(stored_format(stored), FORMAT_ZLIB)
+        self.assertEqual(decompress(stored).decode('utf-8'), self.html)
+        self.assertEqual(Template.objects.values('html_content').get(pk=template.pk)['html_content'], stored)
+
+    def test_legacy_plain_text_rows_are_read(self):
+        template = Template.objects.create(user=self.user, name='Intro', html_content='<p>new</p>')
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'UPDATE referly_template SET html_content = %s WHERE id = %s', [b'<p>legacy \xc3\xbc</p>', template.pk]
+            )
+        self.assertEqual(Template.objects.get(pk=template.pk).html_content, '<p>legacy ü</p>')
+
+    def test_untouched_values_are_written_back_unchanged(self):
+        template = Template.objects.create(user=self.user, name='Intro', html_content=self.html)
+        field = Template._meta.get_field('html_content')
+        stored = Template.objects.values_list('html_content', flat=True).get(pk=template.pk)
+
+        loaded = Template.objects.get(pk=template.pk)
+        self.assertTrue(field.is_untouched(loaded))
+        loaded.name = 'Renamed'
+        loaded.save()
+        self.assertEqual(Template.objects.values_list('html_content', flat=True).get(pk=template.pk), stored)
+
+        self.assertEqual(loaded.html_content, self.html)
+        self.assertFalse(field.is_untouched(loaded))
+
+    def test_binary_round_trip(self):
+        data = b'%PDF-1.4\n' + b'0 0 obj << >> endobj\n' * 500
+        blob = ResumeBlob.objects.create(sha256='0' * 64, size=len(data), content=data)
+        # The default manager defers the bytes; accessing them loads and decompresses
+        self.assertEqual(ResumeBlob.objects.get(pk=blob.pk).content, data)
+        stored = ResumeBlob.objects.values_list('content', flat=True).get(pk=blob.pk)
+        self.assertEqual(stored_format(stored), FORMAT_ZLIB)
+
+
+class KeysetPaginatorTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        sizes = ['1-50', '51-200', '1-50', '1-50', '51-200', '201-500', '1-50']
+        for index, size in enumerate(sizes):
+            Company.objects.create(
+                company_id=f'C{index}', name=f'Company {index % 3}{index}', website='https://c.example', company_size=size
+            )
+
+    def paginator(self, **params):
+        return KeysetPaginator(Request(APIRequestFactory().get('/', params)))
+
+    def walk(self, queryset, page_size):
+        """Every row of the listing, following next_cursor page by page"""
+        rows = []
+        cursor = None
+        while True:
+            params = {'page_size': page_size}
+            if cursor:
+                params['cursor'] = cursor
+            page, cursor = self.paginator(**params).paginate(queryset)
+            self.assertLessEqual(len(page), page_size)
+            rows += page
+            if cursor is None:
+                return rows
+
+    def test_ordering_for(self):
+        ordering_for = KeysetPaginator.ordering_for
+        self.assertEqual(ordering_for(Company.objects.all()), [('company_id', False), ('pk', False)])
+        self.assertEqual(ordering_for(Company.objects.order_by('-created_at')), [('created_at', True), ('pk', True)])
+        self.assertEqual(ordering_for(Company.objects.order_by('name', '-id', 'company_id')), [('name', False), ('pk', True)])
+        with self.assertRaises(ValueError):
+            ordering_for(Company.objects.order_by('?'))
+
+    def test_cursor_round_trip_keeps_exact_values(self):
+        keys = [('created_at', True), ('company__company_id', False), ('pk', True)]
+        created_at = timezone.now().replace(microsecond=123456)
+        cursor = KeysetPaginator.encode([created_at, 'ACME', 42])
+        self.assertNotIn('=', cursor)
+        self.assertEqual(KeysetPaginator.decode(cursor, keys, HRContact), [created_at, 'ACME', 42])
+
+    def test_tampered_and_garbage_cursors_are_rejected(self):
+        keys = KeysetPaginator.ordering_for(Company.objects.order_by('-created_at'))
+        for cursor in (
+            'not a cursor!',
+            KeysetPaginator.encode({'pk': 1}),
+            KeysetPaginator.encode(['2024-01-01T00:00:00+00:00']),
+            KeysetPaginator.encode(['yesterday', 1]),
+            KeysetPaginator.encode(['2024-01-01T00:00:00+00:00', 'one']),
+        ):
+            with self.subTest(cursor=cursor), self.assertRaises(InvalidCursor):
+                KeysetPaginator.decode(cursor, keys, Company)
+
+    def test_invalid_cursor_is_a_bad_request(self):
+        client = referly_client()
+        for cursor in ('garbage', KeysetPaginator.encode(['C1'])):
+            with self.subTest(cursor=cursor), override_settings(CACHES=LOCAL_CACHE):
+                response = client.get(reverse('referly:company_list'), {'cursor': cursor})
+                self.assertEqual(response.status_code, 400)
+                self.assertIn('error', response.json())
+
+    def test_pages_cover_ties_on_the_ordering_key_exactly_once(self):
+        for ordering in (('company_size',), ('-company_size', 'name'), ('company_size', '-created_at')):
+            queryset = Company.objects.order_by(*ordering)
+            expected = list(queryset.order_by(*ordering, 'pk' if not ordering[-1].startswith('-') else '-pk'))
+            for page_size in (1, 2, 3):
+                with self.subTest(ordering=ordering, page_size=page_size):
+                    self.assertEqual(self.walk(queryset, page_size), expected)
+
+    def test_page_size_is_clamped(self):
+        options = settings.REFERLY_PAGINATION
+        self.assertEqual(self.paginator().page_size, options['PAGE_SIZE'])
+        self.assertEqual(self.paginator(page_size='abc').page_size, options['PAGE_SIZE'])
+        self.assertEqual(self.paginator(page_size=0).page_size, 1)
+        self.assertEqual(self.paginator(page_size=-5).page_size, 1)
+        self.assertEqual(self.paginator(page_size=10 ** 6).page_size, options['MAX_PAGE_SIZE'])
+
+
+class ParseRangeTests(SimpleTestCase):
+    def test_single_and_suffix_ranges(self):
+        self.assertEqual(parse_range('bytes=0-9', 100), (0, 9))
+        self.assertEqual(parse_range(' bytes=5-1000 ', 100), (5, 99))
+        self.assertEqual(parse_range('bytes=90-', 100), (90, 99))
+        self.assertEqual(parse_range('bytes=-10', 100), (90, 99))
+        self.assertEqual(parse_range('bytes=-500', 100), (0, 99))
+
+    def test_malformed_headers_are_ignored(self):
+        for header in (None, '', 'bytes=', 'bytes=-', 'bytes=0-1,5-6', 'items=0-1', 'bytes=a-b', 'bytes 0-1'):
+            with self.subTest(header=header):
+                self.assertIsNone(parse_range(header, 100))
+
+    def test_unsatisfiable_ranges_raise(self):
+        for header in ('bytes=100-', 'bytes=100-200', 'bytes=5-2', 'bytes=-0'):
+            with self.subTest(header=header), self.assertRaises(ValueError):
+                parse_range(header, 100)
+
+
+class ResumeFileResponseTests(TestCase):
+    DATA = bytes(range(256)) * 40
+
+    def setUp(self):
+        self.user = User.objects.create(username='candidate')
+        self.resume = Resume.upload(self.user, 'CV', 'pdf', self.DATA, len(self.DATA))
+        self.etag = f'"{self.resume.blob.sha256}"'
+
+    def get(self, resume=None, **headers):
+        response = resume_file_response(RequestFactory().get('/', **headers), resume or self.resume, 'inline')
+        body = b''.join(response.streaming_content) if response.streaming else response.content
+        return response, body
+
+    def test_full_body(self):
+        response, body = self.get()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(body, self.DATA)
+        self.assertEqual(response['Accept-Ranges'], 'bytes')
+        self.assertEqual(response['ETag'], self.etag)
+        self.assertEqual(response['Content-Length'], str(len(self.DATA)))
+
+    def test_single_range(self):
+        response, body = self.get(HTTP_RANGE='bytes=10-19')
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(response['Content-Range'], f'bytes 10-19/{len(self.DATA)}')
+        self.assertEqual(response['Content-Length'], '10')
+        self.assertEqual(body, self.DATA[10:20])
+
+    def test_suffix_range(self):
+        response, body = self.get(HTTP_RANGE='bytes=-16')
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(response['Content-Range'], f'bytes {len(self.DATA) - 16}-{len(self.DATA) - 1}/{len(self.DATA)}')
+        self.assertEqual(body, self.DATA[-16:])
+
+    def test_unsatisfiable_range(self):
+        response, _ = self.get(HTTP_RANGE=f'bytes={len(self.DATA)}-')
+        self.assertEqual(response.status_code, 416)
+        self.assertEqual(response['Content-Range'], f'bytes */{len(self.DATA)}')
+
+    def test_malformed_range_serves_the_whole_file(self):
+        for header in ('bytes=0-1,5-6', 'bytes=x-y', 'pages=1-2'):
+            with self.subTest(header=header):
+                response, body = self.get(HTTP_RANGE=header)
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(body, self.DATA)
+
+    def test_if_none_match(self):
+        response, body = self.get(HTTP_IF_NONE_MATCH=self.etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(body, b'')
+        self.assertEqual(response['ETag'], self.etag)
+        self.assertEqual(self.get(HTTP_IF_NONE_MATCH='"stale"')[0].status_code, 200)
+
+    def test_if_range(self):
+        self.assertEqual(self.get(HTTP_RANGE='bytes=0-9', HTTP_IF_RANGE=self.etag)[0].status_code, 206)
+        response, body = self.get(HTTP_RANGE='bytes=0-9', HTTP_IF_RANGE='"stale"')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(body, self.DATA)
+
+    def test_legacy_resume_without_blob(self):
+        legacy = Resume.objects.create(
+            user=self.user, name='Old CV', file_extension='pdf', file_content=self.DATA, file_size=len(self.DATA)
+        )
+        response, body = self.get(Resume.objects.get(pk=legacy.pk), HTTP_RANGE='bytes=100-199')
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(body, self.DATA[100:200])
+        self.assertFalse(response.has_header('ETag'))
+
+
+class ResumeEmailEncoderTests(TestCase):
+    """The streamed base64 matches a one-shot encode, and Content-Length matches what is streamed"""
+    # Not a multiple of 3, and several ENCODE_BLOCKs long
+    DATA = random.Random(3).randbytes(3 * ResumeEmailEncoder.ENCODE_BLOCK + 1001)
+
+    def setUp(self):
+        self.client = referly_client()
+        self.user = self.client.handler._force_user
+
+    def email_format(self, resume):
+        response = self.client.get(reverse('referly:resume_email_format', args=[resume.pk]))
+        self.assertEqual(response.status_code, 200)
+        body = b''.join(response.streaming_content)
+        self.assertEqual(int(response['Content-Length']), len(body))
+        return json.loads(body)
+
+    def test_iter_base64_matches_one_shot_encoding(self):
+        for chunk_size in (1, 1000, ResumeEmailEncoder.ENCODE_BLOCK, len(self.DATA)):
+            chunks = [self.DATA[start:start + chunk_size] for start in range(0, len(self.DATA), chunk_size)]
+            with self.subTest(chunk_size=chunk_size):
+                self.assertEqual(b''.join(ResumeEmailEncoder.iter_base64(chunks)), base64.b64encode(self.DATA))
+                self.assertEqual(
+                    b''.join(ResumeEmailEncoder.iter_base64(chunks, wrap=True)), base64.encodebytes(self.DATA)
+                )
+
+    def test_email_format_streams_the_blob(self):
+        resume = Resume.upload(self.user, 'CV', 'pdf', self.DATA, len(self.DATA))
+        payload = self.email_format(resume)
+        self.assertEqual(base64.b64decode(payload['base64_content']), self.DATA)
+        self.assertEqual(payload['base64_content'], base64.b64encode(self.DATA).decode('ascii'))
+
+    def test_length_follows_the_blob_not_the_recorded_size(self):
+        resume = Resume.upload(self.user, 'CV', 'pdf', self.DATA, len(self.DATA))
+        Resume.objects.filter(pk=resume.pk).update(file_size=len(self.DATA) - 5)
+        payload = self.email_format(resume)
+        self.assertEqual(base64.b64decode(payload['base64_content']), self.DATA)
+
+    def test_legacy_resume_without_blob(self):
+        resume = Resume.objects.create(
+            user=self.user, name='Old CV', file_extension='pdf', file_content=self.DATA, file_size=len(self.DATA)
+        )
+        self.assertIsNone(resume.blob_id)
+        payload = self.email_format(resume)
+        self.assertEqual(base64.b64decode(payload['base64_content']), self.DATA)
+
+
+class FastPathSerializerTests(TestCase):
+    """`fast_rows` over `.values()` must render exactly like the serializer it stands in for"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create(username='writer')
+        acme = Company.objects.create(
+            company_id='ACME', name='Acme', website='https://acme.example', headquarters='Berlin', founded_year=1999
+        )
+        beta = Company.objects.create(company_id='BETA', name='Beta', website='https://beta.example')
+        HRContact.objects.create(company=acme, first_name='Ada', last_name='Lovelace', email='ada@acme.example', email_verified=True)
+        Job.objects.create(company=acme, title='backend-developer', job_type='python-developer')
+        Job.objects.create(company=beta, title='not-a-listed-title')
+        Template.objects.create(user=cls.user, name='Intro', html_content='<p>Hi {{first_name}}</p>' * 50)
+        Template.objects.create(user=cls.user, name='Short', html_content='<p>Hi</p>')
+
+    def render(self, data):
+        return json.loads(ORJSONRenderer().render(data))
+
+    def assertSameOutput(self, serializer_class, queryset, fields=None):
+        fast = serializer_class.fast_list(queryset, fields)
+        slow = serializer_class(queryset, many=True, fields=fields).data
+        self.assertEqual(self.render(fast), self.render(slow))
+        self.assertEqual(len(fast), queryset.count())
+
+    def test_fast_rows_match_the_serializers(self):
+        jobs = Job.objects.select_related('company').annotate(has_hr=Job.has_hr_expression())
+        cases = [
+            (CompanySerializer, Company.objects.all()),
+            (HRContactListSerializer, HRContact.objects.select_related('company')),
+            (JobListSerializer, jobs),
+            (TemplateSerializer, Template.objects.filter(user=self.user)),
+        ]
+        for serializer_class, queryset in cases:
+            with self.subTest(serializer=serializer_class.__name__):
+                self.assertSameOutput(serializer_class, queryset)
+                self.assertSameOutput(serializer_class, queryset, fields=['id', list(serializer_class.VALUES)[-1]])
+
+    def test_job_serializer_without_the_annotation_reads_the_company_counter(self):
+        slow = JobListSerializer(Job.objects.select_related('company'), many=True).data
+        fast = JobListSerializer.fast_list(Job.objects.annotate(has_hr=Job.has_hr_expression()))
+        self.assertEqual(self.render(slow), self.render(fast))
+        self.assertEqual(sorted(job['hasHR'] for job in slow), [False, True])
+
+    def test_unknown_sparse_fields_are_a_bad_request(self):
+        client = referly_client()
+        for url in ('company_list', 'hr_contact_list', 'job_list', 'template_list'):
+            with self.subTest(url=url), override_settings(CACHES=LOCAL_CACHE):
+                response = client.get(reverse(f'referly:{url}'), {'fields': 'id,bogus'})
+                self.assertEqual(response.status_code, 400)
+                self.assertEqual(response.json(), {'fields': ['Unknown field(s): bogus']})
+                self.assertEqual(client.get(reverse(f'referly:{url}'), {'fields': 'id'}).status_code, 200)
+
+
+class ResumeUploadSessionFinalizeTests(TestCase):
+    DATA = b'%PDF-1.4\n' + bytes(range(256)) * 8
+
+    def setUp(self):
+        location = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, location, True)
+        storage_settings = override_settings(REFERLY_STORAGE={'BACKEND': 'filesystem', 'LOCATION': location})
+        storage_settings.enable()
+        self.addCleanup(storage_settings.disable)
+        _build_storage.cache_clear()
+        self.addCleanup(_build_storage.cache_clear)
+        self.location = location
+        self.user = User.objects.create(username='candidate')
+        self.session = ResumeUploadSession.objects.create(
+            user=self.user, name='CV', file_extension='pdf', total_size=len(self.DATA), chunk_size=1024
+        )
+        for index in range(self.session.total_chunks):
+            self.session.write_chunk(index, self.DATA[index * 1024:(index + 1) * 1024])
+        self.sha256 = ResumeBlob.digest(self.DATA)[0]
+
+    def stored(self, key):
+        return os.path.exists(os.path.join(self.location, key))
+
+    def chunk_keys(self):
+        return [f"uploads/{self.session.pk}/{index:05d}" for index in range(self.session.total_chunks)]
+
+    def test_chunk_objects_are_deleted_once_finalize_commits(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            resume = self.session.finalize(sha256=self.sha256)
+            self.assertTrue(all(self.stored(key) for key in self.chunk_keys()))
+        self.assertFalse(any(self.stored(key) for key in self.chunk_keys()))
+        self.assertEqual(b''.join(resume.iter_content()), self.DATA)
+        self.assertTrue(self.stored(ResumeBlob.storage_key_for(self.sha256)))
+
+    def test_quota_race_does_not_orphan_the_blob_object(self):
+        UserQuota.for_user(self.user)
+        UserQuota.objects.filter(user=self.user).update(max_resumes=0)
+        # Another upload took the last slot between the quota check and the insert
+        with mock.patch.object(UserQuota, 'can_create_resume', return_value=True):
+            with self.captureOnCommitCallbacks(execute=True), self.assertRaises(QuotaExceeded):
+                self.session.finalize()
+        self.assertFalse(ResumeBlob.objects.filter(sha256=self.sha256).exists())
+        self.assertFalse(self.stored(ResumeBlob.storage_key_for(self.sha256)))
+        # The session can still be finalized once a slot frees up
+        self.assertTrue(all(self.stored(key) for key in self.chunk_keys()))
+        self.session.refresh_from_db()
+        self.assertEqual(self.session.status, ResumeUploadSession.STATUS_OPEN)
+
+    def test_discard_orphan_keeps_objects_other_blobs_point_at(self):
+        blob = ResumeBlob.acquire(self.DATA)
+        ResumeBlob.discard_orphan(self.sha256)
+        self.assertTrue(self.stored(blob.storage_key))
+        self.assertEqual(ResumeBlob.objects.get(pk=blob.pk).ref_count, 1)
+
+
+class DirectoryExportTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        acme = Company.objects.create(company_id='ACME', name='Acme', website='https://acme.example')
+        HRContact.objects.create(company=acme, first_name='Ada', last_name='Lovelace', email='ada@acme.example')
+        Job.objects.create(company=acme, title='backend-developer')
+
+    def test_exports_stream_the_search_rows(self):
+        client = referly_client()
+        CustomUser.objects.create(user=User.objects.get(username='referly'), role='ADMIN')
+        for url, filename, header in (
+            ('company_export', 'companies', 'company_id,name,'),
+            ('hr_contact_export', 'hr_contacts', 'id,first_name,'),
+            ('job_export', 'jobs', 'id,title,'),
+        ):
+            with self.subTest(url=url):
+                response = client.get(reverse(f'referly:{url}'), {'query': 'acme'})
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(response['Content-Disposition'], f'attachment; filename="{filename}.csv"')
+                lines = b''.join(response.streaming_content).decode('utf-8').splitlines()
+                self.assertTrue(lines[0].startswith(header))
+                self.assertEqual(len(lines), 2)
+
+                response = client.get(reverse(f'referly:{url}'), {'output': 'ndjson'})
+                self.assertEqual(response['Content-Disposition'], f'attachment; filename="{filename}.ndjson"')
+                self.assertEqual(len(b''.join(response.streaming_content).splitlines()), 1)
+                self.assertEqual(client.get(reverse(f'referly:{url}'), {'output': 'xml'}).status_code, 400)
+
+    def test_exports_are_admin_only(self):
+        client = referly_client()
+        for url in ('company_export', 'hr_contact_export', 'job_export'):
+            with self.subTest(url=url):
+                self.assertEqual(client.get(reverse(f'referly:{url}')).status_code, 403)
+
+
+@override_settings(CACHES=LOCAL_CACHE)
+class FacetViewTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        for index, (size, headquarters) in enumerate([('1-50', 'Berlin'), ('1-50', 'Paris'), ('51-200', 'Berlin')]):
+            company = Company.objects.create(
+                company_id=f'C{index}', name=f'Company {index}', website='https://c.example',
+                company_size=size, headquarters=headquarters,
+            )
+            Job.objects.create(company=company, title='backend-developer', job_type='python-developer')
+
+    def test_facets_come_with_the_search_page(self):
+        client = referly_client()
+        search = client.get(reverse('referly:company_search'), {'page_size': 2}).json()
+        facets = client.get(reverse('referly:company_facets'), {'page_size': 2}).json()
+        self.assertEqual({key: facets[key] for key in ('results', 'next_cursor', 'page_size')}, search)
+        self.assertEqual(facets['facets'], {
+            'company_size': [{'value': '1-50', 'count': 2}, {'value': '51-200', 'count': 1}],
+            'headquarters': [{'value': 'Berlin', 'count': 2}, {'value': 'Paris', 'count': 1}],
+        })
+
+        jobs = client.get(reverse('referly:job_facets'), {'headquarters': 'Berlin'}).json()
+        self.assertEqual(len(jobs['results']), 2)
+        self.assertEqual(jobs['facets']['job_type'], [{'value': 'python-developer', 'count': 2}])
+        self.assertEqual(jobs['facets']['company_size'], [{'value': '1-50', 'count': 1}, {'value': '51-200', 'count': 1}])
+
+    def test_invalid_cursor_is_a_bad_request(self):
+        client = referly_client()
+        for url in ('company_facets', 'job_facets'):
+            with self.subTest(url=url):
+                self.assertEqual(client.get(reverse(f'referly:{url}'), {'cursor': 'garbage'}).status_code, 400)
+
+
+class ResumeBlobTests(TestCase):
+    """Identical resume bytes are stored once; references are counted and orphans collected"""
+    DATA = b'%PDF-1.4 shared resume'
+
+    def setUp(self):
+        self.client = referly_client()
+        self.user = self.client.handler._force_user
+        self.other = User.objects.create(username='other')
+
+    def ref_count(self, blob):
+        return ResumeBlob.objects.get(pk=blob.pk).ref_count
+
+    def gc(self, *args):
+        call_command('gc_resume_blobs', *args, stdout=io.StringIO())
+
+    def test_identical_uploads_share_one_blob(self):
+        upload = self.client.post(reverse('referly:resume_upload'), {
+            'name': 'CV', 'file': SimpleUploadedFile('cv.pdf', self.DATA, content_type='application/pdf'),
+        }, format='multipart')
+        self.assertEqual(upload.status_code, 201, upload.content)
+        first = Resume.objects.get(user=self.user)
+        second = Resume.upload(self.other, 'Mine', 'pdf', self.DATA, len(self.DATA))
+        different = Resume.upload(self.other, 'Other', 'pdf', self.DATA + b'!', len(self.DATA) + 1)
+        self.assertEqual(first.blob_id, second.blob_id)
+        self.assertNotEqual(first.blob_id, different.blob_id)
+        self.assertEqual(self.ref_count(first.blob), 2)
+        self.assertIsNone(first.file_content)
+        self.assertEqual(first.read_content(), self.DATA)
+
+    def test_soft_and_hard_deletes_release_once(self):
+        first = Resume.upload(self.user, 'CV', 'pdf', self.DATA, len(self.DATA))
+        second = Resume.upload(self.other, 'CV', 'pdf', self.DATA, len(self.DATA))
+        first.soft_delete()
+        first.soft_delete()
+        self.assertEqual(self.ref_count(first.blob), 1)
+        # Hard-deleting the already released resume doesn't release again
+        first.delete()
+        self.assertEqual(self.ref_count(second.blob), 1)
+        # ... while hard-deleting an active one does
+        Resume.objects.get(pk=second.pk).delete()
+        self.assertEqual(self.ref_count(second.blob), 0)
+
+    def test_delete_endpoint_releases_the_blob(self):
+        resume = Resume.upload(self.user, 'CV', 'pdf', self.DATA, len(self.DATA))
+        response = self.client.delete(reverse('referly:resume_detail', args=[resume.pk]))
+        self.assertEqual(response.status_code, 204)
+        self.assertFalse(Resume.objects.filter(pk=resume.pk).exists())
+        self.assertEqual(self.ref_count(resume.blob), 0)
+
+    def test_gc_collects_old_orphans_only(self):
+        kept = Resume.upload(self.user, 'Kept', 'pdf', self.DATA, len(self.DATA))
+        orphan = Resume.upload(self.user, 'Orphan', 'pdf', b'%PDF-1.4 orphan', 15)
+        orphan.soft_delete()
+        fresh = Resume.upload(self.user, 'Fresh', 'pdf', b'%PDF-1.4 fresh', 14)
+        fresh.soft_delete()
+        ResumeBlob.objects.filter(pk__in=[kept.blob_id, orphan.blob_id]).update(
+            created_at=timezone.now() - timedelta(hours=2)
+        )
+        self.gc()
+        # `fresh` is still inside the grace period
+        remaining = ResumeBlob.objects.filter(pk__in=[kept.blob_id, orphan.blob_id, fresh.blob_id])
+        self.assertEqual(set(remaining.values_list('pk', flat=True)), {kept.blob_id, fresh.blob_id})
+        # Re-uploading collected bytes stores them again
+        again = Resume.upload(self.other, 'Orphan', 'pdf', b'%PDF-1.4 orphan', 15)
+        self.assertEqual(again.read_content(), b'%PDF-1.4 orphan')
+        self.assertEqual(self.ref_count(again.blob), 1)
+
+    def test_recount_repairs_drift(self):
+        resume = Resume.upload(self.user, 'CV', 'pdf', self.DATA, len(self.DATA))
+        ResumeBlob.objects.filter(pk=resume.blob_id).update(
+            ref_count=0, created_at=timezone.now() - timedelta(hours=2)
+        )
+        self.gc('--recount')
+        self.assertEqual(self.ref_count(resume.blob), 1)
+
+
+class RenderWorkerTests(TestCase):
+    """Renditions are queued on upload and rendered once per distinct file by `render_resumes`, never on request"""
+    DOCX = b'PK\x03\x04 word document'
+
+    def setUp(self):
+        self.client = referly_client()
+        self.user = self.client.handler._force_user
+        converters = {
+            'pdf': b'%PDF-1.4 rendered',
+            'html': b'<p>rendered</p>',
+            'text': b'rendered text',
+        }
+        self.convert = mock.patch(
+            'Referly.management.commands.render_resumes.DocumentConverter.convert',
+            side_effect=lambda content, extension, kind: converters[kind],
+        ).start()
+        mock.patch(
+            'Referly.management.commands.render_resumes.ThumbnailGenerator.first_page', return_value=b'RIFF thumbnail'
+        ).start()
+        self.addCleanup(mock.patch.stopall)
+
+    def render(self):
+        call_command('render_resumes', '--once', stdout=io.StringIO(), stderr=io.StringIO())
+
+    def statuses(self, resume):
+        return dict(ResumeRendition.objects.filter(source_blob=resume.blob_id).values_list('kind', 'status'))
+
+    def preview(self, resume, **params):
+        return self.client.get(reverse('referly:resume_preview', args=[resume.pk]), params)
+
+    def test_uploads_queue_their_renditions(self):
+        docx = Resume.upload(self.user, 'Word', 'docx', self.DOCX, len(self.DOCX))
+        pdf = Resume.upload(self.user, 'Pdf', 'pdf', b'%PDF-1.4 cv', 11)
+        pending = ResumeRendition.STATUS_PENDING
+        self.assertEqual(self.statuses(docx), {'pdf': pending, 'html': pending, 'text': pending})
+        self.assertEqual(self.statuses(pdf), {'thumbnail': pending, 'text': pending})
+        # Requesting again leaves the queued rows alone
+        ResumeRendition.request(docx.blob, ['pdf', 'html'])
+        self.assertEqual(ResumeRendition.objects.filter(source_blob=docx.blob_id).count(), 3)
+
+    def test_worker_renders_docx_once_per_distinct_file(self):
+        first = Resume.upload(self.user, 'Word', 'docx', self.DOCX, len(self.DOCX))
+        second = Resume.upload(User.objects.create(username='other'), 'Copy', 'docx', self.DOCX, len(self.DOCX))
+        self.render()
+        ready = ResumeRendition.STATUS_READY
+        # The PDF rendition queued the DOCX thumbnail, rendered in the same run
+        self.assertEqual(self.statuses(first), {'pdf': ready, 'html': ready, 'text': ready, 'thumbnail': ready})
+        self.assertEqual(self.convert.call_count, 3)
+        self.assertEqual(b''.join(second.get_rendition('pdf').output_blob.iter_content()), b'%PDF-1.4 rendered')
+        output = first.get_rendition('html').output_blob
+        self.assertEqual(ResumeBlob.objects.get(pk=output.pk).ref_count, 1)
+
+    def test_claims_skip_renditions_in_progress_until_stale(self):
+        resume = Resume.upload(self.user, 'Word', 'docx', self.DOCX, len(self.DOCX))
+        worker = RenderWorker(stdout=io.StringIO(), stderr=io.StringIO())
+        claimed = worker.claim(batch_size=10, stale_minutes=15)
+        self.assertEqual(len(claimed), 3)
+        self.assertEqual(set(self.statuses(resume).values()), {ResumeRendition.STATUS_PROCESSING})
+        self.assertEqual(worker.claim(batch_size=10, stale_minutes=15), [])
+        stale = timezone.now() - timedelta(hours=1)
+        ResumeRendition.objects.filter(source_blob=resume.blob_id).update(updated_at=stale)
+        reclaimed = worker.claim(batch_size=10, stale_minutes=15)
+        self.assertEqual([rendition.attempts for rendition in reclaimed], [2, 2, 2])
+
+    @override_settings(REFERLY_RENDER_MAX_ATTEMPTS=2)
+    def test_failures_are_retried_then_marked_failed(self):
+        resume = Resume.upload(self.user, 'Word', 'docx', self.DOCX, len(self.DOCX))
+        self.convert.side_effect = ConversionError('soffice crashed')
+        self.render()
+        rendition = resume.get_rendition('pdf')
+        self.assertEqual((rendition.status, rendition.attempts), (ResumeRendition.STATUS_FAILED, 2))
+        self.assertEqual(rendition.error, 'soffice crashed')
+
+    def test_preview_serves_the_rendition_without_converting(self):
+        resume = Resume.upload(self.user, 'Word', 'docx', self.DOCX, len(self.DOCX))
+        pending = self.preview(resume)
+        self.assertEqual(pending.status_code, 202)
+        self.assertIn(b'being generated', pending.content)
+        self.render()
+        self.convert.reset_mock()
+        response = self.preview(resume)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'application/pdf')
+        self.assertEqual(b''.join(response.streaming_content), b'%PDF-1.4 rendered')
+        html = self.preview(resume, output='html')
+        self.assertEqual(html['Content-Security-Policy'], 'sandbox')
+        self.convert.assert_not_called()
+
+    def test_failed_preview_falls_back_to_the_placeholder(self):
+        resume = Resume.upload(self.user, 'Word', 'docx', self.DOCX, len(self.DOCX))
+        ResumeRendition.objects.filter(source_blob=resume.blob_id).update(status=ResumeRendition.STATUS_FAILED)
+        response = self.preview(resume)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(b'Preview unavailable', response.content)
+
+
+try:
+    from PIL import Image
+except ImportError:
+    Image = None
+
+
+class ThumbnailTests(TestCase):
+    """First-page WebP thumbnails: rendered by the worker, listed in the folder tree, served immutable"""
+    PDF = b'%PDF-1.4 thumbnail source'
+
+    def setUp(self):
+        cache.clear()
+        self.client = referly_client()
+        self.user = self.client.handler._force_user
+        mock.patch('Referly.management.commands.render_resumes.TextExtractor.from_pdf', return_value=b'text').start()
+        self.addCleanup(mock.patch.stopall)
+
+    @staticmethod
+    def png(width=240, height=310):
+        output = io.BytesIO()
+        Image.new('RGB', (width, height), 'white').save(output, format='PNG')
+        return output.getvalue()
+
+    def pdftoppm(self):
+        """Stand in for poppler: `first_page` gets a PNG of the (already scaled) first page"""
+        mock.patch('Referly.converters.shutil.which', return_value='/usr/bin/pdftoppm').start()
+        return mock.patch(
+            'Referly.converters.subprocess.run', return_value=mock.Mock(stdout=self.png())
+        ).start()
+
+    def render(self):
+        call_command('render_resumes', '--once', stdout=io.StringIO(), stderr=io.StringIO())
+
+    def thumbnail_urls(self):
+        response = self.client.get(reverse('referly:resumes_folder'))
+        self.assertEqual(response.status_code, 200, response.content)
+        return [resume['thumbnail_url'] for resume in response.json()['children']]
+
+    @unittest.skipUnless(Image, 'Pillow is not installed')
+    def test_first_page_is_stored_as_webp(self):
+        run = self.pdftoppm()
+        thumbnail = ThumbnailGenerator.first_page(self.PDF)
+        image = Image.open(io.BytesIO(thumbnail))
+        self.assertEqual((image.format, image.size), ('WEBP', (240, 310)))
+        self.assertLess(len(thumbnail), len(self.png()))
+        self.assertEqual(run.call_args.kwargs['input'], self.PDF)
+        self.assertIn(str(settings.REFERLY_THUMBNAIL_WIDTH), run.call_args.args[0])
+
+    def test_missing_poppler_is_a_conversion_error(self):
+        with mock.patch('Referly.converters.shutil.which', return_value=None):
+            with self.assertRaises(ConversionError):
+                ThumbnailGenerator.first_page(self.PDF)
+
+    def test_docx_thumbnails_wait_for_the_pdf_rendition(self):
+        resume = Resume.upload(self.user, 'Word', 'docx', b'PK\x03\x04 docx', 14)
+        ResumeRendition.request(resume.blob, ['thumbnail'])
+        convert = 'Referly.management.commands.render_resumes.DocumentConverter.convert'
+        with mock.patch(convert, side_effect=ConversionError('no soffice')):
+            self.render()
+        self.assertEqual(resume.get_rendition('thumbnail').error, 'PDF rendition is not available for the thumbnail')
+
+    @unittest.skipUnless(Image, 'Pillow is not installed')
+    def test_folder_tree_and_endpoint_follow_the_worker(self):
+        use_shared_cache(self)
+        self.pdftoppm()
+        resume = Resume.upload(self.user, 'CV', 'pdf', self.PDF, len(self.PDF))
+        url = reverse('referly:resume_thumbnail', args=[resume.pk])
+        self.assertEqual(self.thumbnail_urls(), [None])
+        self.assertEqual(self.client.get(url).status_code, 404)
+
+        # The worker's queryset updates send no signals: it invalidates the cached tree itself
+        self.render()
+        sha256 = resume.get_rendition('thumbnail').output_blob.sha256
+        self.assertEqual(self.thumbnail_urls(), [f'{url}?v={sha256[:16]}'])
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'image/webp')
+        self.assertEqual(response['Cache-Control'], 'private, max-age=31536000, immutable')
+        self.assertEqual(Image.open(io.BytesIO(b''.join(response.streaming_content))).format, 'WEBP')
+
+
+class MigrateResumeBlobsTests(TestCase):
+    DATA = b'%PDF-1.4 legacy'
+
+    def setUp(self):
+        self.user = User.objects.create(username='candidate')
+        UserQuota.for_user(self.user)
+        UserQuota.objects.filter(user=self.user).update(max_resumes=10)
+        self.resumes = [
+            Resume.objects.create(
+                user=self.user, name=f'CV {index}', file_extension='pdf',
+                file_content=self.DATA + bytes([index]), file_size=len(self.DATA) + 1,
+            )
+            for index in range(3)
+        ]
+
+    def test_counts_only_rows_it_moved(self):
+        store_content = Resume.store_content
+        raced = self.resumes[1]
+
+        def store_and_race(resume, content):
+            store_content(resume, content)
+            if not raced.blob_id:
+                # Another process migrates the next resume while this batch runs
+                raced.store_content(bytes(raced.file_content))
+                Resume.objects.filter(pk=raced.pk).update(blob=raced.blob, file_content=None)
+
+        out = io.StringIO()
+        with mock.patch.object(Resume, 'store_content', autospec=True, side_effect=store_and_race):
+            call_command('migrate_resume_blobs', stdout=out)
+        self.assertIn('Migrated 2/3', out.getvalue())
+        self.assertFalse(Resume.objects.filter(blob__isnull=True).exists())
+        for index, resume in enumerate(self.resumes):
+            self.assertEqual(b''.join(Resume.objects.get(pk=resume.pk).iter_content()), self.DATA + bytes([index]))
+
+
+class SearchVectorTests(TestCase):
+    """Signals keep each row's weighted tsvector current; contacts and jobs follow their company's name"""
+
+    def setUp(self):
+        self.acme = Company.objects.create(company_id='ACME', name='Acme', about_us='Rockets', headquarters='Tucson')
+        self.contact = HRContact.objects.create(company=self.acme, first_name='Wile', last_name='Coyote', email='wile@acme.example')
+        self.job = Job.objects.create(company=self.acme, title='backend-developer', job_type='backend-developer')
+
+    def matching(self, model, query):
+        return list(model.objects.filter(search_vector=SearchQuery(query, config=SEARCH_CONFIG)))
+
+    def test_saves_reindex_the_row(self):
+        self.assertEqual(self.matching(Company, 'rockets'), [self.acme])
+        self.acme.about_us = 'Anvils'
+        self.acme.save()
+        self.assertEqual(self.matching(Company, 'rockets'), [])
+        self.assertEqual(self.matching(Company, 'anvils'), [self.acme])
+        self.contact.last_name = 'Genius'
+        self.contact.save()
+        self.assertEqual(self.matching(HRContact, 'genius'), [self.contact])
+
+    def test_renaming_a_company_reindexes_its_contacts_and_jobs(self):
+        self.assertEqual(self.matching(HRContact, 'acme'), [self.contact])
+        self.acme.name = 'Roadrunner'
+        self.acme.save()
+        self.assertEqual(self.matching(HRContact, 'roadrunner'), [self.contact])
+        self.assertEqual(self.matching(Job, 'roadrunner'), [self.job])
+        self.assertEqual(self.matching(Job, 'acme'), [])
+
+    def test_other_company_writes_leave_contacts_and_jobs_alone(self):
+        company = Company.objects.get(pk=self.acme.pk)
+        company.about_us = 'Anvils'
+        with CaptureQueriesContext(connection) as context:
+            company.save()
+        touched = [
+            query['sql'] for query in context.captured_queries
+            if query['sql'].startswith(('UPDATE "referly_hrcontact"', 'UPDATE "referly_job"'))
+        ]
+        self.assertEqual(touched, [])
+
+
+class RankedSearchViewTests(TestCase):
+    """Search endpoints return matches by relevance, weighted name > description > location"""
+
+    def setUp(self):
+        self.client = referly_client()
+        Company.objects.create(company_id='HQ', name='Northwind', headquarters='Rockets Street')
+        Company.objects.create(company_id='NAME', name='Rockets Inc')
+        Company.objects.create(company_id='ABOUT', name='Acme', about_us='We build rockets')
+        Company.objects.create(company_id='NONE', name='Globex', about_us='Chemicals')
+        Company.objects.create(company_id='OFF', name='Rockets Old', is_active=False)
+
+    def test_companies_are_ranked_by_weight(self):
+        response = self.client.get(reverse('referly:company_search'), {'query': 'rockets'})
+        self.assertEqual(response.status_code, 200, response.content)
+        results = response.json()['results']
+        self.assertEqual([company['company_id'] for company in results], ['NAME', 'ABOUT', 'HQ'])
+        ranks = [company['rank'] for company in results]
+        self.assertEqual(ranks, sorted(ranks, reverse=True))
+
+    def test_websearch_syntax(self):
+        response = self.client.get(reverse('referly:company_search'), {'query': 'rockets -street'})
+        self.assertEqual([company['company_id'] for company in response.json()['results']], ['NAME', 'ABOUT'])
+
+    def test_jobs_match_their_company_name(self):
+        acme = Company.objects.get(company_id='ABOUT')
+        Job.objects.create(company=acme, title='backend-developer', job_type='backend-developer')
+        Job.objects.create(company=Company.objects.get(company_id='NONE'), title='backend-developer', job_type='backend-developer')
+        response = self.client.get(reverse('referly:job_search'), {'query': 'acme backend'})
+        self.assertEqual(response.status_code, 200, response.content)
+        self.assertEqual([job['company_name'] for job in response.json()['results']], ['Acme'])
+
+
+class RankedSearchPaginationTests(TestCase):
+    def test_rows_tied_on_rank_span_page_boundaries(self):
+        for index in range(7):
+            Company.objects.create(company_id=f'C{index}', name=f'Acme {index}', website='https://acme.example')
+        client = referly_client()
+        seen = []
+        ranks = set()
+        params = {'query': 'acme', 'page_size': 2}
+        for _ in range(10):
+            page = client.get(reverse('referly:company_search'), params).json()
+            seen += [company['company_id'] for company in page['results']]
+            ranks |= {company['rank'] for company in page['results']}
+            if page['next_cursor'] is None:
+                break
+            params['cursor'] = page['next_cursor']
+        self.assertEqual(len(ranks), 1, 'the rows should tie on rank')
+        self.assertEqual(seen, [f'C{index}' for index in range(7)])
+
+
+class FolderStructureCacheTests(TestCase):
+    """Folder trees are cached on a shared backend only, and resume / template writes invalidate them"""
+    DATA = b'%PDF-1.4 folder'
+
+    def setUp(self):
+        cache.clear()
+        self.client = referly_client()
+        self.user = self.client.handler._force_user
+
+    def resume_names(self):
+        response = self.client.get(reverse('referly:resumes_folder'))
+        self.assertEqual(response.status_code, 200, response.content)
+        return [resume['display_name'] for resume in response.json()['children']]
+
+    def test_save_and_delete_invalidate_the_shared_cache(self):
+        use_shared_cache(self)
+        first = Resume.upload(self.user, 'First', 'pdf', self.DATA, len(self.DATA))
+        self.assertEqual(self.resume_names(), ['First.pdf'])
+        self.assertIsNotNone(cache.get(FolderStructureManager.cache_key(self.user.id)))
+        Resume.upload(self.user, 'Second', 'pdf', self.DATA, len(self.DATA))
+        self.assertEqual(self.resume_names(), ['First.pdf', 'Second.pdf'])
+        first.name = 'Renamed'
+        first.save()
+        self.assertEqual(self.resume_names(), ['Renamed.pdf', 'Second.pdf'])
+        first.delete()
+        self.assertEqual(self.resume_names(), ['Second.pdf'])
+
+    @override_settings(CACHES=LOCAL_CACHE)
+    def test_per_process_cache_is_not_used(self):
+        resume = Resume.upload(self.user, 'First', 'pdf', self.DATA, len(self.DATA))
+        self.assertEqual(self.resume_names(), ['First.pdf'])
+        # No signal, as for a write made by another process (e.g. `render_resumes`)
+        Resume.objects.filter(pk=resume.pk).update(name='Renamed')
+        self.assertEqual(self.resume_names(), ['Renamed.pdf'])
+        self.assertIsNone(cache.get(FolderStructureManager.cache_key(self.user.id)))
+
+
+class LRUCacheTests(SimpleTestCase):
+    def test_evicts_least_recently_used(self):
+        lru = LRUCache(maxsize=2, ttl=60)
+        lru.set('a', 1)
+        lru.set('b', 2)
+        self.assertEqual(lru.get('a'), 1)
+        lru.set('c', 3)
+        self.assertIsNone(lru.get('b'))
+        self.assertEqual((lru.get('a'), lru.get('c')), (1, 3))
+
+    def test_entries_expire_after_ttl(self):
+        lru = LRUCache(maxsize=2, ttl=60)
+        with mock.patch('Referly.utils.time.monotonic', return_value=1000.0):
+            lru.set('a', 1)
+        with mock.patch('Referly.utils.time.monotonic', return_value=1059.0):
+            self.assertEqual(lru.get('a'), 1)
+        with mock.patch('Referly.utils.time.monotonic', return_value=1061.0):
+            self.assertIsNone(lru.get('a'))
+
+
+class TypeaheadLimitTests(TestCase):
+    """Limits are clamped to 1..MAX_RESULTS before they reach the slice"""
+
+    def setUp(self):
+        for patcher in (
+            mock.patch.object(Typeahead, '_cache', LRUCache(16, 60)),
+            mock.patch.object(Typeahead, 'companies', return_value=[]),
+        ):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.companies = Typeahead.companies
+
+    def test_search_clamps_the_limit(self):
+        max_results = settings.REFERLY_TYPEAHEAD['MAX_RESULTS']
+        for limit, expected in [(None, max_results), (0, max_results), (-5, 1), (3, 3), (10_000, max_results)]:
+            with self.subTest(limit=limit):
+                Typeahead.search('companies', f'acme {limit}', limit)
+                self.assertEqual(self.companies.call_args.args[1], expected)
+
+    def test_short_queries_are_not_searched(self):
+        self.assertEqual(Typeahead.search('companies', ' a '), [])
+        self.companies.assert_not_called()
+
+    def test_endpoint_clamps_the_limit(self):
+        client = referly_client()
+        for limit, expected in [('-5', 1), ('0', 1), ('abc', settings.REFERLY_TYPEAHEAD['MAX_RESULTS'])]:
+            with self.subTest(limit=limit):
+                response = client.get(reverse('referly:typeahead'), {'q': f'acme {limit}', 'limit': limit})
+                self.assertEqual(response.status_code, 200, response.content)
+                self.assertEqual(self.companies.call_args.args[1], expected)
+
+    def test_endpoint_rejects_unknown_type(self):
+        response = referly_client().get(reverse('referly:typeahead'), {'q': 'acme', 'type': 'jobs'})
+        self.assertEqual(response.status_code, 400)
+
+
+class TypeaheadSearchTests(TestCase):
+    """Prefix matches rank first, then typo-tolerant word-similarity matches (needs pg_trgm)"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.google = Company.objects.create(company_id='GOOG', name='Google', website='https://google.com')
+        Company.objects.create(company_id='GOGO', name='Gogoro', website='https://gogoro.com')
+        Company.objects.create(company_id='OLD', name='Google Legacy', website='https://old.example', is_active=False)
+        HRContact.objects.create(
+            first_name='Jane', last_name='Doe', email='jane@google.com', company=cls.google
+        )
+        HRContact.objects.create(
+            first_name='John', last_name='Smith', email='john@google.com', company=cls.google
+        )
+
+    def setUp(self):
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm'")
+            if cursor.fetchone() is None:
+                self.skipTest('pg_trgm is not installed')
+        patcher = mock.patch.object(Typeahead, '_cache', LRUCache(16, 60))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_prefix_matches_rank_first(self):
+        names = [row['name'] for row in Typeahead.search('companies', 'GOO')]
+        self.assertEqual(names[0], 'Google')
+        self.assertNotIn('Google Legacy', names)
+
+    def test_typos_still_match(self):
+        self.assertIn('Google', [row['name'] for row in Typeahead.search('companies', 'gogle')])
+
+    def test_hr_contacts_match_first_and_last_name(self):
+        results = Typeahead.search('hr-contacts', 'jane do')
+        self.assertEqual([row['full_name'] for row in results], ['Jane Doe'])
+        self.assertEqual(results[0]['company_name'], 'Google')
+
+    def test_endpoint(self):
+        response = referly_client().get(reverse('referly:typeahead'), {'q': 'goog', 'limit': '1'})
+        self.assertEqual(response.status_code, 200, response.content)
+        self.assertEqual([row['name'] for row in response.json()['results']], ['Google'])
@@ -14,20 +14,30 @@ urlpatterns = [
     path('templates/create/', views.TemplateCreateView.as_view(), name='template_create'),
     path('templates/<int:template_id>/', views.TemplateDetailView.as_view(), name='template_detail'),
     path('templates/<int:template_id>/content/', views.TemplateContentView.as_view(), name='template_content'),
+    path('templates/<int:template_id>/render/', views.TemplateRenderView.as_view(), name='template_render'),
     
     # Resume Endpoints
     path('resumes/', views.ResumeListView.as_view(), name='resume_list'),
     path('resumes/upload/', views.ResumeUploadView.as_view(), name='resume_upload'),
+    path('resumes/uploads/', views.ResumeUploadSessionCreateView.as_view(), name='resume_upload_session_create'),
+    path('resumes/uploads/<uuid:upload_id>/', views.ResumeUploadSessionView.as_view(), name='resume_upload_session'),
+    path('resumes/uploads/<uuid:upload_id>/chunks/<int:index>/', views.ResumeUploadChunkView.as_view(), name='resume_upload_chunk'),
+    path('resumes/uploads/<uuid:upload_id>/complete/', views.ResumeUploadCompleteView.as_view(), name='resume_upload_complete'),
     path('resumes/<int:resume_id>/', views.ResumeDetailView.as_view(), name='resume_detail'),
     path('resumes/<int:resume_id>/file/', views.ResumeFileView.as_view(), name='resume_file'),
     path('resumes/<int:resume_id>/preview/', views.ResumePreviewView.as_view(), name='resume_preview'),
+    path('resumes/<int:resume_id>/thumbnail/', views.ResumeThumbnailView.as_view(), name='resume_thumbnail'),
     path('resumes/<int:resume_id>/download/', views.ResumeDownloadView.as_view(), name='resume_download'),
     path('resumes/<int:resume_id>/email-format/', views.ResumeEmailFormatView.as_view(), name='resume_email_format'),
+    path('resumes/<int:resume_id>/matching-jobs/', views.ResumeMatchingJobsView.as_view(), name='resume_matching_jobs'),
 
     # Company Management Endpoints
     path('companies/', views.CompanyListView.as_view(), name='company_list'),
     path('companies/create/', views.CompanyCreateView.as_view(), name='company_create'),
     path('companies/search/', views.CompanySearchView.as_view(), name='company_search'),
+    path('companies/facets/', views.CompanyFacetView.as_view(), name='company_facets'),
+    path('companies/export/', views.CompanyExportView.as_view(), name='company_export'),
+    path('autocomplete/', views.TypeaheadView.as_view(), name='typeahead'),
     path('companies/<str:company_id>/', views.CompanyDetailView.as_view(), name='company_detail'),
     
     # HR Contact Management Endpoints  
@@ -35,6 +45,7 @@ urlpatterns = [
     path('hr-contacts/create/', views.HRContactCreateView.as_view(), name='hr_contact_create'),
     path('hr-contacts/<int:hr_id>/', views.HRContactDetailView.as_view(), name='hr_contact_detail'),
     path('hr-contacts/by-company/<str:company_id>/', views.HRContactByCompanyView.as_view(), name='hr_by_company'),
+    path('hr-contacts/export/', views.HRContactExportView.as_view(), name='hr_contact_export'),
     
     # HR Contact Verification Endpoints
     path('hr-contacts/<int:hr_id>/verify-email/', views.VerifyHREmailView.as_view(), name='verify_hr_email'),
@@ -47,6 +58,7 @@ urlpatterns = [
     # Bulk Upload Endpoints (Admin only)
     path('bulk-upload/companies/', views.CompanyBulkUploadView.as_view(), name='company_bulk_upload'),
     path('bulk-upload/hr-contacts/', views.HRContactBulkUploadView.as_view(), name='hr_contact_bulk_upload'),
+    path('bulk-upload/jobs/<uuid:job_id>/', views.BulkUploadJobView.as_view(), name='bulk_upload_job'),
     
     # User Quota Endpoint
     path('quota/', views.UserQuotaView.as_view(), name='user_quota'),
@@ -55,6 +67,8 @@ urlpatterns = [
     path('jobs/', views.JobListView.as_view(), name='job_list'),
     path('jobs/create/', views.JobCreateView.as_view(), name='job_create'),
     path('jobs/search/', views.JobSearchView.as_view(), name='job_search'),
+    path('jobs/facets/', views.JobFacetView.as_view(), name='job_facets'),
+    path('jobs/export/', views.JobExportView.as_view(), name='job_export'),
     path('jobs/<int:job_id>/', views.JobDetailView.as_view(), name='job_detail'),
     path('jobs/by-company/<str:company_id>/', views.JobsByCompanyView.as_view(), name='jobs_by_company'),
 ]
\ No newline at end of file
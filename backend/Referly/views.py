@@ -2,26 +2,40 @@ from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
 from rest_framework.permissions import IsAuthenticated
-from drf_spectacular.utils import extend_schema, OpenApiParameter, OpenApiExample
+from drf_spectacular.utils import extend_schema, extend_schema_view, OpenApiParameter, OpenApiExample
 from django.shortcuts import get_object_or_404
-from django.http import HttpResponse
-from django.db.models import Q, Count, Exists, OuterRef
+from django.http import HttpResponse, HttpResponseRedirect, StreamingHttpResponse
+from django.conf import settings
+from django.utils.html import escape
+from django.db.models import Q
 import base64
 
 from features.permission import ReferlyPermission
-from .models import Template, Resume, UserQuota, Company, HRContact, Job
+from accounts.models import IsCustomAdmin
+from .models import (
+    Template, Resume, ResumeRendition, ResumeUploadSession, UserQuota, Company, HRContact, Job, DirectoryStat,
+    BulkUploadJob, QuotaExceeded, UploadSessionError, ChunkOutOfOrder,
+)
 from .serializers import (
-    TemplateSerializer, TemplateCreateSerializer, TemplateUpdateSerializer,
+    TemplateSerializer, TemplateCreateSerializer, TemplateUpdateSerializer, TemplateRenderSerializer,
     ResumeSerializer, ResumeUploadSerializer, UserQuotaSerializer,
+    ResumeUploadSessionCreateSerializer, ResumeUploadSessionSerializer,
     FolderStructureSerializer, ResumePreviewSerializer,
     CompanySerializer, CompanyCreateSerializer, CompanyUpdateSerializer,
     HRContactSerializer, HRContactCreateSerializer, HRContactUpdateSerializer,
-    HRContactListSerializer, BulkUploadResponseSerializer,
+    HRContactListSerializer, BulkUploadJobSerializer,
+    CompanySearchResultSerializer, HRContactSearchResultSerializer, JobSearchResultSerializer,
+    CompanyFacetPageSerializer, JobFacetPageSerializer,
     CompanyStatsSerializer, HRContactStatsSerializer,
     CompanyBulkUploadSerializer, HRContactBulkUploadSerializer,
-    JobSerializer, JobCreateSerializer, JobUpdateSerializer, JobListSerializer,
+    JobSerializer, JobCreateSerializer, JobUpdateSerializer, JobListSerializer, JobMatchSerializer,
+    requested_fields,
 )
-from .utils import FolderStructureManager
+from .utils import FolderStructureManager, ResumeEmailEncoder, DirectorySearch, DirectoryCache, DirectoryFacets, DirectoryExport, Typeahead
+from .storage import get_resume_storage
+from .pagination import KeysetPaginator, InvalidCursor
+from .matching import JobMatcher, MatchingNotReady
+from .responses import resume_file_response, rendition_file_response, not_modified_response, conditional_headers
 
 
 # Folder Structure APIs
@@ -60,11 +74,16 @@ class TemplateListView(APIView):
     """List all user templates"""
     permission_classes = [IsAuthenticated, ReferlyPermission]
     
-    @extend_schema(responses={200: TemplateSerializer(many=True)})
+    @extend_schema(
+        parameters=[
+            OpenApiParameter(name='fields', type=str, description='Comma-separated fields to return (sparse fieldset)'),
+        ],
+        responses={200: TemplateSerializer(many=True)}
+    )
     def get(self, request):
         templates = Template.objects.filter(user=request.user, is_active=True)
-        serializer = TemplateSerializer(templates, many=True)
-        return Response(serializer.data, status=status.HTTP_200_OK)
+        data = TemplateSerializer.fast_list(templates, requested_fields(request))
+        return Response(data, status=status.HTTP_200_OK)
 
 
 class TemplateCreateView(APIView):
@@ -73,8 +92,8 @@ class TemplateCreateView(APIView):
     
     @extend_schema(request=TemplateCreateSerializer, responses={201: TemplateSerializer})
     def post(self, request):
-        # Check quota
-        quota, _ = UserQuota.objects.get_or_create(user=request.user)
+        # Check quota (single row read; enforced again under the row lock on insert)
+        quota = UserQuota.for_user(request.user)
         if not quota.can_create_template():
             return Response(
                 {"error": f"Template limit reached. Maximum {quota.max_templates} templates allowed."},
@@ -83,7 +102,11 @@ class TemplateCreateView(APIView):
         
         serializer = TemplateCreateSerializer(data=request.data, context={'request': request})
         if serializer.is_valid():
-            template = serializer.save()
+            try:
+                template = serializer.save()
+            except QuotaExceeded as e:
+                # Lost a race for the last slot after the pre-check above
+                return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
             response_serializer = TemplateSerializer(template)
             return Response(
                 {"message": "Template created successfully!", "data": response_serializer.data},
@@ -122,9 +145,8 @@ class TemplateDetailView(APIView):
     @extend_schema(responses={204: None})
     def delete(self, request, template_id):
         template = self.get_object(template_id, request.user)
-        template.is_active = False  # Soft delete
+        template.soft_delete()  # Soft delete frees the quota slot
         template.delete()
-        # template.save()
         return Response(
             {"message": "Template deleted successfully!"},
             status=status.HTTP_204_NO_CONTENT
@@ -137,8 +159,36 @@ class TemplateContentView(APIView):
     
     @extend_schema(responses={200: {"type": "object", "properties": {"html_content": {"type": "string"}}}})
     def get(self, request, template_id):
-        template = get_object_or_404(Template, id=template_id, user=request.user, is_active=True)
-        return Response({"html_content": template.html_content}, status=status.HTTP_200_OK)
+        # Validators first; the HTML is only loaded when the client's copy is stale
+        template = get_object_or_404(
+            Template.objects.defer('html_content'), id=template_id, user=request.user, is_active=True
+        )
+        not_modified = not_modified_response(request, template.content_hash, template.updated_at)
+        if not_modified is not None:
+            return not_modified
+        response = Response({"html_content": template.html_content}, status=status.HTTP_200_OK)
+        response['Cache-Control'] = 'private, no-cache'
+        return conditional_headers(response, template.content_hash, template.updated_at)
+
+
+class TemplateRenderView(APIView):
+    """Render a template for one or more recipients from its precompiled artifact"""
+    permission_classes = [IsAuthenticated, ReferlyPermission]
+    
+    @extend_schema(request=TemplateRenderSerializer)
+    def post(self, request, template_id):
+        serializer = TemplateRenderSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        # Raw HTML is only loaded if the compiled artifact is stale
+        template = get_object_or_404(
+            Template.objects.defer('html_content'), id=template_id, user=request.user, is_active=True
+        )
+        if 'contexts' in serializer.validated_data:
+            rendered = list(template.render_many(serializer.validated_data['contexts']))
+        else:
+            rendered = [template.render(serializer.validated_data['context'])]
+        return Response({"variables": template.variables, "rendered": rendered}, status=status.HTTP_200_OK)
 
 
 # Resume Management APIs
@@ -159,8 +209,8 @@ class ResumeUploadView(APIView):
     
     @extend_schema(request=ResumeUploadSerializer, responses={201: ResumeSerializer})
     def post(self, request):
-        # Check quota
-        quota, _ = UserQuota.objects.get_or_create(user=request.user)
+        # Check quota (single row read; enforced again under the row lock on insert)
+        quota = UserQuota.for_user(request.user)
         if not quota.can_create_resume():
             return Response(
                 {"error": f"Resume limit reached. Maximum {quota.max_resumes} resumes allowed."},
@@ -169,7 +219,11 @@ class ResumeUploadView(APIView):
         
         serializer = ResumeUploadSerializer(data=request.data, context={'request': request})
         if serializer.is_valid():
-            resume = serializer.save()
+            try:
+                resume = serializer.save()
+            except QuotaExceeded as e:
+                # Lost a race for the last slot after the pre-check above
+                return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
             response_serializer = ResumeSerializer(resume)
             return Response(
                 {"message": "Resume uploaded successfully!", "data": response_serializer.data},
@@ -178,6 +232,111 @@ class ResumeUploadView(APIView):
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
+class ResumeUploadSessionCreateView(APIView):
+    """Start a resumable (chunked) resume upload"""
+    permission_classes = [IsAuthenticated, ReferlyPermission]
+    
+    @extend_schema(request=ResumeUploadSessionCreateSerializer, responses={201: ResumeUploadSessionSerializer})
+    def post(self, request):
+        # Fail before any bytes are sent when the user has no slot left
+        quota = UserQuota.for_user(request.user)
+        if not quota.can_create_resume():
+            return Response(
+                {"error": f"Resume limit reached. Maximum {quota.max_resumes} resumes allowed."},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        serializer = ResumeUploadSessionCreateSerializer(data=request.data, context={'request': request})
+        if serializer.is_valid():
+            session = serializer.save()
+            return Response(ResumeUploadSessionSerializer(session).data, status=status.HTTP_201_CREATED)
+        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+
+class ResumeUploadSessionView(APIView):
+    """Get the progress of an upload session (to resume after a disconnect) or abort it"""
+    permission_classes = [IsAuthenticated, ReferlyPermission]
+    
+    @extend_schema(responses={200: ResumeUploadSessionSerializer})
+    def get(self, request, upload_id):
+        session = get_object_or_404(ResumeUploadSession, id=upload_id, user=request.user)
+        return Response(ResumeUploadSessionSerializer(session).data, status=status.HTTP_200_OK)
+    
+    @extend_schema(responses={204: None})
+    def delete(self, request, upload_id):
+        session = get_object_or_404(ResumeUploadSession, id=upload_id, user=request.user)
+        session.discard_chunks()
+        session.delete()
+        return Response(
+            {"message": "Upload cancelled."},
+            status=status.HTTP_204_NO_CONTENT
+        )
+
+
+class ResumeUploadChunkView(APIView):
+    """Upload one chunk (raw request body); chunks must arrive in order, retries are idempotent"""
+    permission_classes = [IsAuthenticated, ReferlyPermission]
+    
+    @extend_schema(
+        request={'application/octet-stream': {'type': 'string', 'format': 'binary'}},
+        parameters=[OpenApiParameter('X-Chunk-CRC32', str, OpenApiParameter.HEADER, description='Hex CRC-32 of the chunk')],
+        responses={200: ResumeUploadSessionSerializer},
+    )
+    def put(self, request, upload_id, index):
+        session = get_object_or_404(ResumeUploadSession, id=upload_id, user=request.user)
+        
+        crc32 = request.headers.get('X-Chunk-CRC32')
+        if crc32 is not None:
+            try:
+                crc32 = int(crc32, 16)
+            except ValueError:
+                return Response({"error": "Invalid X-Chunk-CRC32 header."}, status=status.HTTP_400_BAD_REQUEST)
+        
+        # Read the body incrementally and stop as soon as it exceeds the chunk size
+        data = bytearray()
+        stream = request.stream
+        if stream is not None:
+            for piece in iter(lambda: stream.read(64 * 1024), b''):
+                data += piece
+                if len(data) > session.chunk_size:
+                    return Response(
+                        {"error": f"Chunks cannot exceed {session.chunk_size} bytes."},
+                        status=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE
+                    )
+        
+        try:
+            session = session.write_chunk(index, bytes(data), crc32=crc32)
+        except ChunkOutOfOrder as e:
+            return Response(
+                {"error": str(e), "next_chunk": e.expected},
+                status=status.HTTP_409_CONFLICT
+            )
+        except UploadSessionError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(ResumeUploadSessionSerializer(session).data, status=status.HTTP_200_OK)
+
+
+class ResumeUploadCompleteView(APIView):
+    """Assemble the received chunks into a resume"""
+    permission_classes = [IsAuthenticated, ReferlyPermission]
+    
+    @extend_schema(
+        request={'application/json': {'type': 'object', 'properties': {'sha256': {'type': 'string'}}}},
+        responses={201: ResumeSerializer},
+    )
+    def post(self, request, upload_id):
+        session = get_object_or_404(ResumeUploadSession, id=upload_id, user=request.user)
+        try:
+            resume = session.finalize(sha256=request.data.get('sha256'))
+        except (UploadSessionError, QuotaExceeded) as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        response_serializer = ResumeSerializer(resume)
+        return Response(
+            {"message": "Resume uploaded successfully!", "data": response_serializer.data},
+            status=status.HTTP_201_CREATED
+        )
+
+
 class ResumeDetailView(APIView):
     """Get or delete a specific resume"""
     permission_classes = [IsAuthenticated, ReferlyPermission]
@@ -194,8 +353,7 @@ class ResumeDetailView(APIView):
     @extend_schema(responses={204: None})
     def delete(self, request, resume_id):
         resume = self.get_object(resume_id, request.user)
-        resume.is_active = False  # Soft delete
-        # resume.save()
+        resume.soft_delete()  # Soft delete releases the shared blob reference
         resume.delete()
         return Response(
             {"message": "Resume deleted successfully!"},
@@ -208,29 +366,42 @@ class ResumePreviewView(APIView):
     permission_classes = [IsAuthenticated, ReferlyPermission]
     
     def get(self, request, resume_id):
-        resume = get_object_or_404(Resume, id=resume_id, user=request.user, is_active=True)
+        resume = get_object_or_404(Resume.objects.with_blob(), id=resume_id, user=request.user, is_active=True)
         
         if resume.file_extension == 'pdf':
-            # Return PDF binary data with proper headers for iframe display
-            response = HttpResponse(resume.file_content, content_type='application/pdf')
-            response['Content-Disposition'] = f'inline; filename="{resume.name}.pdf"'
-            return response
+            # Stream PDF binary data (ranges / 304 supported) for iframe display
+            return resume_file_response(request, resume, 'inline')
         
         elif resume.file_extension == 'docx':
-            # For DOCX, return a simple HTML preview (you can enhance this with actual conversion)
+            # DOCX previews are pre-rendered by the `render_resumes` worker; never convert on the request thread
+            kind = 'html' if request.query_params.get('output') == 'html' else 'pdf'
+            rendition = resume.get_rendition(kind)
+            if rendition and rendition.status == ResumeRendition.STATUS_READY:
+                return rendition_file_response(request, resume, rendition)
+            
+            rendering = rendition is not None and rendition.status != ResumeRendition.STATUS_FAILED
+            message = (
+                "Preview is being generated. Refresh in a few seconds."
+                if rendering else
+                "Preview unavailable. File is ready for download or email attachment."
+            )
             html_content = f'''
             <html>
             <body style="font-family: Arial, sans-serif; padding: 20px;">
                 <h2>Document Preview</h2>
-                <p><strong>File:</strong> {resume.name}.{resume.file_extension}</p>
+                <p><strong>File:</strong> {escape(resume.name)}.{resume.file_extension}</p>
                 <p><strong>Size:</strong> {resume.file_size // 1024}KB</p>
                 <p><strong>Uploaded:</strong> {resume.created_at.strftime('%Y-%m-%d %H:%M')}</p>
                 <hr>
-                <p><em>DOCX preview not yet implemented. File is ready for download or email attachment.</em></p>
+                <p><em>{message}</em></p>
             </body>
             </html>
             '''
-            return HttpResponse(html_content, content_type='text/html')
+            return HttpResponse(
+                html_content,
+                content_type='text/html',
+                status=status.HTTP_202_ACCEPTED if rendering else status.HTTP_200_OK,
+            )
         
         return Response({"error": "Unsupported file type"}, status=status.HTTP_400_BAD_REQUEST)
 
@@ -240,24 +411,43 @@ class ResumeDownloadView(APIView):
     permission_classes = [IsAuthenticated, ReferlyPermission]
     
     def get(self, request, resume_id):
-        resume = get_object_or_404(Resume, id=resume_id, user=request.user, is_active=True)
+        resume = get_object_or_404(Resume.objects.with_blob(), id=resume_id, user=request.user, is_active=True)
         
-        content_type = 'application/pdf' if resume.file_extension == 'pdf' else 'application/vnd.openxmlformats-officedocument.wordprocessingml.document'
-        response = HttpResponse(resume.file_content, content_type=content_type)
-        response['Content-Disposition'] = f'attachment; filename="{resume.name}.{resume.file_extension}"'
+        storage = get_resume_storage() if resume.blob and resume.blob.storage_key else None
+        if storage and storage.supports_presigned_urls and settings.REFERLY_STORAGE.get('PRESIGNED_DOWNLOADS'):
+            # Let the client fetch the object straight from the bucket
+            url = storage.presigned_url(
+                resume.blob.storage_key,
+                filename=f"{resume.name}.{resume.file_extension}",
+                content_type=resume.mime_type,
+            )
+            return HttpResponseRedirect(url)
         
-        return response
+        return resume_file_response(request, resume, 'attachment')
 
 
 class ResumeEmailFormatView(APIView):
     """Get resume in email-friendly format (base64)"""
     permission_classes = [IsAuthenticated, ReferlyPermission]
     
-    @extend_schema(responses={200: ResumePreviewSerializer})
+    @extend_schema(
+        parameters=[
+            OpenApiParameter(name='output', type=str, description='"json" (default, streamed) or "mime" for a ready-to-attach MIME part'),
+        ],
+        responses={200: ResumePreviewSerializer}
+    )
     def get(self, request, resume_id):
-        resume = get_object_or_404(Resume, id=resume_id, user=request.user, is_active=True)
-        serializer = ResumePreviewSerializer(resume)
-        return Response(serializer.data, status=status.HTTP_200_OK)
+        resume = get_object_or_404(Resume.objects.with_blob(), id=resume_id, user=request.user, is_active=True)
+        
+        if request.query_params.get('output') == 'mime':
+            # Cached pre-encoded part; composing the same email again costs no re-encoding
+            part = ResumeEmailEncoder.get_mime_attachment(resume)
+            return HttpResponse(part.as_string(), content_type='text/plain; charset=us-ascii')
+        
+        # Same payload as ResumePreviewSerializer, but the base64 body is encoded chunk by chunk
+        response = StreamingHttpResponse(ResumeEmailEncoder.iter_email_format_json(resume), content_type='application/json')
+        response['Content-Length'] = ResumeEmailEncoder.email_format_length(resume)
+        return response
 
 
 class ResumeFileView(APIView):
@@ -265,17 +455,16 @@ class ResumeFileView(APIView):
     permission_classes = [IsAuthenticated, ReferlyPermission]
     
     def get(self, request, resume_id):
-        resume = get_object_or_404(Resume, id=resume_id, user=request.user, is_active=True)
+        resume = get_object_or_404(Resume.objects.with_blob(), id=resume_id, user=request.user, is_active=True)
         
         if resume.file_extension == 'pdf':
-            # Return raw PDF with Chrome-compatible headers
-            response = HttpResponse(resume.file_content, content_type='application/pdf')
-            response['Content-Disposition'] = f'inline; filename="{resume.name}.pdf"'
+            # Stream raw PDF with Chrome-compatible headers
+            response = resume_file_response(request, resume, 'inline')
             
             # Chrome-specific headers to allow embedding
             response['X-Frame-Options'] = 'SAMEORIGIN'  # Changed from ALLOWALL to SAMEORIGIN
             response['Content-Security-Policy'] = "frame-ancestors 'self' http://localhost:3000 https://localhost:3000"
-            response['Cache-Control'] = 'public, max-age=3600'
+            response['Cache-Control'] = 'private, max-age=3600'
             response['Access-Control-Allow-Origin'] = 'http://localhost:3000'
             response['Access-Control-Allow-Credentials'] = 'true'
             
@@ -286,14 +475,32 @@ class ResumeFileView(APIView):
             return response
             
         elif resume.file_extension == 'docx':
-            # For DOCX, return the actual file (browsers will handle download)
-            response = HttpResponse(resume.file_content, content_type='application/vnd.openxmlformats-officedocument.wordprocessingml.document')
-            response['Content-Disposition'] = f'inline; filename="{resume.name}.{resume.file_extension}"'
-            return response
+            # Serve the pre-rendered PDF when the worker has produced it
+            rendition = resume.get_rendition('pdf')
+            if rendition and rendition.status == ResumeRendition.STATUS_READY:
+                return rendition_file_response(request, resume, rendition)
+            # Otherwise return the actual file (browsers will handle download)
+            return resume_file_response(request, resume, 'inline')
         
         return Response({"error": "Unsupported file type"}, status=status.HTTP_400_BAD_REQUEST)
 
 
+class ResumeThumbnailView(APIView):
+    """Serve the precomputed first-page thumbnail (WebP) of a resume"""
+    permission_classes = [IsAuthenticated, ReferlyPermission]
+    
+    def get(self, request, resume_id):
+        resume = get_object_or_404(Resume.objects.with_blob(), id=resume_id, user=request.user, is_active=True)
+        rendition = resume.get_rendition('thumbnail')
+        if not rendition or rendition.status != ResumeRendition.STATUS_READY:
+            return Response({"error": "Thumbnail not ready"}, status=status.HTTP_404_NOT_FOUND)
+        
+        response = rendition_file_response(request, resume, rendition)
+        # Folder-tree URLs carry the thumbnail hash (?v=...), so the bytes behind a URL never change
+        response['Cache-Control'] = 'private, max-age=31536000, immutable'
+        return response
+
+
 # User Quota API
 class UserQuotaView(APIView):
     """Get user quota information"""
@@ -301,7 +508,7 @@ class UserQuotaView(APIView):
     
     @extend_schema(responses={200: UserQuotaSerializer})
     def get(self, request):
-        quota, _ = UserQuota.objects.get_or_create(user=request.user)
+        quota = UserQuota.for_user(request.user)
         serializer = UserQuotaSerializer(quota)
         return Response(serializer.data, status=status.HTTP_200_OK)
 
@@ -311,16 +518,27 @@ class UserQuotaView(APIView):
 class CompanyListView(APIView):
     """List all companies with pagination and search"""
     permission_classes = [IsAuthenticated, ReferlyPermission]
+    # Responses are shared by all users and keyed on these models' versions
+    cache_models = (Company, HRContact, Job)
     
     @extend_schema(
         parameters=[
             OpenApiParameter(name='search', type=str, description='Search in company name or website'),
-            OpenApiParameter(name='industry', type=str, description='Filter by industry'),
-            OpenApiParameter(name='location', type=str, description='Filter by location'),
+            OpenApiParameter(name='location', type=str, description='Filter by headquarters'),
+            OpenApiParameter(name='cursor', type=str, description='Opaque cursor from the previous page'),
+            OpenApiParameter(name='page_size', type=int, description='Results per page (default 50, max 200)'),
+            OpenApiParameter(name='fields', type=str, description='Comma-separated fields to return (sparse fieldset)'),
         ],
         responses={200: CompanySerializer(many=True)}
     )
     def get(self, request):
+        try:
+            data = DirectoryCache.get_or_build('companies', request, self.cache_models, lambda: self.build(request))
+        except InvalidCursor as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(data, status=status.HTTP_200_OK)
+    
+    def build(self, request):
         companies = Company.objects.filter(is_active=True)
         
         # Search functionality
@@ -332,19 +550,14 @@ class CompanyListView(APIView):
                 Q(company_id__icontains=search)
             )
         
-        # Filter by industry
-        industry = request.query_params.get('industry', None)
-        if industry:
-            companies = companies.filter(industry__icontains=industry)
-        
         # Filter by location
         location = request.query_params.get('location', None)
         if location:
-            companies = companies.filter(location__icontains=location)
-
+            companies = companies.filter(headquarters__icontains=location)
         
-        serializer = CompanySerializer(companies, many=True)
-        return Response(serializer.data, status=status.HTTP_200_OK)
+        paginator = KeysetPaginator(request)
+        companies, next_cursor = CompanySerializer.fast_page(paginator, companies, requested_fields(request))
+        return paginator.response_data(companies, next_cursor)
 
 
 class CompanyCreateView(APIView):
@@ -368,14 +581,24 @@ class CompanyDetailView(APIView):
     """Get, update, or delete a specific company"""
     permission_classes = [IsAuthenticated, ReferlyPermission]
     
+    # GET responses are shared by all users and keyed on these models' versions (counts come from contacts/jobs)
+    cache_models = (Company, HRContact, Job)
+    
     def get_object(self, company_id):
         return get_object_or_404(Company, company_id=company_id, is_active=True)
     
-    @extend_schema(responses={200: CompanySerializer})
+    @extend_schema(
+        parameters=[
+            OpenApiParameter(name='fields', type=str, description='Comma-separated fields to return (sparse fieldset)'),
+        ],
+        responses={200: CompanySerializer}
+    )
     def get(self, request, company_id):
-        company = self.get_object(company_id)
-        serializer = CompanySerializer(company)
-        return Response(serializer.data, status=status.HTTP_200_OK)
+        data = DirectoryCache.get_or_build(
+            f'company:{company_id}', request, self.cache_models,
+            lambda: CompanySerializer(self.get_object(company_id), fields=requested_fields(request)).data,
+        )
+        return Response(data, status=status.HTTP_200_OK)
     
     @extend_schema(request=CompanyUpdateSerializer, responses={200: CompanySerializer})
     def put(self, request, company_id):
@@ -402,48 +625,141 @@ class CompanyDetailView(APIView):
 
 
 class CompanySearchView(APIView):
-    """Advanced company search with multiple filters"""
+    """Ranked full-text company search with filters"""
     permission_classes = [IsAuthenticated, ReferlyPermission]
     
     @extend_schema(
         parameters=[
-            OpenApiParameter(name='query', type=str, description='General search query'),
-            OpenApiParameter(name='industry', type=str, description='Filter by industry'),
-            OpenApiParameter(name='location', type=str, description='Filter by location'),
-            OpenApiParameter(name='min_employees', type=int, description='Minimum employee count'),
-            OpenApiParameter(name='has_linkedin', type=bool, description='Has LinkedIn profile'),
+            OpenApiParameter(name='query', type=str, description='Full-text query (name > about us > headquarters)'),
+            OpenApiParameter(name='location', type=str, description='Filter by headquarters (contains)'),
+            OpenApiParameter(name='headquarters', type=str, description='Filter by exact headquarters (facet value)'),
+            OpenApiParameter(name='company_size', type=str, description='Filter by company size bucket'),
+            OpenApiParameter(name='cursor', type=str, description='Opaque cursor from the previous page'),
+            OpenApiParameter(name='page_size', type=int, description='Results per page (default 50, max 200)'),
+            OpenApiParameter(name='fields', type=str, description='Comma-separated fields to return (sparse fieldset)'),
         ],
-        responses={200: CompanySerializer(many=True)}
+        responses={200: CompanySearchResultSerializer(many=True)}
     )
     def get(self, request):
+        companies = self.search(request)
+        paginator = KeysetPaginator(request)
+        try:
+            companies, next_cursor = paginator.paginate(companies)
+        except InvalidCursor as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        serializer = CompanySearchResultSerializer(companies, many=True, fields=requested_fields(request))
+        data = paginator.response_data(serializer.data, next_cursor)
+        data.update(self.extra_data(request))
+        return Response(data, status=status.HTTP_200_OK)
+    
+    def extra_data(self, request):
+        """Additions to the page body (see CompanyFacetView)"""
+        return {}
+    
+    def search(self, request):
+        """Filtered, ranked queryset shared with the facets and export endpoints"""
         companies = Company.objects.filter(is_active=True)
         
-        query = request.query_params.get('query', None)
-        if query:
-            companies = companies.filter(
-                Q(name__icontains=query) |
-                Q(website__icontains=query) |
-                Q(industry__icontains=query) |
-                Q(location__icontains=query)
-            )
-        
-        industry = request.query_params.get('industry', None)
-        if industry:
-            companies = companies.filter(industry__iexact=industry)
-        
         location = request.query_params.get('location', None)
         if location:
-            companies = companies.filter(location__icontains=location)
+            companies = companies.filter(headquarters__icontains=location)
         
-        has_linkedin = request.query_params.get('has_linkedin', None)
-        if has_linkedin is not None:
-            if has_linkedin.lower() == 'true':
-                companies = companies.exclude(linkedin_url='')
-            else:
-                companies = companies.filter(linkedin_url='')
+        headquarters = request.query_params.get('headquarters', None)
+        if headquarters:
+            companies = companies.filter(headquarters=headquarters)
         
-        serializer = CompanySerializer(companies, many=True)
-        return Response(serializer.data, status=status.HTTP_200_OK)
+        company_size = request.query_params.get('company_size', None)
+        if company_size:
+            companies = companies.filter(company_size=company_size)
+        
+        return DirectorySearch.rank(companies, request.query_params.get('query'))
+
+
+@extend_schema_view(get=extend_schema(responses={200: CompanyFacetPageSerializer}))
+class CompanyFacetView(CompanySearchView):
+    """Company search page plus per-value counts of each facet, in one round trip"""
+    # facet name -> column
+    FACETS = {'company_size': 'company_size', 'headquarters': 'headquarters'}
+    # Facet counts are shared by all users and keyed on the filters plus these models' versions
+    cache_models = (Company,)
+    
+    def extra_data(self, request):
+        companies = self.search(request)
+        return {'facets': DirectoryCache.get_or_build(
+            'company-facets', request, self.cache_models,
+            lambda: DirectoryFacets.count(companies, self.FACETS),
+            exclude=('cursor', 'page_size'),
+        )}
+
+
+class DirectoryExportMixin:
+    """
+    Export endpoint of a directory search view: streams the rows `search()` matches as CSV or NDJSON
+    (Admin only). Subclasses set COLUMNS ([(header, field path)]) and the download's `export_filename`.
+    """
+    permission_classes = [IsAuthenticated, IsCustomAdmin, ReferlyPermission]
+    COLUMNS = []
+    export_filename = None
+    
+    @extend_schema(
+        parameters=[
+            OpenApiParameter(name='output', type=str, enum=['csv', 'ndjson'], description='Export format (default csv)'),
+            OpenApiParameter(name='query', type=str, description='Full-text query; other filters as in the search endpoint'),
+        ],
+        responses={(200, 'text/csv'): str, (200, 'application/x-ndjson'): str}
+    )
+    def get(self, request):
+        output = request.query_params.get('output', 'csv')
+        if output not in DirectoryExport.CONTENT_TYPES:
+            return Response({"error": "output must be csv or ndjson"}, status=status.HTTP_400_BAD_REQUEST)
+        return DirectoryExport.response(self.search(request), self.COLUMNS, output, self.export_filename)
+
+
+class CompanyExportView(DirectoryExportMixin, CompanySearchView):
+    """Stream active companies matching the search filters as CSV or NDJSON (Admin only)"""
+    export_filename = 'companies'
+    # (header, field path)
+    COLUMNS = [
+        ('company_id', 'company_id'),
+        ('name', 'name'),
+        ('website', 'website'),
+        ('company_url', 'company_url'),
+        ('headquarters', 'headquarters'),
+        ('founded_year', 'founded_year'),
+        ('company_size', 'company_size'),
+        ('about_us', 'about_us'),
+        ('hr_contacts_count', 'hr_contacts_count'),
+        ('jobs_count', 'jobs_count'),
+        ('created_at', 'created_at'),
+        ('updated_at', 'updated_at'),
+    ]
+
+
+class TypeaheadView(APIView):
+    """Search-as-you-type suggestions for company and HR contact names (typo tolerant)"""
+    permission_classes = [IsAuthenticated, ReferlyPermission]
+    
+    @extend_schema(
+        parameters=[
+            OpenApiParameter(name='q', type=str, description='Partial name typed so far'),
+            OpenApiParameter(name='type', type=str, enum=['companies', 'hr-contacts'], description='What to suggest (default companies)'),
+            OpenApiParameter(name='limit', type=int, description='Maximum suggestions (capped server-side)'),
+        ],
+    )
+    def get(self, request):
+        kind = request.query_params.get('type', 'companies')
+        if kind not in ('companies', 'hr-contacts'):
+            return Response({"error": "type must be 'companies' or 'hr-contacts'."}, status=status.HTTP_400_BAD_REQUEST)
+        max_results = settings.REFERLY_TYPEAHEAD['MAX_RESULTS']
+        try:
+            limit = int(request.query_params.get('limit', max_results))
+        except ValueError:
+            limit = max_results
+        limit = max(1, min(limit, max_results))
+        
+        query = request.query_params.get('q', '')
+        results = Typeahead.search(kind, query, limit)
+        return Response({"query": query, "type": kind, "results": results}, status=status.HTTP_200_OK)
 
 
 # ==================== HR CONTACT MANAGEMENT VIEWS ====================
@@ -457,6 +773,9 @@ class HRContactListView(APIView):
             OpenApiParameter(name='search', type=str, description='Search in HR name or email'),
             OpenApiParameter(name='company_id', type=str, description='Filter by company ID'),
             OpenApiParameter(name='verified_only', type=bool, description='Show only verified contacts'),
+            OpenApiParameter(name='cursor', type=str, description='Opaque cursor from the previous page'),
+            OpenApiParameter(name='page_size', type=int, description='Results per page (default 50, max 200)'),
+            OpenApiParameter(name='fields', type=str, description='Comma-separated fields to return (sparse fieldset)'),
         ],
         responses={200: HRContactListSerializer(many=True)}
     )
@@ -483,8 +802,12 @@ class HRContactListView(APIView):
         if verified_only and verified_only.lower() == 'true':
             hr_contacts = hr_contacts.filter(email_verified=True)
         
-        serializer = HRContactListSerializer(hr_contacts, many=True)
-        return Response(serializer.data, status=status.HTTP_200_OK)
+        paginator = KeysetPaginator(request)
+        try:
+            hr_contacts, next_cursor = HRContactListSerializer.fast_page(paginator, hr_contacts, requested_fields(request))
+        except InvalidCursor as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(paginator.response_data(hr_contacts, next_cursor), status=status.HTTP_200_OK)
 
 
 class HRContactCreateView(APIView):
@@ -542,43 +865,43 @@ class HRContactDetailView(APIView):
 
 
 class HRContactSearchView(APIView):
-    """Advanced HR contact search"""
+    """Ranked full-text HR contact search"""
     permission_classes = [IsAuthenticated, ReferlyPermission]
     
     @extend_schema(
         parameters=[
-            OpenApiParameter(name='query', type=str, description='General search query'),
+            OpenApiParameter(name='query', type=str, description='Full-text query (name > email > company name)'),
             OpenApiParameter(name='company_name', type=str, description='Filter by company name'),
-            OpenApiParameter(name='industry', type=str, description='Filter by company industry'),
-            OpenApiParameter(name='location', type=str, description='Filter by company location'),
+            OpenApiParameter(name='location', type=str, description='Filter by company headquarters'),
             OpenApiParameter(name='verified_email', type=bool, description='Has verified email'),
             OpenApiParameter(name='verified_linkedin', type=bool, description='Has verified LinkedIn'),
+            OpenApiParameter(name='cursor', type=str, description='Opaque cursor from the previous page'),
+            OpenApiParameter(name='page_size', type=int, description='Results per page (default 50, max 200)'),
+            OpenApiParameter(name='fields', type=str, description='Comma-separated fields to return (sparse fieldset)'),
         ],
-        responses={200: HRContactListSerializer(many=True)}
+        responses={200: HRContactSearchResultSerializer(many=True)}
     )
     def get(self, request):
+        hr_contacts = self.search(request)
+        paginator = KeysetPaginator(request)
+        try:
+            hr_contacts, next_cursor = paginator.paginate(hr_contacts)
+        except InvalidCursor as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        serializer = HRContactSearchResultSerializer(hr_contacts, many=True, fields=requested_fields(request))
+        return Response(paginator.response_data(serializer.data, next_cursor), status=status.HTTP_200_OK)
+    
+    def search(self, request):
+        """Filtered, ranked queryset shared with the export endpoint"""
         hr_contacts = HRContact.objects.filter(is_active=True).select_related('company')
         
-        query = request.query_params.get('query', None)
-        if query:
-            hr_contacts = hr_contacts.filter(
-                Q(first_name__icontains=query) |
-                Q(last_name__icontains=query) |
-                Q(email__icontains=query) |
-                Q(company__name__icontains=query)
-            )
-        
         company_name = request.query_params.get('company_name', None)
         if company_name:
             hr_contacts = hr_contacts.filter(company__name__icontains=company_name)
         
-        industry = request.query_params.get('industry', None)
-        if industry:
-            hr_contacts = hr_contacts.filter(company__industry__icontains=industry)
-        
         location = request.query_params.get('location', None)
         if location:
-            hr_contacts = hr_contacts.filter(company__location__icontains=location)
+            hr_contacts = hr_contacts.filter(company__headquarters__icontains=location)
         
         verified_email = request.query_params.get('verified_email', None)
         if verified_email is not None:
@@ -588,20 +911,48 @@ class HRContactSearchView(APIView):
         if verified_linkedin is not None:
             hr_contacts = hr_contacts.filter(linkedin_verified=verified_linkedin.lower() == 'true')
         
-        serializer = HRContactListSerializer(hr_contacts, many=True)
-        return Response(serializer.data, status=status.HTTP_200_OK)
+        return DirectorySearch.rank(hr_contacts, request.query_params.get('query'))
+
+
+class HRContactExportView(DirectoryExportMixin, HRContactSearchView):
+    """Stream active HR contacts matching the search filters as CSV or NDJSON (Admin only)"""
+    export_filename = 'hr_contacts'
+    # (header, field path)
+    COLUMNS = [
+        ('id', 'id'),
+        ('first_name', 'first_name'),
+        ('last_name', 'last_name'),
+        ('email', 'email'),
+        ('company_id', 'company__company_id'),
+        ('company_name', 'company__name'),
+        ('email_verified', 'email_verified'),
+        ('linkedin_verified', 'linkedin_verified'),
+        ('created_at', 'created_at'),
+        ('updated_at', 'updated_at'),
+    ]
 
 
 class HRContactByCompanyView(APIView):
     """Get all HR contacts for a specific company"""
     permission_classes = [IsAuthenticated, ReferlyPermission]
     
-    @extend_schema(responses={200: HRContactListSerializer(many=True)})
+    @extend_schema(
+        parameters=[
+            OpenApiParameter(name='cursor', type=str, description='Opaque cursor from the previous page'),
+            OpenApiParameter(name='page_size', type=int, description='Results per page (default 50, max 200)'),
+            OpenApiParameter(name='fields', type=str, description='Comma-separated fields to return (sparse fieldset)'),
+        ],
+        responses={200: HRContactListSerializer(many=True)}
+    )
     def get(self, request, company_id):
         company = get_object_or_404(Company, company_id=company_id, is_active=True)
-        hr_contacts = HRContact.objects.filter(company=company, is_active=True)
-        serializer = HRContactListSerializer(hr_contacts, many=True)
-        return Response(serializer.data, status=status.HTTP_200_OK)
+        hr_contacts = HRContact.objects.filter(company=company, is_active=True).select_related('company')
+        paginator = KeysetPaginator(request)
+        try:
+            hr_contacts, next_cursor = HRContactListSerializer.fast_page(paginator, hr_contacts, requested_fields(request))
+        except InvalidCursor as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(paginator.response_data(hr_contacts, next_cursor), status=status.HTTP_200_OK)
 
 
 # ==================== VERIFICATION VIEWS ====================
@@ -646,12 +997,14 @@ class CompanyStatsView(APIView):
     
     @extend_schema(responses={200: CompanyStatsSerializer})
     def get(self, request):
-        companies = Company.objects.filter(is_active=True)
-        
+        stats = DirectoryStat.for_scope('companies')
         stats = {
-            'total_companies': companies.count(),
-            'active_companies': companies.filter(is_active=True).count(),
-            'companies_by_industry': dict(companies.values('industry').annotate(count=Count('industry')).values_list('industry', 'count')),
+            # Inactive companies are hidden everywhere else, so the total counts the active ones
+            'total_companies': stats['active'],
+            'active_companies': stats['active'],
+            'companies_by_size': {
+                name[len('size:'):]: value for name, value in stats.items() if name.startswith('size:') and value
+            },
         }
         
         serializer = CompanyStatsSerializer(stats)
@@ -664,14 +1017,16 @@ class HRContactStatsView(APIView):
     
     @extend_schema(responses={200: HRContactStatsSerializer})
     def get(self, request):
-        hr_contacts = HRContact.objects.filter(is_active=True)
-        
+        stats = DirectoryStat.for_scope('hr_contacts')
         stats = {
-            'total_hr_contacts': hr_contacts.count(),
-            'active_hr_contacts': hr_contacts.filter(is_active=True).count(),
-            'verified_emails': hr_contacts.filter(email_verified=True).count(),
-            'verified_linkedin': hr_contacts.filter(linkedin_verified=True).count(),
-            'contacts_by_company': dict(hr_contacts.values('company__name').annotate(count=Count('company')).values_list('company__name', 'count')),
+            'total_hr_contacts': stats['active'],
+            'active_hr_contacts': stats['active'],
+            'verified_emails': stats.get('verified_emails', 0),
+            'verified_linkedin': stats.get('verified_linkedin', 0),
+            # Active contacts per company straight from the denormalized Company counters
+            'contacts_by_company': dict(
+                Company.objects.filter(hr_contacts_count__gt=0).order_by().values_list('name', 'hr_contacts_count')
+            ),
         }
         
         serializer = HRContactStatsSerializer(stats)
@@ -681,246 +1036,56 @@ class HRContactStatsView(APIView):
 # ==================== BULK UPLOAD VIEWS ====================
 
 class CompanyBulkUploadView(APIView):
-    """Bulk upload companies from Excel file (Admin only)"""
-    permission_classes = [IsAuthenticated, ReferlyPermission]
-    
+    """
+    Bulk upload companies from Excel file (Admin only).
+    The sheet is stored and imported by the `process_bulk_uploads` worker; poll the returned job.
+    """
     from accounts.models import IsCustomAdmin
     permission_classes = [IsAuthenticated, IsCustomAdmin, ReferlyPermission]
     
     @extend_schema(
         request=CompanyBulkUploadSerializer,
-        responses={200: BulkUploadResponseSerializer}
+        responses={202: BulkUploadJobSerializer}
     )
     def post(self, request):
-        import pandas as pd
-        from .utils import ExcelDataNormalizer
-        from django.db import transaction
-        
         serializer = CompanyBulkUploadSerializer(data=request.data)
         if not serializer.is_valid():
             return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
         
-        excel_file = serializer.validated_data['file']
-        
-        try:
-            # Read Excel file
-            df = pd.read_excel(excel_file)
-            
-            # Normalize column names
-            df = ExcelDataNormalizer.normalize_column_names(df)
-            
-            # Replace NaN with empty strings
-            df = df.fillna('')
-            
-            success_count = 0
-            error_count = 0
-            errors = []
-            created_companies = []
-            
-            for index, row in df.iterrows():
-                row_number = index + 2  # Excel row number (accounting for header)
-                
-                try:
-                    # Clean data
-                    cleaned = ExcelDataNormalizer.clean_company_data(row)
-                    
-                    # Validate required fields
-                    if not cleaned['name']:
-                        errors.append(f"Row {row_number}: Missing company name")
-                        error_count += 1
-                        continue
-                    
-                    if not cleaned['website']:
-                        errors.append(f"Row {row_number}: Missing website")
-                        error_count += 1
-                        continue
-                    
-                    # Generate company_id if not provided
-                    if 'company_id' in row and row.get('company_id'):
-                        company_id = str(row['company_id']).strip()
-                    else:
-                        # Auto-generate company_id from name
-                        base_id = cleaned['name'][:20].upper().replace(' ', '_')
-                        company_id = base_id
-                        counter = 1
-                        while Company.objects.filter(company_id=company_id).exists():
-                            company_id = f"{base_id}_{counter}"
-                            counter += 1
-                    
-                    # Check if company already exists
-                    if Company.objects.filter(company_id=company_id).exists():
-                        errors.append(f"Row {row_number}: Company ID '{company_id}' already exists")
-                        error_count += 1
-                        continue
-                    
-                    # Create company
-                    with transaction.atomic():
-                        company = Company.objects.create(
-                            company_id=company_id,
-                            name=cleaned['name'],
-                            website=cleaned['website'],
-                            industry=cleaned['industry'],
-                            location=cleaned['location'],
-                            employee_count_range=cleaned['employee_count_range'],
-                            about_us=cleaned['about_us'],
-                            linkedin_url=cleaned['linkedin_url'],
-                            linkedin_company_id=cleaned['linkedin_company_id'],
-                            is_active=True
-                        )
-                        created_companies.append(company.company_id)
-                        success_count += 1
-                
-                except Exception as e:
-                    errors.append(f"Row {row_number}: {str(e)}")
-                    error_count += 1
-            
-            return Response({
-                'success': True,
-                'message': f'Uploaded {success_count} companies',
-                'total_rows': len(df),
-                'created': success_count,
-                'errors': error_count,
-                'error_details': errors[:20],  # Limit to first 20 errors
-                'created_company_ids': created_companies[:10]  # Show first 10
-            }, status=status.HTTP_200_OK)
-            
-        except Exception as e:
-            return Response({
-                'success': False,
-                'error': f'Failed to process Excel file: {str(e)}'
-            }, status=status.HTTP_400_BAD_REQUEST)
+        job = BulkUploadJob.submit(request.user, BulkUploadJob.KIND_COMPANIES, serializer.validated_data['file'])
+        return Response(BulkUploadJobSerializer(job).data, status=status.HTTP_202_ACCEPTED)
 
 
 class HRContactBulkUploadView(APIView):
-    """Bulk upload HR contacts from Excel file (Admin only)"""
+    """
+    Bulk upload HR contacts from Excel file (Admin only); contacts with a known email are updated.
+    The sheet is stored and imported by the `process_bulk_uploads` worker; poll the returned job.
+    """
     from accounts.models import IsCustomAdmin
     permission_classes = [IsAuthenticated, IsCustomAdmin, ReferlyPermission]
     
     @extend_schema(
         request=HRContactBulkUploadSerializer,
-        responses={200: BulkUploadResponseSerializer}
+        responses={202: BulkUploadJobSerializer}
     )
     def post(self, request):
-        import pandas as pd
-        from .utils import ExcelDataNormalizer
-        from django.db import transaction
-        
         serializer = HRContactBulkUploadSerializer(data=request.data)
         if not serializer.is_valid():
             return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
         
-        excel_file = serializer.validated_data['file']
-        
-        try:
-            # Read Excel file
-            df = pd.read_excel(excel_file)
-            
-            # Normalize column names
-            df = ExcelDataNormalizer.normalize_column_names(df)
-            
-            # Replace NaN with empty strings
-            df = df.fillna('')
-            
-            success_count = 0
-            error_count = 0
-            errors = []
-            created_contacts = []
-            
-            for index, row in df.iterrows():
-                row_number = index + 2  # Excel row number (accounting for header)
-                
-                try:
-                    # Clean data
-                    cleaned = ExcelDataNormalizer.clean_hr_contact_data(row)
-                    
-                    # Validate required fields
-                    if not cleaned['first_name']:
-                        errors.append(f"Row {row_number}: Missing first name")
-                        error_count += 1
-                        continue
-                    
-                    if not cleaned['last_name']:
-                        errors.append(f"Row {row_number}: Missing last name")
-                        error_count += 1
-                        continue
-                    
-                    if not cleaned['email']:
-                        errors.append(f"Row {row_number}: Missing email")
-                        error_count += 1
-                        continue
-                    
-                    # Validate email format
-                    if not ExcelDataNormalizer.validate_email(cleaned['email']):
-                        errors.append(f"Row {row_number}: Invalid email format: {cleaned['email']}")
-                        error_count += 1
-                        continue
-                    
-                    # Check for duplicate email
-                    if HRContact.objects.filter(email=cleaned['email']).exists():
-                        errors.append(f"Row {row_number}: Email already exists: {cleaned['email']}")
-                        error_count += 1
-                        continue
-                    
-                    # Find company by company_id or company_name
-                    company = None
-                    if cleaned['company_id']:
-                        try:
-                            company = Company.objects.get(company_id=cleaned['company_id'], is_active=True)
-                        except Company.DoesNotExist:
-                            errors.append(f"Row {row_number}: Company ID not found: {cleaned['company_id']}")
-                            error_count += 1
-                            continue
-                    elif cleaned['company_name']:
-                        try:
-                            company = Company.objects.get(name__iexact=cleaned['company_name'], is_active=True)
-                        except Company.DoesNotExist:
-                            errors.append(f"Row {row_number}: Company name not found: {cleaned['company_name']}")
-                            error_count += 1
-                            continue
-                        except Company.MultipleObjectsReturned:
-                            errors.append(f"Row {row_number}: Multiple companies found with name: {cleaned['company_name']}")
-                            error_count += 1
-                            continue
-                    else:
-                        errors.append(f"Row {row_number}: Missing company reference (company_id or company_name)")
-                        error_count += 1
-                        continue
-                    
-                    # Create HR contact
-                    with transaction.atomic():
-                        hr_contact = HRContact.objects.create(
-                            company=company,
-                            first_name=cleaned['first_name'],
-                            last_name=cleaned['last_name'],
-                            email=cleaned['email'],
-                            phone=cleaned['phone'],
-                            linkedin_url=cleaned['linkedin_url'],
-                            email_verified=False,
-                            linkedin_verified=False,
-                            is_active=True
-                        )
-                        created_contacts.append(hr_contact.email)
-                        success_count += 1
-                
-                except Exception as e:
-                    errors.append(f"Row {row_number}: {str(e)}")
-                    error_count += 1
-            
-            return Response({
-                'success': True,
-                'message': f'Uploaded {success_count} HR contacts',
-                'total_rows': len(df),
-                'created': success_count,
-                'errors': error_count,
-                'error_details': errors[:20],  # Limit to first 20 errors
-                'created_emails': created_contacts[:10]  # Show first 10
-            }, status=status.HTTP_200_OK)
-            
-        except Exception as e:
-            return Response({
-                'success': False,
-                'error': f'Failed to process Excel file: {str(e)}'
-            }, status=status.HTTP_400_BAD_REQUEST)
+        job = BulkUploadJob.submit(request.user, BulkUploadJob.KIND_HR_CONTACTS, serializer.validated_data['file'])
+        return Response(BulkUploadJobSerializer(job).data, status=status.HTTP_202_ACCEPTED)
+
+
+class BulkUploadJobView(APIView):
+    """Progress of a bulk upload: rows processed, errors so far and, once completed, the upload result"""
+    from accounts.models import IsCustomAdmin
+    permission_classes = [IsAuthenticated, IsCustomAdmin, ReferlyPermission]
+    
+    @extend_schema(responses={200: BulkUploadJobSerializer})
+    def get(self, request, job_id):
+        job = get_object_or_404(BulkUploadJob, id=job_id, user=request.user)
+        return Response(BulkUploadJobSerializer(job).data, status=status.HTTP_200_OK)
 
 
 # ==================== JOB MANAGEMENT VIEWS ====================
@@ -928,19 +1093,30 @@ class HRContactBulkUploadView(APIView):
 class JobListView(APIView):
     """List all jobs with pagination and search"""
     permission_classes = [IsAuthenticated, ReferlyPermission]
+    # Responses are shared by all users and keyed on these models' versions
+    cache_models = (Company, HRContact, Job)
     
     @extend_schema(
         parameters=[
             OpenApiParameter(name='search', type=str, description='Search in job title or company'),
             OpenApiParameter(name='title', type=str, description='Filter by job title'),
             OpenApiParameter(name='company_name', type=str, description='Filter by company name'),
+            OpenApiParameter(name='cursor', type=str, description='Opaque cursor from the previous page'),
+            OpenApiParameter(name='page_size', type=int, description='Results per page (default 50, max 200)'),
+            OpenApiParameter(name='fields', type=str, description='Comma-separated fields to return (sparse fieldset)'),
         ],
         responses={200: JobListSerializer(many=True)}
     )
     def get(self, request):
-        # annotate whether company's HR contacts exist to avoid N+1 queries in serializer
-        hr_exists_qs = HRContact.objects.filter(company=OuterRef('company_id'), is_active=True)
-        jobs = Job.objects.filter(is_active=True).select_related('company').annotate(has_hr=Exists(hr_exists_qs))
+        try:
+            data = DirectoryCache.get_or_build('jobs', request, self.cache_models, lambda: self.build(request))
+        except InvalidCursor as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(data, status=status.HTTP_200_OK)
+    
+    def build(self, request):
+        # annotate whether the company has HR contacts to avoid N+1 queries in serializer
+        jobs = Job.objects.filter(is_active=True).select_related('company').annotate(has_hr=Job.has_hr_expression())
         
         # Search functionality
         search = request.query_params.get('search', None)
@@ -960,11 +1136,9 @@ class JobListView(APIView):
         if company_name:
             jobs = jobs.filter(company__name__icontains=company_name)
         
-        serializer = JobListSerializer(jobs, many=True)
-        return Response({
-            'results': serializer.data,
-            'count': jobs.count()
-        }, status=status.HTTP_200_OK)
+        paginator = KeysetPaginator(request)
+        jobs, next_cursor = JobListSerializer.fast_page(paginator, jobs, requested_fields(request))
+        return paginator.response_data(jobs, next_cursor)
 
 
 class JobCreateView(APIView):
@@ -1022,49 +1196,162 @@ class JobDetailView(APIView):
 
 
 class JobSearchView(APIView):
-    """Advanced job search"""
+    """Ranked full-text job search"""
     permission_classes = [IsAuthenticated, ReferlyPermission]
     
     @extend_schema(
         parameters=[
-            OpenApiParameter(name='query', type=str, description='General search query'),
+            OpenApiParameter(name='query', type=str, description='Full-text query (title > job type > company name)'),
             OpenApiParameter(name='title', type=str, description='Filter by job title'),
+            OpenApiParameter(name='job_type', type=str, description='Filter by job type'),
             OpenApiParameter(name='company_name', type=str, description='Filter by company name'),
+            OpenApiParameter(name='company_size', type=str, description='Filter by company size bucket'),
+            OpenApiParameter(name='headquarters', type=str, description='Filter by exact company headquarters'),
+            OpenApiParameter(name='cursor', type=str, description='Opaque cursor from the previous page'),
+            OpenApiParameter(name='page_size', type=int, description='Results per page (default 50, max 200)'),
+            OpenApiParameter(name='fields', type=str, description='Comma-separated fields to return (sparse fieldset)'),
         ],
-        responses={200: JobListSerializer(many=True)}
+        responses={200: JobSearchResultSerializer(many=True)}
     )
     def get(self, request):
-        hr_exists_qs = HRContact.objects.filter(company=OuterRef('company_id'), is_active=True)
-        jobs = Job.objects.filter(is_active=True).select_related('company').annotate(has_hr=Exists(hr_exists_qs))
-        
-        query = request.query_params.get('query', None)
-        if query:
-            jobs = jobs.filter(
-                Q(title__icontains=query) |
-                Q(company__name__icontains=query)
-            )
+        jobs = self.search(request)
+        paginator = KeysetPaginator(request)
+        try:
+            jobs, next_cursor = paginator.paginate(jobs)
+        except InvalidCursor as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        serializer = JobSearchResultSerializer(jobs, many=True, fields=requested_fields(request))
+        data = paginator.response_data(serializer.data, next_cursor)
+        data.update(self.extra_data(request))
+        return Response(data, status=status.HTTP_200_OK)
+    
+    def extra_data(self, request):
+        """Additions to the page body (see JobFacetView)"""
+        return {}
+    
+    def search(self, request):
+        """Filtered, ranked queryset shared with the facets and export endpoints"""
+        jobs = Job.objects.filter(is_active=True).select_related('company').annotate(has_hr=Job.has_hr_expression())
         
         title = request.query_params.get('title', None)
         if title:
             jobs = jobs.filter(title=title)
         
+        job_type = request.query_params.get('job_type', None)
+        if job_type:
+            jobs = jobs.filter(job_type=job_type)
+        
         company_name = request.query_params.get('company_name', None)
         if company_name:
             jobs = jobs.filter(company__name__icontains=company_name)
         
-        serializer = JobListSerializer(jobs, many=True)
-        return Response(serializer.data, status=status.HTTP_200_OK)
+        company_size = request.query_params.get('company_size', None)
+        if company_size:
+            jobs = jobs.filter(company__company_size=company_size)
+        
+        headquarters = request.query_params.get('headquarters', None)
+        if headquarters:
+            jobs = jobs.filter(company__headquarters=headquarters)
+        
+        return DirectorySearch.rank(jobs, request.query_params.get('query'))
+
+
+@extend_schema_view(get=extend_schema(responses={200: JobFacetPageSerializer}))
+class JobFacetView(JobSearchView):
+    """Job search page plus per-value counts of each facet, in one round trip"""
+    # facet name -> column
+    FACETS = {
+        'job_type': 'job_type',
+        'company_size': 'company__company_size',
+        'headquarters': 'company__headquarters',
+    }
+    # Facet counts are shared by all users and keyed on the filters plus these models' versions
+    cache_models = (Company, Job)
+    
+    def extra_data(self, request):
+        jobs = self.search(request)
+        return {'facets': DirectoryCache.get_or_build(
+            'job-facets', request, self.cache_models,
+            lambda: DirectoryFacets.count(jobs, self.FACETS),
+            exclude=('cursor', 'page_size'),
+        )}
+
+
+class JobExportView(DirectoryExportMixin, JobSearchView):
+    """Stream active jobs matching the search filters as CSV or NDJSON (Admin only)"""
+    export_filename = 'jobs'
+    # (header, field path)
+    COLUMNS = [
+        ('id', 'id'),
+        ('title', 'title'),
+        ('job_type', 'job_type'),
+        ('company_id', 'company__company_id'),
+        ('company_name', 'company__name'),
+        ('posted_date', 'posted_date'),
+        ('updated_at', 'updated_at'),
+    ]
 
 
 class JobsByCompanyView(APIView):
     """Get all jobs for a specific company"""
     permission_classes = [IsAuthenticated, ReferlyPermission]
     
-    @extend_schema(responses={200: JobListSerializer(many=True)})
+    @extend_schema(
+        parameters=[
+            OpenApiParameter(name='cursor', type=str, description='Opaque cursor from the previous page'),
+            OpenApiParameter(name='page_size', type=int, description='Results per page (default 50, max 200)'),
+            OpenApiParameter(name='fields', type=str, description='Comma-separated fields to return (sparse fieldset)'),
+        ],
+        responses={200: JobListSerializer(many=True)}
+    )
     def get(self, request, company_id):
         company = get_object_or_404(Company, company_id=company_id, is_active=True)
-        hr_exists_qs = HRContact.objects.filter(company=OuterRef('company_id'), is_active=True)
-        jobs = Job.objects.filter(company=company, is_active=True).select_related('company').annotate(has_hr=Exists(hr_exists_qs))
-        serializer = JobListSerializer(jobs, many=True)
-        return Response(serializer.data, status=status.HTTP_200_OK)
+        jobs = Job.objects.filter(company=company, is_active=True).select_related('company').annotate(has_hr=Job.has_hr_expression())
+        paginator = KeysetPaginator(request)
+        try:
+            jobs, next_cursor = JobListSerializer.fast_page(paginator, jobs, requested_fields(request))
+        except InvalidCursor as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(paginator.response_data(jobs, next_cursor), status=status.HTTP_200_OK)
 
+
+class ResumeMatchingJobsView(APIView):
+    """Active jobs ranked by TF-IDF similarity between their title + company profile and the resume's text"""
+    permission_classes = [IsAuthenticated, ReferlyPermission]
+    
+    @extend_schema(
+        parameters=[
+            OpenApiParameter(name='limit', type=int, description='Number of jobs to return (default 20, max 100)'),
+            OpenApiParameter(name='fields', type=str, description='Comma-separated fields to return (sparse fieldset)'),
+        ],
+        responses={200: JobMatchSerializer(many=True)}
+    )
+    def get(self, request, resume_id):
+        resume = get_object_or_404(Resume.objects.with_blob(), id=resume_id, user=request.user, is_active=True)
+        options = settings.REFERLY_MATCHING
+        try:
+            limit = int(request.query_params.get('limit', options['DEFAULT_LIMIT']))
+        except ValueError:
+            limit = options['DEFAULT_LIMIT']
+        limit = max(1, min(limit, options['MAX_LIMIT']))
+        fields = requested_fields(request)
+        # Validate the fieldset before doing any work
+        JobMatchSerializer.fast_columns(fields)
+        
+        try:
+            matches = JobMatcher.top_jobs(resume, limit)
+        except MatchingNotReady as e:
+            if e.pending:
+                # Text extraction is queued on the `render_resumes` worker
+                return Response({"status": "pending", "message": str(e)}, status=status.HTTP_202_ACCEPTED)
+            return Response({"error": str(e)}, status=status.HTTP_409_CONFLICT)
+        
+        jobs = Job.objects.filter(pk__in=[pk for pk, _ in matches], is_active=True).annotate(has_hr=Job.has_hr_expression())
+        rows = {row['id']: row for row in jobs.values(*(JobMatchSerializer.fast_paths(fields) - {'score'} | {'id'}))}
+        ranked = []
+        for pk, score in matches:
+            # Jobs deactivated since the index was refreshed are skipped
+            if pk in rows:
+                rows[pk]['score'] = round(score, 4)
+                ranked.append(rows[pk])
+        return Response({"results": JobMatchSerializer.fast_rows(ranked, fields)}, status=status.HTTP_200_OK)
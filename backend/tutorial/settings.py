@@ -62,6 +62,7 @@ DJANGO_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
 ]
 
 THIRD_PARTY_APPS = [
@@ -109,6 +110,11 @@ REST_FRAMEWORK = {
         'accounts.authentication.CookieJWTAuthentication',
         'rest_framework_simplejwt.authentication.JWTAuthentication',
     ),
+    # orjson-backed JSON (falls back to DRF's JSONRenderer without orjson)
+    'DEFAULT_RENDERER_CLASSES': (
+        'Referly.renderers.ORJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ),
 }
 
 SPECTACULAR_SETTINGS = {
@@ -164,6 +170,34 @@ DATABASES = {
 }
 
 
+# Cache
+# https://docs.djangoproject.com/en/4.2/topics/cache/
+# Redis (or any Redis-compatible server, needs the `redis` package) when CACHE_URL is set,
+# e.g. redis://localhost:6379/1; otherwise a per-process local-memory cache.
+# Set CACHE_URL for any multi-process deployment (several gunicorn workers, the bulk upload worker):
+# the Referly directory cache is only enabled on a shared backend, since its versions must be seen
+# by every process.
+
+CACHE_URL = config('CACHE_URL', default='')
+
+if CACHE_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': CACHE_URL,
+            'KEY_PREFIX': config('CACHE_KEY_PREFIX', default='tutorial'),
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'tutorial',
+            'OPTIONS': {'MAX_ENTRIES': config('CACHE_MAX_ENTRIES', default=5000, cast=int)},
+        }
+    }
+
+
 # Password validation
 # https://docs.djangoproject.com/en/4.2/ref/settings/#auth-password-validators
 
@@ -234,4 +268,108 @@ BACKEND_URL = config("BACKEND_URL", default="http://127.0.0.1:8000")
 
 # Google OAuth Configuration
 GOOGLE_CLIENT_ID = config("GOOGLE_CLIENT_ID", default="")
-GOOGLE_CLIENT_SECRET = config("GOOGLE_CLIENT_SECRET", default="")
\ No newline at end of file
+GOOGLE_CLIENT_SECRET = config("GOOGLE_CLIENT_SECRET", default="")
+
+# Referly resume storage
+# "database" keeps resume bytes in Postgres, "filesystem" writes them under LOCATION,
+# "s3" writes them to an S3-compatible bucket (see miniIO-S3/docker-compose.yml)
+REFERLY_STORAGE = {
+    "BACKEND": config("REFERLY_STORAGE_BACKEND", default="database"),
+    "LOCATION": config("REFERLY_STORAGE_LOCATION", default=str(BASE_DIR / "referly_storage")),
+    "BUCKET": config("REFERLY_S3_BUCKET", default="referly-resumes"),
+    "ENDPOINT_URL": config("REFERLY_S3_ENDPOINT_URL", default="http://localhost:9000"),
+    "ACCESS_KEY": config("REFERLY_S3_ACCESS_KEY", default="minioadmin"),
+    "SECRET_KEY": config("REFERLY_S3_SECRET_KEY", default="minioadmin123"),
+    "REGION": config("REFERLY_S3_REGION", default="us-east-1"),
+    "PRESIGNED_URL_EXPIRY": config("REFERLY_S3_PRESIGNED_URL_EXPIRY", default=300, cast=int),
+    # Redirect downloads to a presigned URL instead of streaming through Django
+    "PRESIGNED_DOWNLOADS": config("REFERLY_S3_PRESIGNED_DOWNLOADS", default=False, cast=bool),
+}
+
+# Pre-encoded resume MIME attachment parts are cached per (resume id, updated_at)
+REFERLY_MIME_CACHE_TIMEOUT = config("REFERLY_MIME_CACHE_TIMEOUT", default=3600, cast=int)
+
+# DOCX -> PDF/HTML preview rendering (manage.py render_resumes worker, local LibreOffice)
+REFERLY_DOCX_RENDITIONS = config("REFERLY_DOCX_RENDITIONS", default="pdf,html", cast=Csv())
+REFERLY_SOFFICE_BINARY = config("REFERLY_SOFFICE_BINARY", default="soffice")
+REFERLY_RENDER_TIMEOUT = config("REFERLY_RENDER_TIMEOUT", default=120, cast=int)
+REFERLY_RENDER_MAX_ATTEMPTS = config("REFERLY_RENDER_MAX_ATTEMPTS", default=3, cast=int)
+
+# First-page resume thumbnails (rendered by the same worker with poppler's pdftoppm)
+REFERLY_PDFTOPPM_BINARY = config("REFERLY_PDFTOPPM_BINARY", default="pdftoppm")
+REFERLY_THUMBNAIL_WIDTH = config("REFERLY_THUMBNAIL_WIDTH", default=240, cast=int)
+REFERLY_THUMBNAIL_QUALITY = config("REFERLY_THUMBNAIL_QUALITY", default=70, cast=int)
+
+# Resume text for job matching (PDF: poppler's pdftotext, DOCX: LibreOffice), see Referly/matching.py
+REFERLY_PDFTOTEXT_BINARY = config("REFERLY_PDFTOTEXT_BINARY", default="pdftotext")
+REFERLY_MATCHING = {
+    # Hashed term space of the TF-IDF vectors (no vocabulary to refit when jobs change)
+    "DIMENSIONS": config("REFERLY_MATCHING_DIMENSIONS", default=2 ** 18, cast=int),
+    # Job titles are a few words against a whole company profile: count each title term this many times
+    "TITLE_WEIGHT": config("REFERLY_MATCHING_TITLE_WEIGHT", default=4.0, cast=float),
+    "DEFAULT_LIMIT": config("REFERLY_MATCHING_DEFAULT_LIMIT", default=20, cast=int),
+    "MAX_LIMIT": config("REFERLY_MATCHING_MAX_LIMIT", default=100, cast=int),
+    # Incremental refreshes re-read rows updated this long before the previous refresh (clock skew, slow commits)
+    "REFRESH_OVERLAP": config("REFERLY_MATCHING_REFRESH_OVERLAP", default=300, cast=int),
+    "RESUME_CACHE_TIMEOUT": config("REFERLY_MATCHING_RESUME_CACHE_TIMEOUT", default=86400, cast=int),
+}
+
+# RabbitMQ broker (same settings as the queue service's producer)
+RABBITMQ = {
+    "USER": config("RABBITMQ_USER", default="guest"),
+    "PASSWORD": config("RABBITMQ_PASSWORD", default="guest"),
+    "HOST": config("RABBITMQ_HOST", default="localhost"),
+    "PORT": config("RABBITMQ_PORT", default=5672, cast=int),
+}
+
+# Excel bulk uploads are imported by the `process_bulk_uploads` worker, fed job ids over RabbitMQ
+REFERLY_BULK_UPLOAD = {
+    "QUEUE": config("REFERLY_BULK_UPLOAD_QUEUE", default="referly_bulk_uploads"),
+    # Rows imported (and committed, with the progress) per transaction
+    "CHUNK_ROWS": config("REFERLY_BULK_UPLOAD_CHUNK_ROWS", default=5000, cast=int),
+    # Re-claim jobs stuck in "running" (crashed worker) after this long without progress
+    "STALE_MINUTES": config("REFERLY_BULK_UPLOAD_STALE_MINUTES", default=15, cast=int),
+}
+
+# Per-user Referly folder tree cache (invalidated by template/resume save/delete signals)
+REFERLY_FOLDER_CACHE_TIMEOUT = config("REFERLY_FOLDER_CACHE_TIMEOUT", default=300, cast=int)
+
+# Compiled Referly templates kept split into literal/placeholder segments, per process
+REFERLY_TEMPLATE_PLAN_CACHE_SIZE = config("REFERLY_TEMPLATE_PLAN_CACHE_SIZE", default=256, cast=int)
+
+# Transparent compression of Referly template HTML and database-stored resume bytes.
+# CODEC is "zlib" or "zstd" (requires the optional `zstandard` package).
+REFERLY_COMPRESSION = {
+    "CODEC": config("REFERLY_COMPRESSION_CODEC", default="zlib"),
+    "LEVEL": config("REFERLY_COMPRESSION_LEVEL", default=6, cast=int),
+    # Values smaller than this are stored raw
+    "MIN_SIZE": config("REFERLY_COMPRESSION_MIN_SIZE", default=256, cast=int),
+}
+
+# Resumable (chunked) resume uploads
+REFERLY_UPLOAD_CHUNK_SIZE = config("REFERLY_UPLOAD_CHUNK_SIZE", default=512 * 1024, cast=int)
+REFERLY_UPLOAD_SESSION_TTL_HOURS = config("REFERLY_UPLOAD_SESSION_TTL_HOURS", default=24, cast=int)
+
+# Cursor pagination of the company / HR contact / job directory listings (`?page_size=`, `?cursor=`)
+REFERLY_PAGINATION = {
+    "PAGE_SIZE": config("REFERLY_PAGE_SIZE", default=50, cast=int),
+    "MAX_PAGE_SIZE": config("REFERLY_MAX_PAGE_SIZE", default=200, cast=int),
+}
+
+# Shared company / job directory responses, keyed on query params + per-model versions bumped on writes
+# (needs a shared cache, i.e. CACHE_URL; with the local-memory fallback responses aren't cached)
+REFERLY_DIRECTORY_CACHE_TIMEOUT = config("REFERLY_DIRECTORY_CACHE_TIMEOUT", default=600, cast=int)
+
+# Rows fetched per server-side cursor round trip by the streaming directory exports
+REFERLY_EXPORT_CHUNK_SIZE = config("REFERLY_EXPORT_CHUNK_SIZE", default=2000, cast=int)
+
+# Company / HR contact typeahead (pg_trgm)
+REFERLY_TYPEAHEAD = {
+    "MIN_QUERY_LENGTH": config("REFERLY_TYPEAHEAD_MIN_QUERY_LENGTH", default=2, cast=int),
+    "MAX_RESULTS": config("REFERLY_TYPEAHEAD_MAX_RESULTS", default=10, cast=int),
+    # Minimum word similarity (0-1) for typo matches such as "Gogle" -> "Google"
+    "THRESHOLD": config("REFERLY_TYPEAHEAD_THRESHOLD", default=0.4, cast=float),
+    # In-process LRU for hot prefixes
+    "CACHE_SIZE": config("REFERLY_TYPEAHEAD_CACHE_SIZE", default=2048, cast=int),
+    "CACHE_TTL": config("REFERLY_TYPEAHEAD_CACHE_TTL", default=60, cast=int),
+}